@@ -0,0 +1,277 @@
+"""
+Admission control cho endpoints nặng (giới hạn trong mỗi worker process).
+
+- Mỗi nhóm route ("analytics", "sales_list") có concurrency limit riêng và một
+  hàng đợi giới hạn (ADMISSION_QUEUE_SIZE, chờ tối đa ADMISSION_QUEUE_TIMEOUT_MS).
+  Hết chỗ -> AdmissionRejectedError -> 503 + Retry-After ngay, không xếp hàng vô hạn.
+- Slot chỉ bị chiếm khi request thật sự mở transaction DB (session after_begin)
+  hoặc scan Parquet (admit_current), nên cache hit / 304 không bao giờ phải chờ.
+  Lúc đó nếu không còn slot trống, endpoint dừng trước query (AdmissionPendingError);
+  AdmissionRoute chờ slot trên event loop - không chiếm thread của threadpool - rồi
+  chạy lại endpoint với slot đã có (lần chạy lại đọc cache / ETag lần nữa, rất rẻ).
+- Request có deadline: thời gian còn lại được đặt thành `SET LOCAL statement_timeout`
+  trên PostgreSQL, query vượt deadline bị DB huỷ thay vì giữ connection.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Depends, Request
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+
+RETRY_AFTER_SECONDS = 1
+# SQLSTATE query_canceled (statement_timeout)
+QUERY_CANCELED_PGCODE = "57014"
+
+
+class AdmissionRejectedError(Exception):
+    def __init__(self, detail: str, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionPendingError(AdmissionRejectedError):
+    """Cần slot nhưng chưa có slot trống - AdmissionRoute chờ slot rồi chạy lại (route khác: 503)"""
+
+    def __init__(self, ticket: "AdmissionTicket"):
+        super().__init__(f"No free {ticket.limiter.name} slot")
+        self.ticket = ticket
+
+
+class ConcurrencyLimiter:
+    """
+    Semaphore với hàng đợi giới hạn. acquire() là coroutine (chạy trên event loop);
+    release() gọi được từ mọi thread - slot được chuyển thẳng cho request chờ lâu nhất.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters = deque()  # (loop, future) theo thứ tự đến
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        """Chiếm slot nếu còn trống ngay (không vượt request đang chờ), không bao giờ chờ"""
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return True
+            return False
+
+    async def acquire(self):
+        with self._lock:
+            if self.in_flight < self.limit and not self._waiters:
+                self.in_flight += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejectedError(f"Too many concurrent {self.name} requests")
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1], self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self.rejected += 1
+            # Slot được chuyển tới đúng lúc hết hạn: _hand_over thấy future đã huỷ và trả slot lại
+            raise AdmissionRejectedError(f"Timed out waiting for a {self.name} slot")
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            loop, future = self._waiters.popleft()
+        loop.call_soon_threadsafe(self._hand_over, future)
+
+    def _hand_over(self, future):
+        # in_flight giữ nguyên: slot đi thẳng từ request vừa xong sang request đang chờ
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limit_for(name: str) -> int:
+    return {
+        "analytics": settings.admission_analytics_concurrency,
+        "sales_list": settings.admission_sales_list_concurrency,
+    }[name]
+
+
+def get_limiter(name: str) -> ConcurrencyLimiter:
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = ConcurrencyLimiter(
+                name,
+                _limit_for(name),
+                settings.admission_queue_size,
+                settings.admission_queue_timeout_ms / 1000,
+            )
+        return _limiters[name]
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+class AdmissionTicket:
+    """Trạng thái admission của một request: slot (lấy lazily) + deadline"""
+
+    def __init__(self, limiter: ConcurrencyLimiter, deadline: Optional[float]):
+        self.limiter = limiter
+        self.deadline = deadline
+        self.admitted = False
+        self._lock = threading.Lock()
+
+    def remaining_ms(self) -> Optional[int]:
+        if self.deadline is None:
+            return None
+        return int((self.deadline - time.monotonic()) * 1000)
+
+    def try_admit(self):
+        """Gọi từ threadpool ở cache miss: slot trống ngay hoặc AdmissionPendingError"""
+        with self._lock:
+            if self.admitted:
+                return
+            if not self.limiter.try_acquire():
+                raise AdmissionPendingError(self)
+            self.admitted = True
+
+    async def admit(self):
+        if self.admitted:
+            return
+        await self.limiter.acquire()
+        self.admitted = True
+
+    def release(self):
+        with self._lock:
+            if self.admitted:
+                self.admitted = False
+                self.limiter.release()
+
+
+_current_ticket: ContextVar[Optional[AdmissionTicket]] = ContextVar("admission_ticket", default=None)
+
+
+def admission(group: str, deadline_ms: Optional[int] = None):
+    """
+    Dependency cho route nặng (router dùng route_class=AdmissionRoute). Async để
+    contextvar được set trong context của request (sync endpoint chạy trong
+    threadpool với bản copy của context này). Không chiếm slot ở đây.
+    """
+
+    async def dependency(request: Request):
+        # Lần chạy lại của AdmissionRoute dùng lại ticket (slot + deadline) của lần đầu
+        ticket = getattr(request.state, "admission_ticket", None)
+        if ticket is None:
+            timeout_ms = deadline_ms if deadline_ms is not None else settings.analytics_deadline_ms
+            deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+            ticket = AdmissionTicket(get_limiter(group), deadline)
+            request.state.admission_ticket = ticket
+        _current_ticket.set(ticket)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    return Depends(dependency)
+
+
+class AdmissionRoute(APIRoute):
+    """Cache miss khi hết slot: chờ slot trên event loop rồi chạy lại endpoint một lần"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request):
+            try:
+                return await handler(request)
+            except AdmissionPendingError as e:
+                ticket = e.ticket
+            await ticket.admit()  # Hàng đợi đầy / hết ADMISSION_QUEUE_TIMEOUT_MS -> 503
+            try:
+                return await handler(request)
+            finally:
+                ticket.release()
+
+        return route_handler
+
+
+def admit_current():
+    """Chiếm slot cho việc nặng không đi qua DB session (vd: scan Parquet khi cache miss)"""
+    ticket = _current_ticket.get()
+    if ticket is not None:
+        ticket.try_admit()
+
+
+@contextmanager
+def parallel_slots(wanted: int):
+    """
+    Request chạy nhiều query song song (dashboard batch): mỗi query đồng thời một slot.
+    Slot của request + tối đa wanted - 1 slot đang trống (không chờ, không vượt hàng đợi);
+    yield số query được chạy cùng lúc (>= 1), slot thêm được trả khi ra khỏi block.
+    """
+    ticket = _current_ticket.get()
+    if ticket is None:
+        yield wanted
+        return
+    ticket.try_admit()
+    extra = 0
+    try:
+        while extra < wanted - 1 and ticket.limiter.try_acquire():
+            extra += 1
+        yield 1 + extra
+    finally:
+        for _ in range(extra):
+            ticket.limiter.release()
+
+
+def on_session_begin(session, transaction, connection):
+    """Session after_begin: chiếm slot của request (một lần) và áp deadline vào statement_timeout"""
+    ticket = _current_ticket.get()
+    if ticket is None:
+        return
+    remaining_ms = ticket.remaining_ms()
+    if remaining_ms is not None and remaining_ms <= 0:
+        raise AdmissionRejectedError("Request deadline exceeded")
+    ticket.try_admit()
+    if remaining_ms is not None and connection.dialect.name == "postgresql":
+        # SET LOCAL chỉ sống tới hết transaction - connection trả về pool không mang theo timeout
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(remaining_ms, 1)}")
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    return getattr(getattr(exc, "orig", None), "pgcode", None) == QUERY_CANCELED_PGCODE
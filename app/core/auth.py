@@ -1,16 +1,28 @@
-import os
 from datetime import datetime, timedelta
-from jose import jwt
-from dotenv import load_dotenv
+from typing import Optional
 
-load_dotenv()
+from jose import JWTError, jwt
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+from app.core.config import settings
 
 def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+
+def decode_token_claims(token: str) -> Optional[dict]:
+    """Claims của JWT hợp lệ (sub = email, uid = user id), None nếu token sai/hết hạn"""
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+
+def decode_token_subject(token: str) -> Optional[str]:
+    """Email (sub) trong JWT hợp lệ, None nếu token sai/hết hạn"""
+    payload = decode_token_claims(token)
+    return (payload or {}).get("sub") or None
+
+def is_admin_email(email: Optional[str]) -> bool:
+    admins = {e.strip().lower() for e in settings.admin_emails.split(",") if e.strip()}
+    return bool(email) and email.lower() in admins
@@ -0,0 +1,208 @@
+"""
+Response compression: negotiation Accept-Encoding, codecs gzip/br/zstd
+và cache compressed variants của payload đã serialize sẵn.
+
+brotli và zstandard là optional - thiếu package thì encoding đó bị bỏ qua.
+"""
+
+import hashlib
+import zlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import get_redis_bytes
+from app.core.serialization import RawJSONResponse
+from app.core.timing import span
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = get_logger("compression")
+
+VARIANT_KEY_PREFIX = "compressed"
+
+# Content types đáng nén. text/event-stream bị loại vì nén làm trễ từng event
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "text/xml",
+)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        # Sync flush để client nhận được từng chunk của streaming response
+        return self._obj.compress(chunk) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._obj.process(chunk) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._obj.compress(chunk) + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def available_encodings() -> list:
+    """Encodings bật trong settings và có codec cài sẵn, theo thứ tự ưu tiên"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    configured = [e.strip() for e in settings.compression_encodings.split(",") if e.strip()]
+    return [e for e in configured if installed.get(e)]
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Nén một payload hoàn chỉnh"""
+    if encoding == "gzip":
+        return _gzip(data, settings.compression_gzip_level)
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.compression_brotli_quality)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=settings.compression_zstd_level).compress(data)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return obj.compress(data) + obj.flush()
+
+
+def stream_compressor(encoding: str):
+    """Compressor cho streaming response - compress(chunk) / finish()"""
+    if encoding == "gzip":
+        return _GzipStream(settings.compression_gzip_level)
+    if encoding == "br":
+        return _BrotliStream(settings.compression_brotli_quality)
+    if encoding == "zstd":
+        return _ZstdStream(settings.compression_zstd_level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'gzip;q=0.8, br' -> {'gzip': 0.8, 'br': 1.0}"""
+    weights = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    return weights
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Chọn encoding có q cao nhất; hoà thì theo thứ tự ưu tiên trong settings"""
+    if not accept_encoding:
+        return None
+    weights = parse_accept_encoding(accept_encoding)
+    wildcard = weights.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def _variant_key(payload: bytes, encoding: str) -> str:
+    # Content-addressed: cùng payload -> cùng variant, không cần invalidation riêng
+    digest = hashlib.blake2b(payload, digest_size=16).hexdigest()
+    return f"{VARIANT_KEY_PREFIX}:{encoding}:{digest}"
+
+
+def get_compressed_variant(payload: bytes, encoding: str) -> bytes:
+    """Lấy compressed variant từ Redis, nén và lưu lại nếu chưa có"""
+    key = _variant_key(payload, encoding)
+    rb = get_redis_bytes()
+    try:
+        with span("redis"):
+            cached = rb.get(key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        logger.warning("Compressed variant lookup failed", key=key, error=str(e))
+        with span("compress"):
+            return compress(payload, encoding)
+
+    with span("compress"):
+        compressed = compress(payload, encoding)
+    try:
+        with span("redis"):
+            rb.setex(key, settings.compression_variant_ttl, compressed)
+    except Exception as e:
+        logger.warning("Compressed variant store failed", key=key, error=str(e))
+    return compressed
+
+
+def precompress_variants(payload: bytes):
+    """Lưu sẵn mọi variant của một cached payload (gọi lúc ghi cache, vd: ETL load)"""
+    if len(payload) < settings.compression_min_size:
+        return
+    for encoding in available_encodings():
+        get_compressed_variant(payload, encoding)
+
+
+def compressed_json_response(request: Request, payload: bytes, headers: Optional[dict] = None) -> Response:
+    """
+    Response cho JSON đã serialize sẵn, dùng compressed variant đã cache nếu
+    client chấp nhận. CompressionMiddleware bỏ qua response đã có Content-Encoding.
+    """
+    headers = dict(headers or {})
+    encoding = None
+    if len(payload) >= settings.compression_min_size:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    if encoding is None:
+        return RawJSONResponse(payload, headers=headers)
+
+    vary = headers.get("Vary")
+    headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    headers["Content-Encoding"] = encoding
+    return RawJSONResponse(get_compressed_variant(payload, encoding), headers=headers)
@@ -1,9 +1,131 @@
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Optional
 
-load_dotenv()
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
-PROJECT_NAME = "SaaS Analytics API"
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+
+class Settings(BaseSettings):
+    """Toàn bộ cấu hình app, đọc một lần từ biến môi trường / .env"""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    project_name: str = "SaaS Analytics API"
+
+    # Production server (python -m app.serve)
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 8000
+    serve_workers: int = 0  # 0 = số CPU process được phép dùng
+    serve_preload: bool = True  # Import app trong master trước khi fork (worker start nhanh, chia sẻ memory)
+    serve_backlog: int = 2048
+    serve_keepalive: int = 5  # giây giữ connection idle (đặt lớn hơn idle timeout của load balancer)
+    serve_max_requests: int = 10_000  # Recycle worker sau N requests (0 = tắt)
+    serve_max_requests_jitter: int = 1_000  # Tránh mọi worker recycle cùng lúc
+    serve_graceful_timeout: int = 30  # giây chờ requests đang chạy khi shutdown/recycle
+    serve_timeout: int = 60  # Worker không heartbeat trong N giây -> master kill và thay mới
+
+    # Auth
+    secret_key: Optional[str] = None
+    algorithm: str = "HS256"
+    access_token_expire_minutes: int = 60
+    admin_emails: str = ""  # Danh sách email admin, phân cách bằng dấu phẩy
+
+    # PostgreSQL
+    postgres_user: Optional[str] = None
+    postgres_password: Optional[str] = None
+    postgres_host: str = "localhost"
+    postgres_port: int = 5432
+    postgres_db: Optional[str] = None
+    database_url: Optional[str] = None  # Override toàn bộ URL (vd: sqlite cho test/benchmark)
+    db_prepared_statements: bool = False  # PREPARE các queries nóng trên mỗi connection Postgres (không dùng với pgbouncer transaction pooling)
+
+    # Read replicas cho endpoints chỉ đọc (analytics, listing, health)
+    replica_database_urls: str = ""  # Danh sách URL phân cách bằng dấu phẩy, rỗng = mọi query vào primary
+    replica_max_lag_seconds: Optional[float] = None  # Replica trễ hơn -> đọc từ primary
+    replica_eject_seconds: float = 30  # Replica lỗi kết nối bị loại trong khoảng này
+    replica_check_interval_seconds: float = 5  # Tần suất kiểm tra health/lag mỗi replica
+    replica_read_after_write_seconds: float = 10  # Sau lần ghi gần nhất (generation bump) đọc primary trong khoảng này, 0 = tắt
+
+    # Admission control cho endpoints nặng (giới hạn trong mỗi worker process)
+    admission_analytics_concurrency: int = 8  # Analytics cache miss chạy đồng thời
+    admission_sales_list_concurrency: int = 2  # GET /sales-data/ (full scan) chạy đồng thời
+    admission_queue_size: int = 16  # Số requests được chờ slot, vượt -> 503 ngay
+    admission_queue_timeout_ms: int = 250  # Chờ slot tối đa, hết hạn -> 503
+    analytics_deadline_ms: int = 10_000  # Deadline mỗi request analytics -> statement_timeout (0 = tắt)
+
+    # Redis
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_db: int = 0
+
+    # HTTP caching (analytics endpoints)
+    analytics_cache_max_age: int = 5
+
+    # Cohort tables cập nhật trong transaction ghi sales (false = chỉ nightly ETL rebuild)
+    cohort_incremental_updates: bool = True
+
+    # POST /analytics/batch: số cache misses chạy song song (mỗi miss một DB connection)
+    dashboard_max_parallel_queries: int = 4
+
+    # Response compression
+    compression_encodings: str = "zstd,br,gzip"  # Thứ tự ưu tiên khi client chấp nhận ngang nhau
+    compression_min_size: int = 1024  # bytes - response nhỏ hơn không nén
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    compression_variant_ttl: int = 3600  # TTL của compressed variants trong Redis
+
+    # Per-request SQL profiling (opt-in)
+    query_profiling_enabled: bool = False
+    query_profiling_slowest: int = 5  # Số statements chậm nhất giữ lại mỗi request
+    query_profiling_n_plus_one_threshold: int = 5  # Cùng statement lặp lại >= N lần -> cảnh báo N+1
+
+    # Sampling profiler (admin-only, bật theo request hoặc theo time window)
+    profiler_interval_ms: float = 5.0
+    profiler_max_window_seconds: int = 120
+    profiler_result_ttl: int = 3600  # TTL của per-request profile lưu trong Redis
+
+    # Real-time analytics push (SSE / WebSocket)
+    live_coalesce_ms: int = 250  # Gom các insert trong khoảng này thành một update
+    live_heartbeat_seconds: int = 15  # Keepalive cho SSE khi không có update
+    live_top_users: int = 3
+    stream_ticket_ttl_seconds: int = 30  # Ticket một lần cho ?ticket= của SSE/WebSocket
+
+    # Approximate analytics (?approx=true)
+    approx_sample_percent: float = 1.0  # TABLESAMPLE SYSTEM percent
+    approx_min_sample_rows: int = 10_000  # Sample nhỏ hơn -> tính exact
+    approx_quantile_relative_accuracy: float = 0.01  # Sai số tương đối của revenue percentiles
+
+    # Per-tenant quotas cho analytics queries nặng (chỉ tính khi cache miss)
+    tenant_max_concurrent_queries: int = 2
+    tenant_queries_per_minute: int = 30
+    tenant_query_slot_ttl: int = 60  # giây - slot tự giải phóng nếu worker chết giữa query
+
+    # Async ingestion (POST /sales-data/?mode=async -> Redis Stream -> writer workers)
+    ingest_batch_size: int = 500  # Số messages mỗi micro-batch insert
+    ingest_block_ms: int = 1000  # XREADGROUP BLOCK khi stream rỗng
+    ingest_claim_idle_ms: int = 60_000  # Pending lâu hơn -> consumer khác nhận lại
+    ingest_max_deliveries: int = 5  # Giao quá số lần này vẫn lỗi -> dead-letter
+    ingest_stream_maxlen: int = 1_000_000  # MAXLEN ~ của stream (chặn Redis phình khi writer dừng)
+
+    # Columnar snapshots (Parquet) cho heavy analytics
+    columnar_dir: str = "data/columnar"
+    columnar_compression: str = "zstd"
+    columnar_row_group_size: int = 128_000  # rows - đơn vị pruning theo min/max statistics
+    columnar_keep_snapshots: int = 2  # Giữ snapshot cũ cho reader đang đọc dở ở worker khác
+
+    @property
+    def sqlalchemy_database_url(self) -> str:
+        if self.database_url:
+            return self.database_url
+        return (
+            f"postgresql://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
@@ -0,0 +1,91 @@
+"""
+HTTP conditional requests cho analytics endpoints.
+
+Version của analytics data là global generation counter trong Redis, được bump
+mỗi lần ghi sales data (tag "global", xem tag_cache.bump_tags). ETag/Last-Modified
+được suy ra từ generation nên request có If-None-Match khớp được trả 304 mà
+không cần query DB hay build payload.
+"""
+
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.redis_client import r
+from app.core.timing import span
+
+GENERATION_KEY = "analytics:generation"
+UPDATED_AT_KEY = "analytics:generation:updated_at"
+
+
+def get_generation() -> Tuple[int, int]:
+    """(generation, updated_at unix timestamp) - một round trip Redis"""
+    with span("redis"):
+        generation, updated_at = r.mget(GENERATION_KEY, UPDATED_AT_KEY)
+    if updated_at is None:
+        # Redis mới/flush: lấy thời điểm hiện tại làm mốc Last-Modified
+        updated_at = int(time.time())
+        r.set(UPDATED_AT_KEY, updated_at, nx=True)
+    return int(generation or 0), int(updated_at)
+
+
+def written_within(seconds: float) -> bool:
+    """Generation được bump trong `seconds` giây gần đây (updated_at làm tròn xuống giây)"""
+    if seconds <= 0:
+        return False
+    with span("redis"):
+        updated_at = r.get(UPDATED_AT_KEY)
+    return updated_at is not None and time.time() - int(updated_at) < seconds + 1
+
+
+def make_etag(resource: str, generation: int, updated_at: int) -> str:
+    # updated_at giữ ETag duy nhất kể cả khi Redis bị flush và generation đếm lại từ 0.
+    # Weak ETag: payload tương đương về ngữ nghĩa, không cam kết byte-identical
+    return f'W/"{resource}-{generation}-{updated_at}"'
+
+
+def _strip_weak(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, updated_at: int) -> bool:
+    """If-None-Match (ưu tiên) hoặc If-Modified-Since theo RFC 9110"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        wanted = _strip_weak(etag)
+        return any(_strip_weak(tag) == wanted for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return updated_at <= since
+
+    return False
+
+
+def cache_headers(etag: str, updated_at: int, private: bool = False) -> dict:
+    """
+    private=True cho data riêng của tenant: chỉ browser của user được cache,
+    proxy/CDN không lưu (Vary thôi không đủ với cache bỏ qua Authorization).
+    """
+    scope = "private" if private else "public"
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(updated_at, usegmt=True),
+        # Proxy/CDN được phép cache (public) nhưng key theo Authorization (không lộ data giữa các token)
+        "Cache-Control": f"{scope}, max-age={settings.analytics_cache_max_age}, must-revalidate",
+        "Vary": "Authorization",
+    }
+
+
+def not_modified_response(etag: str, updated_at: int, private: bool = False) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, updated_at, private=private))
@@ -0,0 +1,81 @@
+"""
+Prepared statements cho các queries nóng nhất (auth lookup, summary, top users).
+
+Statement là Core select() build một lần lúc import với bindparam, nên mỗi
+request không phải dựng lại ORM Query/Select và SQLAlchemy chỉ tra compiled
+cache. Trên PostgreSQL statement còn được PREPARE (server-side) một lần trên mỗi
+DBAPI connection rồi chạy bằng EXECUTE: server bỏ qua parse/plan ở các lần sau.
+psycopg2 không tự prepare, nên việc này làm tường minh qua PREPARE/EXECUTE.
+
+PREPARE chỉ chạy khi DB_PREPARED_STATEMENTS=true (mặc định tắt tới khi có test
+trên Postgres thật). Không bật khi đi qua pgbouncer transaction pooling -
+prepared statement gắn với server connection, không theo client.
+"""
+
+import re
+from typing import Dict
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Result
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+
+_PYFORMAT_PARAM = re.compile(r"%\((\w+)\)s")
+
+_registry: Dict[str, "PreparedQuery"] = {}
+
+
+class PreparedQuery:
+    def __init__(self, name: str, statement: Select):
+        if name in _registry:
+            raise ValueError(f"Prepared statement {name!r} already registered")
+        self.name = name
+        self.statement = statement
+        self._pg = None  # (PREPARE sql, EXECUTE statement, default params), build lần đầu chạy trên PostgreSQL
+        _registry[name] = self
+
+    def execute(self, db: Session, **params) -> Result:
+        if settings.db_prepared_statements:
+            conn = db.connection()
+            if conn.dialect.name == "postgresql":
+                execute_stmt, defaults = self._prepare(conn)
+                return db.execute(execute_stmt, {**defaults, **params})
+        return db.execute(self.statement, params)
+
+    def postgres_sql(self, dialect) -> tuple:
+        """(PREPARE ..., EXECUTE ...) - tham số pyformat được đổi sang $1, $2... theo thứ tự xuất hiện"""
+        compiled = self.statement.compile(dialect=dialect)
+        names = []
+
+        def positional(match) -> str:
+            if match.group(1) not in names:
+                names.append(match.group(1))
+            return f"${names.index(match.group(1)) + 1}"
+
+        body = _PYFORMAT_PARAM.sub(positional, compiled.string).replace("%%", "%")
+        arguments = f" ({', '.join(f':{name}' for name in names)})" if names else ""
+        defaults = {name: value for name, value in compiled.params.items() if value is not None}
+        return f"PREPARE {self.name} AS {body}", f"EXECUTE {self.name}{arguments}", defaults
+
+    def _prepare(self, conn: Connection) -> tuple:
+        if self._pg is None:
+            prepare_sql, execute_sql, defaults = self.postgres_sql(conn.dialect)
+            # Cột của EXECUTE khớp theo vị trí với statement gốc (giữ result types + ORM entities)
+            execute_stmt = self.statement.from_statement(
+                text(execute_sql).columns(*self.statement.selected_columns)
+            )
+            self._pg = (prepare_sql, execute_stmt, defaults)
+
+        prepare_sql, execute_stmt, defaults = self._pg
+        # Prepared statement sống theo DBAPI connection (qua commit/rollback), info sống cùng nó
+        prepared = conn.connection.info.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            conn.exec_driver_sql(prepare_sql)
+            prepared.add(self.name)
+        return execute_stmt, defaults
+
+
+def registered_queries() -> Dict[str, PreparedQuery]:
+    return dict(_registry)
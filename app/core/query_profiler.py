@@ -0,0 +1,165 @@
+"""
+Per-request SQL profiling (opt-in: QUERY_PROFILING_ENABLED=true)
+
+SQLAlchemy engine events đếm số statements, tổng DB time và giữ lại các
+statements chậm nhất cho request hiện tại (contextvar do LoggingMiddleware set).
+Cùng một statement (đã parametrize) chạy >= ngưỡng trong một request được
+coi là dấu hiệu N+1 (vd: lazy load User.sales / SalesData.store trong vòng lặp).
+"""
+
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+
+logger = get_logger("query_profiler")
+
+_current_profile: ContextVar[Optional["QueryProfile"]] = ContextVar("query_profile", default=None)
+
+
+@dataclass
+class QueryProfile:
+    count: int = 0
+    total_ms: float = 0.0
+    slowest: list = field(default_factory=list)  # [(ms, statement)] sort giảm dần
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] += 1
+        self.slowest.append((elapsed_ms, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[settings.query_profiling_slowest:]
+
+    def n_plus_one_candidates(self) -> list:
+        threshold = settings.query_profiling_n_plus_one_threshold
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+    def slowest_statements(self) -> list:
+        return [{"ms": round(ms, 2), "sql": _shorten(statement)} for ms, statement in self.slowest]
+
+
+class _QueryMetrics:
+    """Aggregate toàn process, expose qua /health/metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.queries = 0
+        self.db_time_ms = 0.0
+        self.n_plus_one_warnings = 0
+        self.per_route = {}
+
+    def observe(self, route: str, profile: QueryProfile, n_plus_one: bool):
+        with self._lock:
+            self.requests += 1
+            self.queries += profile.count
+            self.db_time_ms += profile.total_ms
+            self.n_plus_one_warnings += int(n_plus_one)
+            stats = self.per_route.setdefault(route, {"requests": 0, "queries": 0, "db_time_ms": 0.0})
+            stats["requests"] += 1
+            stats["queries"] += profile.count
+            stats["db_time_ms"] += profile.total_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": settings.query_profiling_enabled,
+                "profiled_requests": self.requests,
+                "queries_total": self.queries,
+                "db_time_ms_total": round(self.db_time_ms, 2),
+                "n_plus_one_warnings": self.n_plus_one_warnings,
+                "per_route": {
+                    route: {
+                        "requests": stats["requests"],
+                        "avg_queries": round(stats["queries"] / stats["requests"], 2),
+                        "avg_db_time_ms": round(stats["db_time_ms"] / stats["requests"], 2),
+                    }
+                    for route, stats in self.per_route.items()
+                },
+            }
+
+
+query_metrics = _QueryMetrics()
+
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, (time.perf_counter() - start) * 1000)
+
+
+def _handle_error(context):
+    # Statement lỗi không có after_cursor_execute: bỏ start time của nó khỏi stack của connection
+    # (execution_context None: lỗi trước khi statement tới cursor, chưa có gì để bỏ)
+    conn = context.connection
+    if context.execution_context is not None and conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def install_query_profiler(engine: Engine):
+    """Đăng ký engine events - gọi một lần khi tạo engine"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def start_profile() -> QueryProfile:
+    profile = QueryProfile()
+    _current_profile.set(profile)
+    return profile
+
+
+def finish_profile(profile: QueryProfile, request_id: str, route: str) -> dict:
+    """Log kết quả, cập nhật metrics, trả về fields cho structured log"""
+    candidates = profile.n_plus_one_candidates()
+    query_metrics.observe(route, profile, bool(candidates))
+
+    if candidates:
+        logger.warning(
+            "Possible N+1 query pattern detected",
+            request_id=request_id,
+            route=route,
+            repeated_statements=[
+                {"sql": _shorten(statement), "count": count} for statement, count in candidates
+            ],
+        )
+
+    logger.debug(
+        "Request SQL profile",
+        request_id=request_id,
+        route=route,
+        db_query_count=profile.count,
+        db_time_ms=round(profile.total_ms, 2),
+        slowest_statements=profile.slowest_statements(),
+    )
+
+    return {"db_query_count": profile.count, "db_time_ms": round(profile.total_ms, 2)}
+
+
+def profile_headers(profile: QueryProfile) -> dict:
+    return {
+        "X-DB-Query-Count": str(profile.count),
+        "X-DB-Time-Ms": str(round(profile.total_ms, 2)),
+    }
@@ -0,0 +1,111 @@
+"""
+Fan-out analytics updates tới SSE / WebSocket clients của worker hiện tại.
+
+Mỗi worker chỉ có một Redis pub/sub subscription. Khi có event (insert sales
+data), broadcaster đợi `live_coalesce_ms` để gom các insert liên tiếp, build
+snapshot một lần từ Redis counters rồi đẩy cùng payload tới mọi client.
+Chi phí mỗi update không phụ thuộc số clients (ngoài việc ghi socket).
+
+Queue của mỗi client chỉ giữ update mới nhất: client chậm bỏ qua update
+trung gian thay vì làm phình memory.
+"""
+
+import asyncio
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import create_async_redis
+
+logger = get_logger("realtime")
+
+
+class LiveAnalyticsBroadcaster:
+    """
+    channel: Redis pub/sub channel báo có thay đổi
+    build_snapshot: hàm sync trả về payload bytes (chạy trong threadpool)
+    prepare: hàm sync chạy một lần trước khi listen (vd: khởi tạo counters)
+    """
+
+    def __init__(self, channel: str, build_snapshot: Callable[[], bytes], prepare: Callable[[], object] = None):
+        self.channel = channel
+        self.build_snapshot = build_snapshot
+        self.prepare = prepare
+        self._subscribers = set()
+        self._latest: Optional[bytes] = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Queue nhận snapshot bytes; snapshot hiện tại được gửi ngay khi subscribe"""
+        await self._ensure_started()
+        if self._latest is None:
+            self._latest = await run_in_threadpool(self.build_snapshot)
+        queue = asyncio.Queue(maxsize=1)
+        queue.put_nowait(self._latest)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, payload: bytes):
+        self._latest = payload
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(payload)
+
+    async def _ensure_started(self):
+        async with self._start_lock:
+            if self._task is not None and not self._task.done():
+                return
+            if self.prepare is not None:
+                await run_in_threadpool(self.prepare)
+            self._latest = None
+            self._task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            client = create_async_redis()
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                logger.info("Live analytics listener subscribed", channel=self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+                    if message is None:
+                        continue
+                    # Gom các event tới trong cửa sổ coalesce thành một update
+                    await asyncio.sleep(settings.live_coalesce_ms / 1000)
+                    while await pubsub.get_message(ignore_subscribe_messages=True, timeout=0):
+                        pass
+                    if self._subscribers:
+                        self.publish(await run_in_threadpool(self.build_snapshot))
+                    else:
+                        # Không ai nghe: bỏ snapshot cũ, subscriber sau sẽ build mới
+                        self._latest = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Live analytics listener error, reconnecting", error=str(e))
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+                await client.close()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
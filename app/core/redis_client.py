@@ -1,10 +1,57 @@
-import os
+from functools import lru_cache
+
 import redis
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.core.config import settings
+
+
+@lru_cache
+def get_redis() -> redis.Redis:
+    """Redis client được tạo lần đầu khi cần, không phải lúc import"""
+    return redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+
+
+@lru_cache
+def get_redis_bytes() -> redis.Redis:
+    """Client không decode responses - cho payload nhị phân (vd: compressed variants)"""
+    return redis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=False,
+    )
+
+
+def create_async_redis():
+    """Client asyncio mới (vd: pub/sub listener) - caller tự đóng"""
+    from redis import asyncio as aioredis
+
+    return aioredis.Redis(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=settings.redis_db,
+        decode_responses=True,
+    )
+
+
+def close_redis():
+    """Đóng connection pool khi shutdown"""
+    for factory in (get_redis, get_redis_bytes):
+        if factory.cache_info().currsize:
+            factory().close()
+            factory.cache_clear()
+
+
+class _LazyRedis:
+    """Proxy giữ API `r.get(...)` cũ nhưng chỉ tạo client ở lần dùng đầu tiên"""
+
+    def __getattr__(self, name):
+        return getattr(get_redis(), name)
 
-redis_host = os.getenv("REDIS_HOST", "localhost")
-redis_port = int(os.getenv("REDIS_PORT", 6379))
 
-r = redis.Redis(host=redis_host, port=redis_port, db = 0, decode_responses=True)
+r = _LazyRedis()
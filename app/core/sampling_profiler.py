@@ -0,0 +1,103 @@
+"""
+Sampling profiler in-process (không cần restart worker, không cần package ngoài)
+
+Background thread đọc sys._current_frames() mỗi `interval` và đếm từng call
+stack. Kết quả ở dạng folded/collapsed stacks ("frame;frame;frame count") -
+đưa thẳng vào flamegraph.pl, speedscope hoặc inferno để vẽ flame graph.
+
+Samples của thread đang ngồi chờ (threadpool idle, event loop select) bị bỏ
+qua để profile chỉ chứa thời gian thật sự làm việc. Profile là của cả
+worker process: request khác chạy song song trên cùng worker cũng xuất hiện.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Leaf frames của thread idle - bỏ qua
+_IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+# Chỉ cho một profiler chạy tại một thời điểm trong mỗi worker
+_active_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FUNCTIONS
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not _active_lock.acquire(blocking=False):
+            raise ProfilerBusyError("Another profile is already running in this worker")
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self.duration = time.perf_counter() - self.started_at
+            _active_lock.release()
+            self._thread = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or _is_idle(frame):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def folded(self) -> str:
+        """Collapsed stacks, stack nóng nhất trước"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> dict:
+        return {
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "duration_s": round(self.duration, 3),
+            "interval_ms": round(self.interval * 1000, 2),
+        }
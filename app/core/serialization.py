@@ -0,0 +1,29 @@
+import orjson
+from fastapi.responses import Response
+
+# numpy scalars (từ pandas aggregations) và dict key không phải str vẫn serialize được
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(data) -> bytes:
+    """Serialize cho Redis cache payloads và response bodies"""
+    return orjson.dumps(data, option=_ORJSON_OPTIONS)
+
+
+def loads(data):
+    """Deserialize payload từ Redis (str hoặc bytes)"""
+    return orjson.loads(data)
+
+
+def to_bytes(data) -> bytes:
+    """Redis client dùng decode_responses=True nên cache hit trả về str"""
+    return data.encode() if isinstance(data, str) else data
+
+
+class RawJSONResponse(Response):
+    """
+    Response cho JSON đã serialize sẵn (vd: cache hit).
+    Trả thẳng bytes, không qua response_model validation / re-encode.
+    """
+
+    media_type = "application/json"
@@ -0,0 +1,81 @@
+"""
+Toán học cho approximate analytics (không I/O).
+
+- Quantile sketch kiểu DDSketch: giá trị x > 0 rơi vào bucket ceil(log_γ x)
+  với γ = (1 + α) / (1 - α). Quantile trả về có sai số tương đối <= α,
+  buckets là counters nên lưu được trong Redis hash (HINCRBY) và merge được.
+- Ước lượng SUM từ Bernoulli/TABLESAMPLE sample (Horvitz-Thompson) kèm
+  khoảng tin cậy theo phân phối chuẩn.
+- HyperLogLog của Redis (PFADD/PFCOUNT) có standard error 0.81%.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+HLL_STANDARD_ERROR = 0.0081
+Z_95 = 1.96
+
+# Giá trị <= ngưỡng này (vd: revenue 0) đếm riêng trong bucket "z"
+ZERO_BUCKET = "z"
+MIN_POSITIVE_VALUE = 1e-9
+
+
+def gamma(relative_accuracy: float) -> float:
+    return (1 + relative_accuracy) / (1 - relative_accuracy)
+
+
+def bucket_index(value: float, relative_accuracy: float) -> str:
+    if value <= MIN_POSITIVE_VALUE:
+        return ZERO_BUCKET
+    return str(math.ceil(math.log(value) / math.log(gamma(relative_accuracy))))
+
+
+def bucket_counts(values: Iterable[float], relative_accuracy: float) -> Dict[str, int]:
+    counts = {}
+    for value in values:
+        index = bucket_index(value, relative_accuracy)
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+
+def _bucket_value(index: str, g: float) -> float:
+    if index == ZERO_BUCKET:
+        return 0.0
+    # Điểm giữa (theo sai số tương đối) của khoảng (γ^(i-1), γ^i]
+    return 2 * g ** int(index) / (g + 1)
+
+
+def quantiles(buckets: Dict[str, int], qs: Iterable[float], relative_accuracy: float) -> Dict[float, Optional[float]]:
+    """Quantiles từ bucket counts (keys là bucket index dạng str như lưu trong Redis)"""
+    items = sorted(
+        ((index, int(count)) for index, count in buckets.items() if int(count) > 0),
+        key=lambda item: -math.inf if item[0] == ZERO_BUCKET else int(item[0]),
+    )
+    total = sum(count for _, count in items)
+    if not total:
+        return {q: None for q in qs}
+
+    g = gamma(relative_accuracy)
+    result = {}
+    for q in qs:
+        rank = q * (total - 1)
+        seen = 0
+        for index, count in items:
+            seen += count
+            if seen > rank:
+                result[q] = _bucket_value(index, g)
+                break
+    return result
+
+
+def estimate_sum(sample_sum: float, sample_sum_squares: float, fraction: float) -> tuple:
+    """
+    (ước lượng tổng, nửa độ rộng khoảng tin cậy 95%) cho Bernoulli sample với
+    xác suất chọn `fraction`. TABLESAMPLE SYSTEM chọn theo block nên sai số
+    thật có thể lớn hơn nếu dữ liệu trong cùng block tương quan với nhau.
+    """
+    if fraction >= 1:
+        return sample_sum, 0.0
+    estimate = sample_sum / fraction
+    variance = (1 - fraction) / fraction ** 2 * sample_sum_squares
+    return estimate, Z_95 * math.sqrt(variance)
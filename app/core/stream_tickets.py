@@ -0,0 +1,27 @@
+"""
+Stream tickets cho EventSource / WebSocket - browser không gửi được Authorization header.
+
+JWT không bao giờ nằm trong URL (URL bị ghi vào access log, proxy log, history):
+client đổi JWT lấy một ticket ngẫu nhiên qua POST /analytics/stream/ticket rồi
+mở stream với ?ticket=. Ticket sống STREAM_TICKET_TTL_SECONDS giây và chỉ dùng
+được một lần (GETDEL).
+"""
+
+import secrets
+from typing import Optional
+
+from app.core.config import settings
+from app.core.redis_client import r
+
+TICKET_KEY_PREFIX = "stream:ticket"
+
+
+def issue_ticket(subject: str) -> str:
+    ticket = secrets.token_urlsafe(32)
+    r.set(f"{TICKET_KEY_PREFIX}:{ticket}", subject, ex=settings.stream_ticket_ttl_seconds)
+    return ticket
+
+
+def redeem_ticket(ticket: str) -> Optional[str]:
+    """Subject của ticket (email), None nếu sai/hết hạn/đã dùng"""
+    return r.getdel(f"{TICKET_KEY_PREFIX}:{ticket}")
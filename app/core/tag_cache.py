@@ -0,0 +1,98 @@
+"""
+Tagged cache invalidation cho analytics.
+
+Mỗi tag có một generation counter trong Redis:
+
+- "global": analytics:generation (cũng là version của ETag, xem http_cache)
+- "store:<id>", "date:<YYYY-MM-DD>": analytics:generation:<tag>, hết hạn sau
+  TAG_TTL_SECONDS không bị ghi (TTL được làm mới mỗi lần bump)
+
+Cache key chứa version = tổng generation các tag mà kết quả phụ thuộc vào.
+Ghi sales data INCR đúng các tag bị ảnh hưởng trong một pipeline, nên
+invalidation là O(số tag bị ghi) bất kể có bao nhiêu biến thể cache; entry cũ
+không bao giờ được đọc lại và tự hết hạn theo TTL. Counters chỉ tăng nên tổng
+chỉ tăng - hai trạng thái khác nhau không thể trùng version. Counter của
+store/ngày chỉ về 0 sau TAG_TTL_SECONDS không bị ghi - lâu hơn nhiều TTL của
+cache entries, nên entry đọc giá trị cũ của nó gần như chắc chắn đã hết hạn.
+"""
+
+import time
+from datetime import date, timedelta
+from typing import Iterable, List, Optional
+
+from app.core.http_cache import GENERATION_KEY, UPDATED_AT_KEY
+from app.core.redis_client import r
+from app.core.timing import span
+
+GLOBAL_TAG = "global"
+# Khoảng ngày dài hơn -> dùng tag global (MGET quá nhiều key không còn rẻ hơn một miss)
+MAX_DATE_TAGS = 62
+# Dài hơn nhiều so với TTL lâu nhất của cache entries (1 giờ) - counters của store/ngày
+# không còn được ghi không nằm mãi trong Redis
+TAG_TTL_SECONDS = 7 * 24 * 3600
+
+
+def tag_key(tag: str) -> str:
+    return GENERATION_KEY if tag == GLOBAL_TAG else f"{GENERATION_KEY}:{tag}"
+
+
+def store_tag(store_id: int) -> str:
+    return f"store:{store_id}"
+
+
+def date_tag(day: date) -> str:
+    return f"date:{day.isoformat()}"
+
+
+def sales_tags(rows: Iterable[tuple]) -> set:
+    """Tags bị ảnh hưởng bởi các rows (user_id, store_id, date, ...) vừa ghi - luôn gồm global"""
+    tags = {GLOBAL_TAG}
+    for _, store_id, day, *_ in rows:
+        tags.update((store_tag(store_id), date_tag(day)))
+    return tags
+
+
+def bump_tags(tags: Iterable[str]) -> int:
+    """INCR mỗi tag và làm mới TTL của nó (một round trip). Trả về global generation mới"""
+    tags = set(tags) | {GLOBAL_TAG}
+    pipe = r.pipeline()
+    pipe.incr(GENERATION_KEY)
+    pipe.set(UPDATED_AT_KEY, int(time.time()))
+    for tag in sorted(tags - {GLOBAL_TAG}):
+        pipe.incr(tag_key(tag))
+        pipe.expire(tag_key(tag), TAG_TTL_SECONDS)
+    return pipe.execute()[0]
+
+
+def scope_tags(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+) -> List[str]:
+    """
+    Tags đủ để phát hiện mọi lần ghi ảnh hưởng tới query có các filter này.
+    Mọi row khớp filter đều bump tag store/date của nó, nên một chiều là đủ
+    - chọn chiều hẹp nhất có.
+    """
+    if store_id is not None:
+        return [store_tag(store_id)]
+    if start_date and end_date and 0 <= (end_date - start_date).days < MAX_DATE_TAGS:
+        return [date_tag(start_date + timedelta(days=offset)) for offset in range((end_date - start_date).days + 1)]
+    return [GLOBAL_TAG]
+
+
+def tag_versions(tag_lists: List[List[str]]) -> List[int]:
+    """tag_version cho nhiều queries trong một MGET (hợp các tags)"""
+    keys = sorted({tag for tags in tag_lists for tag in tags})
+    if not keys:
+        return [0] * len(tag_lists)
+    with span("redis"):
+        values = dict(zip(keys, r.mget([tag_key(tag) for tag in keys])))
+    return [sum(int(values[tag] or 0) for tag in tags) for tags in tag_lists]
+
+
+def tag_version(tags: List[str], generation: Optional[int] = None) -> int:
+    """Tổng generation của tags. `generation` (global, đã đọc cho ETag) tránh thêm một round trip"""
+    if tags == [GLOBAL_TAG] and generation is not None:
+        return generation
+    return tag_versions([tags])[0]
@@ -0,0 +1,63 @@
+"""
+Quota theo tenant cho analytics queries nặng, dùng chung giữa các workers qua Redis.
+
+- Rate: fixed window theo phút (INCR tenant:<id>:quota:rate:<window>)
+- Concurrency: counter số queries đang chạy (INCR khi vào, DECR khi ra). Counter
+  có TTL để slot của worker chết giữa chừng không bị giữ mãi.
+
+Chỉ bọc phần tính toán khi cache miss - cache hit không tốn quota, nên tenant
+nặng chỉ tự làm chậm chính mình.
+"""
+
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.core.redis_client import r
+from app.core.timing import span
+
+RATE_WINDOW_SECONDS = 60
+
+
+class QuotaExceededError(Exception):
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _rate_key(tenant_id: int, window: int) -> str:
+    return f"tenant:{tenant_id}:quota:rate:{window}"
+
+
+def _running_key(tenant_id: int) -> str:
+    return f"tenant:{tenant_id}:quota:running"
+
+
+@contextmanager
+def tenant_query_slot(tenant_id: int):
+    """Giữ một slot query của tenant, raise QuotaExceededError nếu vượt rate/concurrency"""
+    now = time.time()
+    window = int(now // RATE_WINDOW_SECONDS)
+    rate_key = _rate_key(tenant_id, window)
+    running_key = _running_key(tenant_id)
+
+    with span("redis"):
+        pipe = r.pipeline(transaction=False)
+        pipe.incr(rate_key)
+        pipe.expire(rate_key, RATE_WINDOW_SECONDS)
+        pipe.incr(running_key)
+        pipe.expire(running_key, settings.tenant_query_slot_ttl)
+        rate, _, running, _ = pipe.execute()
+
+    if rate > settings.tenant_queries_per_minute or running > settings.tenant_max_concurrent_queries:
+        r.decr(running_key)
+        if rate > settings.tenant_queries_per_minute:
+            retry_after = max(1, int((window + 1) * RATE_WINDOW_SECONDS - now))
+            raise QuotaExceededError("Analytics query rate limit exceeded for this tenant", retry_after)
+        raise QuotaExceededError("Too many concurrent analytics queries for this tenant", 1)
+
+    try:
+        yield
+    finally:
+        r.decr(running_key)
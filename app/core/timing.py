@@ -0,0 +1,57 @@
+"""
+Named timing spans cho từng request (auth, redis, db, serialize, ...)
+
+LoggingMiddleware tạo RequestTimings trong contextvar; code ở các tầng dưới
+bọc từng stage bằng `with span("db"):`. Kết quả được emit thành header
+Server-Timing và structured log fields. Ngoài request (ETL, scripts) span() là no-op.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_current_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.spans = {}  # name -> [total_ms, count], giữ thứ tự stage đầu tiên xuất hiện
+
+    def add(self, name: str, elapsed_ms: float):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += elapsed_ms
+        entry[1] += 1
+
+    def as_log_fields(self) -> dict:
+        return {name: round(total_ms, 2) for name, (total_ms, _) in self.spans.items()}
+
+    def server_timing_header(self, total_ms: float, extra: Optional[dict] = None) -> str:
+        """auth;dur=0.52, redis;dur=0.31;desc="2 calls", ..., total;dur=4.2"""
+        parts = []
+        for name, (elapsed_ms, count) in self.spans.items():
+            desc = f';desc="{count} calls"' if count > 1 else ""
+            parts.append(f"{name};dur={elapsed_ms:.2f}{desc}")
+        for name, (elapsed_ms, desc) in (extra or {}).items():
+            parts.append(f'{name};dur={elapsed_ms:.2f};desc="{desc}"')
+        parts.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(parts)
+
+
+def start_timings() -> RequestTimings:
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(name: str):
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
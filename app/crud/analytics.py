@@ -1,99 +1,162 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import bindparam, func, select
 from app.models.models import SalesData
 from app.core.redis_client import r
+from app.core.serialization import dumps, loads, to_bytes
+from typing import Optional
 from app.models.models import User
 from app.core.logging_config import get_logger
-import json
+from app.core.prepared import PreparedQuery
+from app.core.tag_cache import GLOBAL_TAG, tag_version
+from app.core.timing import span
+from app.crud import leaderboard
 import time
 
 logger = get_logger("analytics_crud")
 
-def get_summary(db: Session):
+SUMMARY_QUERY = PreparedQuery(
+    "analytics_summary",
+    select(
+        func.sum(SalesData.revenue).label("total_revenue"),
+        func.sum(SalesData.ad_spend).label("total_ad_spend"),
+    ),
+)
+TOP_USERS_QUERY = PreparedQuery(
+    "analytics_top_users",
+    select(
+        User.id.label("user_id"),
+        User.email,
+        func.sum(SalesData.revenue).label("total_revenue"),
+    )
+    .join(SalesData, SalesData.user_id == User.id)
+    .group_by(User.id, User.email)
+    .order_by(func.sum(SalesData.revenue).desc())
+    .limit(bindparam("limit")),
+)
+
+def summary_cache_key(generation: int) -> str:
+    # Key theo global generation: mỗi lần ghi sales data tự sang key mới
+    return f"analytics:summary:g{generation}"
+
+def compute_summary(db: Session) -> dict:
+    with span("db"):
+        result = SUMMARY_QUERY.execute(db).first()
+
+    total_revenue = result.total_revenue or 0
+    total_ad_spend = result.total_ad_spend or 0
+    roas = (total_revenue / total_ad_spend) if total_ad_spend > 0 else 0
+    return {
+        "total_revenue": total_revenue,
+        "total_ad_spend": total_ad_spend,
+        "roas": round(roas, 2),
+    }
+
+def get_summary_json(db: Session, generation: Optional[int] = None) -> bytes:
+    """Summary dạng JSON bytes - cache hit trả thẳng payload từ Redis, không decode"""
     start_time = time.time()
-    cache_key = "analytics:summary"
+    cache_key = summary_cache_key(tag_version([GLOBAL_TAG], generation))
 
     # Kiểm tra cache
-    cached_data = r.get(cache_key)
+    with span("redis"):
+        cached_data = r.get(cache_key)
     if cached_data:
         query_time = round((time.time() - start_time) * 1000, 2)
         logger.info("Analytics summary cache hit",
                    cache_key=cache_key,
                    query_time_ms=query_time)
-        return json.loads(cached_data)
+        return to_bytes(cached_data)
 
     logger.info("Analytics summary cache miss, querying database", cache_key=cache_key)
 
     # khong co cache thi query tu db
-    result = db.query(
-        func.sum(SalesData.revenue).label("total_revenue"),
-        func.sum(SalesData.ad_spend).label("total_ad_spend"),
-    ).first()
-
-    total_revenue = result.total_revenue or 0
-    total_ad_spend = result.total_ad_spend or 0
-    roas = (total_revenue / total_ad_spend) if total_ad_spend > 0 else 0
-
-    summary = {
-        "total_revenue": total_revenue,
-        "total_ad_spend": total_ad_spend,
-        "roas": round(roas, 2),
-    }
+    summary = compute_summary(db)
+    with span("serialize"):
+        payload = dumps(summary)
 
     # ghi vao redis cache trong 60s
-    r.setex(cache_key, 60, json.dumps(summary))
+    with span("redis"):
+        r.setex(cache_key, 60, payload)
     query_time = round((time.time() - start_time) * 1000, 2)
 
     logger.info("Analytics summary computed and cached",
                cache_key=cache_key,
-               total_revenue=total_revenue,
-               total_ad_spend=total_ad_spend,
-               roas=round(roas, 2),
+               total_revenue=summary["total_revenue"],
+               total_ad_spend=summary["total_ad_spend"],
+               roas=summary["roas"],
                query_time_ms=query_time,
                cache_ttl_seconds=60)
 
-    return summary
+    return payload
 
-def get_top_users(db: Session, limit: int = 3):
+def get_summary(db: Session):
+    return loads(get_summary_json(db))
+
+TOP_USERS_DEFAULT_LIMIT = 3
+
+def top_users_cache_key(generation: int, limit: int) -> str:
+    return f"analytics:top_users:g{generation}:limit={limit}"
+
+def leaderboard_top_users(limit: int) -> Optional[list]:
+    """Top users từ leaderboard all-time (Redis sorted set), None nếu leaderboard chưa build"""
+    with span("redis"):
+        if not leaderboard.is_ready():
+            return None
+        entries = leaderboard.top(leaderboard.ALL_TIME_KEY, limit)
+    return [
+        {"user_id": e["user_id"], "email": e["email"], "total_revenue": e["total_revenue"]}
+        for e in entries
+    ]
+
+def compute_top_users(db: Session, limit: int) -> list:
+    with span("db"):
+        result = TOP_USERS_QUERY.execute(db, limit=limit).all()
+
+    return [
+        {
+            "user_id": row.user_id,
+            "email": row.email,
+            "total_revenue": round(row.total_revenue, 2)
+        }
+        for row in result
+    ]
+
+def get_top_users_json(db: Session, limit: int = TOP_USERS_DEFAULT_LIMIT, generation: Optional[int] = None) -> bytes:
+    """
+    Top users dạng JSON bytes. Đọc từ leaderboard all-time (Redis sorted set)
+    nếu đã build, ngược lại fallback query DB + cache theo global generation và limit.
+    """
     start_time = time.time()
-    cache_key = "analytics:top_users"
 
-    cached_data = r.get(cache_key)
+    entries = leaderboard_top_users(limit)
+    if entries is not None:
+        with span("serialize"):
+            payload = dumps(entries)
+        logger.info("Top users served from leaderboard",
+                   limit=limit,
+                   query_time_ms=round((time.time() - start_time) * 1000, 2))
+        return payload
+
+    cache_key = top_users_cache_key(tag_version([GLOBAL_TAG], generation), limit)
+    with span("redis"):
+        cached_data = r.get(cache_key)
     if cached_data:
         query_time = round((time.time() - start_time) * 1000, 2)
         logger.info("Top users cache hit",
                    cache_key=cache_key,
                    limit=limit,
                    query_time_ms=query_time)
-        return json.loads(cached_data)
+        return to_bytes(cached_data)
 
     logger.info("Top users cache miss, querying database",
                cache_key=cache_key,
                limit=limit)
 
-    result = (
-        db.query(
-            User.id.label('user_id'),
-            User.email,
-            func.sum(SalesData.revenue).label("total_revenue")
-        )
-        .join(SalesData, SalesData.user_id == User.id)
-        .group_by(User.id, User.email)
-        .order_by(func.sum(SalesData.revenue).desc())
-        .limit(limit)
-        .all()
-    )
+    top_users = compute_top_users(db, limit)
+    with span("serialize"):
+        payload = dumps(top_users)
 
-    top_users = [
-        {
-            "user_id": row.user_id,
-            "email": row.email,
-            "total_revenue": round(row.total_revenue, 2)
-        }
-        for row in result
-    ]
-
-    r.setex(cache_key, 60, json.dumps(top_users))
+    with span("redis"):
+        r.setex(cache_key, 60, payload)
     query_time = round((time.time() - start_time) * 1000, 2)
 
     logger.info("Top users computed and cached",
@@ -104,4 +167,37 @@ def get_top_users(db: Session, limit: int = 3):
                cache_ttl_seconds=60,
                top_user_revenue=top_users[0]["total_revenue"] if top_users else 0)
 
-    return top_users
+    return payload
+
+def get_top_users(db: Session, limit: int = TOP_USERS_DEFAULT_LIMIT):
+    return loads(get_top_users_json(db, limit))
+
+PREFECT_CACHE_KEYS = {
+    "summary": "analytics:summary_prefect",
+    "monthly_trends": "analytics:monthly_trends",
+    "top_users": "analytics:top_users_prefect",
+}
+PREFECT_UPDATED_AT_KEY = "analytics:prefect_updated_at"
+
+def build_prefect_analytics_json(
+    summary: Optional[bytes],
+    monthly_trends: Optional[bytes],
+    top_users: Optional[bytes],
+    updated_at: str,
+) -> bytes:
+    """
+    Ghép response /prefect/analytics/cached từ các payload đã serialize sẵn
+    (không decode). Cùng input -> cùng bytes, nên compressed variants dùng lại được.
+    """
+    parts = [
+        b'"' + name.encode() + b'":' + to_bytes(payload)
+        for name, payload in (
+            ("summary", summary),
+            ("monthly_trends", monthly_trends),
+            ("top_users", top_users),
+        )
+        if payload
+    ]
+    parts.append(b'"data_source":"prefect_etl_pipeline"')
+    parts.append(b'"last_updated":' + dumps(updated_at))
+    return b"{" + b",".join(parts) + b"}"
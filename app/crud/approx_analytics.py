@@ -0,0 +1,217 @@
+"""
+Approximate analytics (opt-in `?approx=true`) cho dataset rất lớn.
+
+- Tổng revenue/ad_spend: scan một sample (TABLESAMPLE SYSTEM trên PostgreSQL,
+  Bernoulli filter bằng random() trên SQLite) rồi scale lên, kèm khoảng tin cậy 95%.
+- Distinct active users/stores: HyperLogLog trong Redis (PFADD trên insert path).
+- Percentiles revenue mỗi order: quantile sketch (DDSketch) trong Redis hash.
+
+Sketches được cập nhật cùng MULTI/EXEC với live counters (record_sales) và
+rebuild cùng rebuild_live_counters.
+
+Chỉ cho /analytics/summary: top users đã exact từ leaderboard (Redis), còn
+distribution cần group theo store/user trong khoảng ngày - sketches global ở
+đây không trả lời được.
+"""
+
+import time
+
+from sqlalchemy import func, select, tablesample
+from sqlalchemy.orm import Session
+
+from app.core import sketches
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, loads, to_bytes
+from app.core.timing import span
+from app.models.models import SalesData
+
+logger = get_logger("approx_analytics")
+
+HLL_USERS_KEY = "analytics:hll:active_users"
+HLL_STORES_KEY = "analytics:hll:active_stores"
+READY_KEY = "analytics:sketch:ready"
+SUMMARY_CACHE_PREFIX = "analytics:summary_approx"
+PERCENTILES = (0.5, 0.95, 0.99)
+
+REBUILD_BATCH_SIZE = 50_000
+
+
+def revenue_sketch_key() -> str:
+    # Bucket mapping phụ thuộc α - đổi α thì dùng key mới (cần rebuild)
+    return f"analytics:sketch:revenue:a{settings.approx_quantile_relative_accuracy}"
+
+
+def add_sales(pipe, rows):
+    """Thêm PFADD/HINCRBY cho các sales (user_id, store_id, revenue) vào pipeline của caller"""
+    rows = list(rows)
+    if not rows:
+        return
+    pipe.pfadd(HLL_USERS_KEY, *{user_id for user_id, _, _ in rows})
+    pipe.pfadd(HLL_STORES_KEY, *{store_id for _, store_id, _ in rows})
+    buckets = sketches.bucket_counts(
+        (revenue for _, _, revenue in rows), settings.approx_quantile_relative_accuracy
+    )
+    sketch_key = revenue_sketch_key()
+    for index, count in buckets.items():
+        pipe.hincrby(sketch_key, index, count)
+
+
+def rebuild_sketches(db: Session) -> dict:
+    """Tính lại HLL + quantile sketch từ DB (stream cột revenue theo batch), ghi đè atomically"""
+    start_time = time.time()
+    relative_accuracy = settings.approx_quantile_relative_accuracy
+    user_ids = db.execute(select(SalesData.user_id).distinct()).scalars().all()
+    store_ids = db.execute(select(SalesData.store_id).distinct()).scalars().all()
+
+    buckets = {}
+    result = db.execute(select(SalesData.revenue).execution_options(yield_per=REBUILD_BATCH_SIZE))
+    for revenues in result.scalars().partitions():
+        for index, count in sketches.bucket_counts(revenues, relative_accuracy).items():
+            buckets[index] = buckets.get(index, 0) + count
+
+    sketch_key = revenue_sketch_key()
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(HLL_USERS_KEY, HLL_STORES_KEY, sketch_key)
+    if user_ids:
+        pipe.pfadd(HLL_USERS_KEY, *user_ids)
+    if store_ids:
+        pipe.pfadd(HLL_STORES_KEY, *store_ids)
+    if buckets:
+        pipe.hset(sketch_key, mapping=buckets)
+    pipe.set(READY_KEY, int(time.time()))
+    pipe.execute()
+
+    stats = {
+        "sketch_buckets": len(buckets),
+        "sketch_rebuild_time_ms": round((time.time() - start_time) * 1000, 2),
+    }
+    logger.info("Approximate analytics sketches rebuilt", **stats)
+    return stats
+
+
+def is_ready() -> bool:
+    return bool(r.exists(READY_KEY))
+
+
+def _sampled_totals(db: Session) -> dict:
+    percent = settings.approx_sample_percent
+    if db.get_bind().dialect.name == "postgresql":
+        source = tablesample(SalesData, func.system(percent))
+        method = "tablesample_system"
+        condition = None
+    else:
+        # SQLite không có TABLESAMPLE: Bernoulli filter (vẫn scan, chỉ để dev/test)
+        source = SalesData.__table__
+        method = "bernoulli_random"
+        condition = func.abs(func.random() % 1_000_000) < percent * 10_000
+
+    columns = source.c
+    query = select(
+        func.count(),
+        func.coalesce(func.sum(columns.revenue), 0),
+        func.coalesce(func.sum(columns.revenue * columns.revenue), 0),
+        func.coalesce(func.sum(columns.ad_spend), 0),
+        func.coalesce(func.sum(columns.ad_spend * columns.ad_spend), 0),
+    ).select_from(source)
+    if condition is not None:
+        query = query.where(condition)
+
+    rows, revenue, revenue_sq, ad_spend, ad_spend_sq = db.execute(query).one()
+    fraction = percent / 100
+    revenue_estimate, revenue_bound = sketches.estimate_sum(float(revenue), float(revenue_sq), fraction)
+    ad_spend_estimate, ad_spend_bound = sketches.estimate_sum(float(ad_spend), float(ad_spend_sq), fraction)
+    return {
+        "method": method,
+        "sample_percent": percent,
+        "sample_rows": rows,
+        "total_revenue": revenue_estimate,
+        "total_revenue_bound": revenue_bound,
+        "total_ad_spend": ad_spend_estimate,
+        "total_ad_spend_bound": ad_spend_bound,
+    }
+
+
+def compute_approx_summary(db: Session) -> dict:
+    """Summary xấp xỉ + distinct counts + percentiles, kèm error bounds (không cache)"""
+    with span("db"):
+        totals = _sampled_totals(db)
+
+    if totals["sample_rows"] < settings.approx_min_sample_rows:
+        # Bảng nhỏ: sample không đủ tin cậy và exact cũng rẻ
+        from app.crud.analytics import get_summary_json
+
+        exact = loads(get_summary_json(db))
+        totals.update({
+            "method": "exact",
+            "total_revenue": exact["total_revenue"],
+            "total_revenue_bound": 0.0,
+            "total_ad_spend": exact["total_ad_spend"],
+            "total_ad_spend_bound": 0.0,
+        })
+
+    if not is_ready():
+        from app.crud.live_analytics import ensure_live_counters
+
+        ensure_live_counters()
+
+    with span("redis"):
+        pipe = r.pipeline(transaction=False)
+        pipe.pfcount(HLL_USERS_KEY)
+        pipe.pfcount(HLL_STORES_KEY)
+        pipe.hgetall(revenue_sketch_key())
+        distinct_users, distinct_stores, buckets = pipe.execute()
+
+    relative_accuracy = settings.approx_quantile_relative_accuracy
+    percentiles = sketches.quantiles(buckets, PERCENTILES, relative_accuracy)
+    total_revenue = totals["total_revenue"]
+    total_ad_spend = totals["total_ad_spend"]
+
+    return {
+        "total_revenue": round(total_revenue, 2),
+        "total_ad_spend": round(total_ad_spend, 2),
+        "roas": round(total_revenue / total_ad_spend, 2) if total_ad_spend > 0 else 0,
+        "distinct_users": distinct_users,
+        "distinct_stores": distinct_stores,
+        "revenue_percentiles": {
+            f"p{round(q * 100)}": round(value, 2) if value is not None else None
+            for q, value in percentiles.items()
+        },
+        "approximate": True,
+        "error_bounds": {
+            "confidence": 0.95,
+            "total_revenue": round(totals["total_revenue_bound"], 2),
+            "total_ad_spend": round(totals["total_ad_spend_bound"], 2),
+            "distinct_counts_relative_std_error": sketches.HLL_STANDARD_ERROR,
+            "percentiles_relative_error": relative_accuracy,
+        },
+        "sampling": {
+            "method": totals["method"],
+            "sample_percent": totals["sample_percent"],
+            "sample_rows": totals["sample_rows"],
+        },
+    }
+
+
+def get_approx_summary_json(db: Session, generation: int) -> bytes:
+    """compute_approx_summary dạng JSON bytes, cache theo generation nên không cần invalidation riêng"""
+    start_time = time.time()
+    cache_key = f"{SUMMARY_CACHE_PREFIX}:{generation}"
+    with span("redis"):
+        cached_data = r.get(cache_key)
+    if cached_data:
+        return to_bytes(cached_data)
+
+    summary = compute_approx_summary(db)
+    with span("serialize"):
+        payload = dumps(summary)
+    with span("redis"):
+        r.setex(cache_key, 60, payload)
+
+    logger.info("Approximate summary computed and cached",
+               cache_key=cache_key,
+               method=summary["sampling"]["method"],
+               sample_rows=summary["sampling"]["sample_rows"],
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
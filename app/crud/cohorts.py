@@ -0,0 +1,345 @@
+"""
+Cohort analytics: users nhóm theo tháng của first sale, revenue/activity mỗi tháng sau đó.
+
+Ba bảng compact thay cho self-join trên sales_data:
+
+- user_cohorts: first sale + cohort của mỗi user
+- user_monthly_activity: revenue/ad_spend/orders mỗi (user, tháng)
+- cohort_periods: aggregate mỗi (cohort, period) - đọc cohort matrix là O(cohorts x periods)
+
+record_cohort_sales cập nhật incremental trong cùng transaction với insert sales:
+row lock user_cohorts theo user (writers của cùng user chạy tuần tự), cohort_periods
+được upsert cộng dồn. rebuild_cohorts tính lại toàn bộ từ sales_data (nightly ETL,
+sau bulk load không đi qua API).
+"""
+
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, cast, delete, func, insert, literal_column, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.tag_cache import GLOBAL_TAG, bump_tags, tag_version
+from app.core.timing import span
+from app.crud.distribution import cache_key
+from app.models.models import CohortPeriod, SalesData, UserCohort, UserMonthlyActivity
+
+logger = get_logger("cohort_analytics")
+
+CACHE_TTL_SECONDS = 300
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def months_between(start: date, end: date) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _upsert_insert(db: Session):
+    # INSERT ... ON CONFLICT: PostgreSQL và SQLite (>= 3.24) cùng API
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def _month_expr(dialect: str, column):
+    if dialect == "postgresql":
+        # Literal thay vì bind param: SELECT và GROUP BY phải là cùng một biểu thức
+        return cast(func.date_trunc(literal_column("'month'"), column), Date)
+    return func.date(column, "start of month")
+
+
+def record_cohort_sales(db: Session, rows: Iterable[tuple]):
+    """
+    Cộng các rows (user_id, store_id, date, revenue, ad_spend) vào bảng cohort.
+    Gọi trước commit của insert sales - không commit.
+    """
+    if not settings.cohort_incremental_updates:
+        return
+
+    batch = defaultdict(lambda: [0.0, 0.0, 0])  # (user_id, tháng) -> revenue, ad_spend, orders
+    first_sales = {}
+    for user_id, _store_id, day, revenue, ad_spend, *_ in rows:
+        if user_id is None or day is None:
+            continue
+        totals = batch[(user_id, month_start(day))]
+        totals[0] += revenue or 0
+        totals[1] += ad_spend or 0
+        totals[2] += 1
+        if user_id not in first_sales or day < first_sales[user_id]:
+            first_sales[user_id] = day
+    if not batch:
+        return
+
+    upsert = _upsert_insert(db)
+    user_ids = sorted(first_sales)
+    # User mới: first sale = sale sớm nhất của batch. Insert/lock theo user_id tăng dần tránh deadlock
+    db.execute(
+        upsert(UserCohort).on_conflict_do_nothing(index_elements=["user_id"]),
+        [
+            {"user_id": user_id, "first_sale_date": first_sales[user_id],
+             "cohort_month": month_start(first_sales[user_id])}
+            for user_id in user_ids
+        ],
+    )
+    current = {
+        row.user_id: row
+        for row in db.execute(
+            select(UserCohort.user_id, UserCohort.first_sale_date, UserCohort.cohort_month)
+            .where(UserCohort.user_id.in_(user_ids))
+            .order_by(UserCohort.user_id)
+            .with_for_update()
+        )
+    }
+    activity = {
+        (row.user_id, row.month): row
+        for row in db.execute(
+            select(
+                UserMonthlyActivity.user_id,
+                UserMonthlyActivity.month,
+                UserMonthlyActivity.revenue,
+                UserMonthlyActivity.ad_spend,
+                UserMonthlyActivity.orders,
+            ).where(UserMonthlyActivity.user_id.in_(user_ids))
+        )
+    }
+
+    deltas = defaultdict(lambda: [0, 0.0, 0.0, 0])  # (cohort, period) -> active_users, revenue, ad_spend, orders
+
+    def add(cohort: date, month: date, active_users: int, revenue: float, ad_spend: float, orders: int):
+        delta = deltas[(cohort, months_between(cohort, month))]
+        delta[0] += active_users
+        delta[1] += revenue
+        delta[2] += ad_spend
+        delta[3] += orders
+
+    cohort_of = {}
+    emptied = set()
+    for user_id in user_ids:
+        row = current[user_id]
+        cohort_of[user_id] = row.cohort_month
+        if first_sales[user_id] >= row.first_sale_date:
+            continue
+        new_cohort = month_start(first_sales[user_id])
+        db.execute(
+            update(UserCohort)
+            .where(UserCohort.user_id == user_id)
+            .values(first_sale_date=first_sales[user_id], cohort_month=new_cohort)
+        )
+        if new_cohort == row.cohort_month:
+            continue
+        # Sale cũ hơn first sale đã biết (backfill): chuyển các tháng đã ghi của user sang cohort mới
+        for (activity_user, month), existing in activity.items():
+            if activity_user == user_id:
+                add(row.cohort_month, month, -1, -existing.revenue, -existing.ad_spend, -existing.orders)
+                add(new_cohort, month, 1, existing.revenue, existing.ad_spend, existing.orders)
+        cohort_of[user_id] = new_cohort
+        emptied.add(row.cohort_month)
+
+    for (user_id, month), (revenue, ad_spend, orders) in batch.items():
+        # User active lần đầu trong tháng này -> +1 active user của (cohort, period)
+        add(cohort_of[user_id], month, int((user_id, month) not in activity), revenue, ad_spend, orders)
+
+    activity_insert = upsert(UserMonthlyActivity)
+    activity_table = UserMonthlyActivity.__table__
+    db.execute(
+        activity_insert.on_conflict_do_update(
+            index_elements=["user_id", "month"],
+            set_={
+                name: activity_table.c[name] + activity_insert.excluded[name]
+                for name in ("revenue", "ad_spend", "orders")
+            },
+        ),
+        [
+            {"user_id": user_id, "month": month, "revenue": revenue, "ad_spend": ad_spend, "orders": orders}
+            for (user_id, month), (revenue, ad_spend, orders) in sorted(batch.items())
+        ],
+    )
+
+    period_insert = upsert(CohortPeriod)
+    period_table = CohortPeriod.__table__
+    db.execute(
+        period_insert.on_conflict_do_update(
+            index_elements=["cohort_month", "period"],
+            set_={
+                name: period_table.c[name] + period_insert.excluded[name]
+                for name in ("active_users", "revenue", "ad_spend", "orders")
+            },
+        ),
+        [
+            {"cohort_month": cohort, "period": period, "active_users": active_users,
+             "revenue": revenue, "ad_spend": ad_spend, "orders": orders}
+            for (cohort, period), (active_users, revenue, ad_spend, orders) in sorted(deltas.items())
+        ],
+    )
+    if emptied:
+        # Cohort cũ không còn user nào ở period đó
+        db.execute(
+            delete(CohortPeriod).where(CohortPeriod.cohort_month.in_(emptied), CohortPeriod.active_users <= 0)
+        )
+
+
+def rebuild_cohorts(db: Session) -> dict:
+    """Tính lại ba bảng cohort từ sales_data trong một transaction, rồi invalidate analytics cache"""
+    start_time = time.time()
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Writers incremental (chạm user_cohorts trước tiên) chờ rebuild commit rồi cộng tiếp lên
+        # dữ liệu mới; rebuild chờ writers đang chạy commit nên thấy đủ sales của họ
+        db.execute(text("LOCK TABLE user_cohorts IN EXCLUSIVE MODE"))
+
+    db.execute(delete(CohortPeriod))
+    db.execute(delete(UserMonthlyActivity))
+    db.execute(delete(UserCohort))
+
+    month = _month_expr(dialect, SalesData.date)
+    has_owner = (SalesData.user_id.is_not(None), SalesData.date.is_not(None))
+    db.execute(
+        insert(UserMonthlyActivity).from_select(
+            ["user_id", "month", "revenue", "ad_spend", "orders"],
+            select(
+                SalesData.user_id,
+                month,
+                func.coalesce(func.sum(SalesData.revenue), 0),
+                func.coalesce(func.sum(SalesData.ad_spend), 0),
+                func.count(),
+            )
+            .where(*has_owner)
+            .group_by(SalesData.user_id, month),
+        )
+    )
+    first_sale = func.min(SalesData.date)
+    db.execute(
+        insert(UserCohort).from_select(
+            ["user_id", "first_sale_date", "cohort_month"],
+            select(SalesData.user_id, first_sale, _month_expr(dialect, first_sale))
+            .where(*has_owner)
+            .group_by(SalesData.user_id),
+        )
+    )
+    periods = db.execute(
+        select(
+            UserCohort.cohort_month,
+            UserMonthlyActivity.month,
+            func.count(),
+            func.sum(UserMonthlyActivity.revenue),
+            func.sum(UserMonthlyActivity.ad_spend),
+            func.sum(UserMonthlyActivity.orders),
+        )
+        .join(UserMonthlyActivity, UserMonthlyActivity.user_id == UserCohort.user_id)
+        .group_by(UserCohort.cohort_month, UserMonthlyActivity.month)
+    ).all()
+    if periods:
+        db.execute(insert(CohortPeriod), [
+            {"cohort_month": cohort, "period": months_between(cohort, month), "active_users": active_users,
+             "revenue": revenue, "ad_spend": ad_spend, "orders": orders}
+            for cohort, month, active_users, revenue, ad_spend, orders in periods
+        ])
+    users = db.execute(select(func.count()).select_from(UserCohort)).scalar()
+    db.commit()
+    bump_tags([GLOBAL_TAG])
+
+    stats = {
+        "users": users,
+        "cohorts": len({cohort for cohort, *_ in periods}),
+        "cohort_periods": len(periods),
+        "seconds": round(time.time() - start_time, 2),
+    }
+    logger.info("Cohort tables rebuilt", **stats)
+    return stats
+
+
+def _parse_month(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(f"{value}-01") if value else None
+
+
+def compute_cohorts(
+    db: Session,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    max_periods: Optional[int] = None,
+) -> list:
+    """Cohort matrix: mỗi cohort (YYYY-MM) một dãy period 0..n, period không có activity = 0"""
+    filters = []
+    if start_month:
+        filters.append(CohortPeriod.cohort_month >= _parse_month(start_month))
+    if end_month:
+        filters.append(CohortPeriod.cohort_month <= _parse_month(end_month))
+    if max_periods:
+        filters.append(CohortPeriod.period < max_periods)
+    rows = db.execute(
+        select(CohortPeriod).where(*filters).order_by(CohortPeriod.cohort_month, CohortPeriod.period)
+    ).scalars()
+
+    by_cohort = defaultdict(dict)
+    for row in rows:
+        by_cohort[row.cohort_month][row.period] = row
+
+    cohorts = []
+    for cohort, periods in by_cohort.items():
+        # Mọi user của cohort đều active ở period 0 (tháng của first sale)
+        size = periods[0].active_users if 0 in periods else max(row.active_users for row in periods.values())
+        points = []
+        for period in range(max(periods) + 1):
+            row = periods.get(period)
+            active_users = row.active_users if row else 0
+            revenue = row.revenue if row else 0.0
+            points.append({
+                "period": period,
+                "month": add_months(cohort, period).strftime("%Y-%m"),
+                "active_users": active_users,
+                "retention": round(active_users / size, 4) if size else 0,
+                "revenue": round(revenue, 2),
+                "ad_spend": round(row.ad_spend, 2) if row else 0.0,
+                "orders": row.orders if row else 0,
+                "revenue_per_user": round(revenue / size, 2) if size else 0,
+            })
+        cohorts.append({
+            "cohort": cohort.strftime("%Y-%m"),
+            "users": size,
+            "revenue": round(sum(point["revenue"] for point in points), 2),
+            "periods": points,
+        })
+    return cohorts
+
+
+def get_cohorts_json(
+    db: Session,
+    generation: int,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    max_periods: Optional[int] = None,
+) -> bytes:
+    start_time = time.time()
+    key = cache_key(
+        "cohorts", tag_version([GLOBAL_TAG], generation), start=start_month, end=end_month, periods=max_periods
+    )
+    with span("redis"):
+        cached_data = r.get(key)
+    if cached_data:
+        logger.info("Cohort analytics cache hit", cache_key=key)
+        return to_bytes(cached_data)
+
+    with span("db"):
+        result = compute_cohorts(db, start_month, end_month, max_periods)
+    with span("serialize"):
+        payload = dumps(result)
+    with span("redis"):
+        r.setex(key, CACHE_TTL_SECONDS, payload)
+    logger.info("Cohort analytics computed and cached",
+               cache_key=key,
+               cohorts=len(result),
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
@@ -0,0 +1,365 @@
+"""
+Columnar analytics engine - snapshot Parquet của sales_data cho ad-hoc queries nặng.
+
+Export stream bảng sales_data (yield_per, không dựng ORM objects) thành các file
+Parquet nén zstd, partition theo tháng:
+
+    <COLUMNAR_DIR>/sales_data/<snapshot_id>/month=2024-05/part-0.parquet
+
+Rows trong mỗi file sort theo (date, store_id) nên min/max statistics của từng
+row group đủ hẹp để bỏ qua row groups theo date/store. Snapshot mới được ghi vào
+thư mục riêng rồi mới trỏ CURRENT sang (os.replace), reader không bao giờ thấy
+snapshot ghi dở.
+
+Query engine đọc qua pyarrow.dataset với memory-mapping, chỉ đọc các cột cần
+(column pruning), filter date/store/user được đẩy xuống partition (month) và
+row group statistics (predicate pushdown). Aggregate theo từng record batch
+nên bộ nhớ không tăng theo số rows. Monthly trends / ROAS theo user không còn
+chạm PostgreSQL - đổi lại dữ liệu chỉ mới đến lần export gần nhất.
+"""
+
+import functools
+import json
+import operator
+import os
+import shutil
+import time
+from datetime import date, datetime
+from itertools import groupby
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.admission import admit_current
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.timing import span
+from app.crud.distribution import etag_resource
+from app.models.models import SalesData
+
+logger = get_logger("columnar_analytics")
+
+CACHE_PREFIX = "analytics:columnar"
+CACHE_TTL_SECONDS = 3600  # Snapshot bất biến - key đổi theo snapshot_id
+EXPORT_BATCH_SIZE = 50_000
+SCAN_BATCH_SIZE = 256_000
+CURRENT_FILE = "CURRENT"
+META_FILE = "_meta.json"
+COLUMNS = ("id", "date", "user_id", "store_id", "revenue", "ad_spend")
+
+
+class SnapshotNotFoundError(Exception):
+    """Chưa có snapshot nào được export"""
+
+
+def _pyarrow():
+    # pyarrow import nặng (~100ms) - chỉ load khi export/query columnar
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    return pa, pc, ds, pq
+
+
+def _root() -> Path:
+    return Path(settings.columnar_dir) / "sales_data"
+
+
+def _schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("date", pa.date32()),
+        ("user_id", pa.int64()),
+        ("store_id", pa.int64()),
+        ("revenue", pa.float64()),
+        ("ad_spend", pa.float64()),
+    ])
+
+
+def month_of(value: date) -> str:
+    return value.strftime("%Y-%m")
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _write_month(pa, pq, snapshot_dir: Path, month: str, rows: list, writers: dict):
+    writer = writers.get(month)
+    if writer is None:
+        # Rows đã sort theo date nên tháng trước sẽ không xuất hiện lại - đóng writer cũ
+        for previous in writers.values():
+            previous.close()
+        writers.clear()
+        partition_dir = snapshot_dir / f"month={month}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        writer = pq.ParquetWriter(
+            partition_dir / "part-0.parquet",
+            _schema(pa),
+            compression=settings.columnar_compression,
+        )
+        writers[month] = writer
+    columns = list(zip(*rows))
+    batch = pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, _schema(pa))],
+        schema=_schema(pa),
+    )
+    writer.write_table(batch, row_group_size=settings.columnar_row_group_size)
+
+
+def export_snapshot(db: Session, generation: Optional[int] = None) -> dict:
+    """Ghi toàn bộ sales_data thành snapshot Parquet mới và trỏ CURRENT sang nó"""
+    pa, _, _, pq = _pyarrow()
+    start_time = time.time()
+    if generation is None:
+        from app.core.http_cache import get_generation
+
+        generation, _ = get_generation()
+
+    root = _root()
+    snapshot_id = f"g{generation}-{int(start_time)}"
+    snapshot_dir = root / snapshot_id
+    tmp_dir = root / f".tmp-{snapshot_id}-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    query = (
+        select(*(getattr(SalesData, column) for column in COLUMNS))
+        .order_by(SalesData.date, SalesData.store_id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    writers = {}
+    row_count = 0
+    months = set()
+    try:
+        for batch in db.execute(query).partitions():
+            for month, rows in groupby(batch, key=lambda row: month_of(row.date)):
+                rows = list(rows)
+                _write_month(pa, pq, tmp_dir, month, rows, writers)
+                row_count += len(rows)
+                months.add(month)
+        for writer in writers.values():
+            writer.close()
+    except BaseException:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    meta = {
+        "snapshot_id": snapshot_id,
+        "generation": generation,
+        "exported_at": datetime.fromtimestamp(start_time).isoformat(),
+        "exported_at_ts": int(start_time),
+        "rows": row_count,
+        "months": len(months),
+        "compression": settings.columnar_compression,
+    }
+    (tmp_dir / META_FILE).write_text(json.dumps(meta))
+    os.replace(tmp_dir, snapshot_dir)
+
+    current_tmp = root / f"{CURRENT_FILE}.{os.getpid()}"
+    current_tmp.write_text(snapshot_id)
+    os.replace(current_tmp, root / CURRENT_FILE)
+    _prune_snapshots(root, snapshot_id)
+
+    meta["size_bytes"] = sum(path.stat().st_size for path in snapshot_dir.rglob("*.parquet"))
+    meta["export_time_ms"] = round((time.time() - start_time) * 1000, 2)
+    logger.info("Columnar snapshot exported", **meta)
+    return meta
+
+
+def _prune_snapshots(root: Path, current_id: str):
+    snapshots = sorted(
+        (path for path in root.iterdir() if path.is_dir() and not path.name.startswith(".")),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in snapshots[max(settings.columnar_keep_snapshots, 1):]:
+        if path.name != current_id:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Query engine
+# ---------------------------------------------------------------------------
+
+def current_snapshot() -> dict:
+    """Metadata của snapshot CURRENT - raise SnapshotNotFoundError nếu chưa export"""
+    root = _root()
+    try:
+        snapshot_id = (root / CURRENT_FILE).read_text().strip()
+        meta = json.loads((root / snapshot_id / META_FILE).read_text())
+    except FileNotFoundError:
+        raise SnapshotNotFoundError("Columnar snapshot has not been exported yet")
+    meta["path"] = str(root / snapshot_id)
+    return meta
+
+
+@functools.lru_cache(maxsize=4)
+def _dataset(path: str):
+    # Discovery (list file + đọc footer) một lần cho mỗi snapshot - snapshot bất biến
+    pa, _, ds, _ = _pyarrow()
+    from pyarrow import fs
+
+    return ds.dataset(
+        path,
+        schema=_schema(pa).append(pa.field("month", pa.string())),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive"),
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def _filter_expression(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+):
+    _, _, ds, _ = _pyarrow()
+    conditions = []
+    if start_date:
+        # Điều kiện trên partition field bỏ qua cả thư mục tháng, điều kiện trên
+        # date bỏ qua row groups theo min/max statistics
+        conditions += [ds.field("month") >= month_of(start_date), ds.field("date") >= start_date]
+    if end_date:
+        conditions += [ds.field("month") <= month_of(end_date), ds.field("date") <= end_date]
+    if store_id is not None:
+        conditions.append(ds.field("store_id") == store_id)
+    if user_id is not None:
+        conditions.append(ds.field("user_id") == user_id)
+    return functools.reduce(operator.and_, conditions) if conditions else None
+
+
+def _month_user_totals(path: str, **filters):
+    """
+    (month, user_id) -> revenue, ad_spend, orders. Aggregate từng batch rồi gộp,
+    kết quả trung gian chỉ có số users x số tháng rows
+    """
+    pa, _, _, _ = _pyarrow()
+    keys = ["month", "user_id"]
+    aggregations = [("revenue", "sum"), ("ad_spend", "sum"), ("revenue", "count")]
+    scanner = _dataset(path).scanner(
+        columns=["month", "user_id", "revenue", "ad_spend"],
+        filter=_filter_expression(**filters),
+        batch_size=SCAN_BATCH_SIZE,
+    )
+    partials = [
+        pa.Table.from_batches([batch]).group_by(keys).aggregate(aggregations)
+        for batch in scanner.to_batches()
+        if batch.num_rows
+    ]
+    if not partials:
+        return None
+    combined = pa.concat_tables(partials).group_by(keys).aggregate(
+        [("revenue_sum", "sum"), ("ad_spend_sum", "sum"), ("revenue_count", "sum")]
+    )
+    return combined.rename_columns(
+        [{"revenue_sum_sum": "revenue", "ad_spend_sum_sum": "ad_spend", "revenue_count_sum": "orders"}.get(name, name)
+         for name in combined.column_names]
+    )
+
+
+def _roas(revenue: float, ad_spend: float) -> float:
+    return round(revenue / ad_spend, 2) if ad_spend else 0
+
+
+def compute_monthly_trends(path: str, start_date=None, end_date=None, store_id=None, user_id=None) -> list:
+    """Revenue, ad_spend, ROAS, orders và active users theo tháng"""
+    totals = _month_user_totals(path, start_date=start_date, end_date=end_date, store_id=store_id, user_id=user_id)
+    if totals is None:
+        return []
+    monthly = totals.group_by("month").aggregate(
+        [("revenue", "sum"), ("ad_spend", "sum"), ("orders", "sum"), ("user_id", "count")]
+    ).sort_by("month")
+    return [
+        {
+            "month": row["month"],
+            "revenue": round(row["revenue_sum"], 2),
+            "ad_spend": round(row["ad_spend_sum"], 2),
+            "roas": _roas(row["revenue_sum"], row["ad_spend_sum"]),
+            "orders": row["orders_sum"],
+            "active_users": row["user_id_count"],
+        }
+        for row in monthly.to_pylist()
+    ]
+
+
+def compute_user_roas(
+    path: str,
+    start_date=None,
+    end_date=None,
+    store_id=None,
+    order_by: str = "revenue",
+    limit: int = 20,
+) -> list:
+    """ROAS của từng user trên toàn bộ lịch sử (hoặc khoảng ngày / một store), top `limit` theo order_by"""
+    _, pc, _, _ = _pyarrow()
+    totals = _month_user_totals(path, start_date=start_date, end_date=end_date, store_id=store_id)
+    if totals is None:
+        return []
+    users = totals.group_by("user_id").aggregate(
+        [("revenue", "sum"), ("ad_spend", "sum"), ("orders", "sum")]
+    )
+    ad_spend = users["ad_spend_sum"]
+    roas = pc.if_else(
+        pc.greater(ad_spend, 0), pc.divide(users["revenue_sum"], ad_spend), 0.0
+    )
+    users = users.append_column("roas", roas)
+    sort_column = "roas" if order_by == "roas" else "revenue_sum"
+    top = users.sort_by([(sort_column, "descending"), ("user_id", "ascending")]).slice(0, limit)
+    return [
+        {
+            "user_id": row["user_id"],
+            "revenue": round(row["revenue_sum"], 2),
+            "ad_spend": round(row["ad_spend_sum"], 2),
+            "roas": round(row["roas"], 2),
+            "orders": row["orders_sum"],
+        }
+        for row in top.to_pylist()
+    ]
+
+
+def _cached(name: str, snapshot: dict, compute, **params) -> bytes:
+    start_time = time.time()
+    # Snapshot bất biến: key theo snapshot_id thay vì generation
+    key = f"{CACHE_PREFIX}:{snapshot['snapshot_id']}:{etag_resource(name, **params)}"
+    with span("redis"):
+        cached_data = r.get(key)
+    if cached_data:
+        return to_bytes(cached_data)
+
+    admit_current()
+    with span("columnar"):
+        result = compute(snapshot["path"])
+    with span("serialize"):
+        payload = dumps(result)
+    with span("redis"):
+        r.setex(key, CACHE_TTL_SECONDS, payload)
+    logger.info("Columnar analytics computed and cached",
+               cache_key=key,
+               rows=len(result),
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
+
+
+def get_monthly_trends_json(snapshot: dict, start_date=None, end_date=None, store_id=None, user_id=None) -> bytes:
+    return _cached(
+        "monthly_trends", snapshot,
+        lambda path: compute_monthly_trends(path, start_date, end_date, store_id, user_id),
+        start=start_date, end=end_date, store=store_id, user=user_id,
+    )
+
+
+def get_user_roas_json(snapshot: dict, start_date=None, end_date=None, store_id=None, order_by="revenue", limit=20) -> bytes:
+    return _cached(
+        "user_roas", snapshot,
+        lambda path: compute_user_roas(path, start_date, end_date, store_id, order_by, limit),
+        start=start_date, end=end_date, store=store_id, order=order_by, limit=limit,
+    )
@@ -0,0 +1,176 @@
+"""
+Dashboard batch: nhiều analytics queries trong một HTTP request.
+
+1. Một MGET cho generation của mọi tags mà các queries phụ thuộc (-> cache keys)
+2. Một MGET cho mọi cache keys (+ keys của Prefect ETL)
+3. Cache misses chạy song song (DASHBOARD_MAX_PARALLEL_QUERIES threads, mỗi query
+   đồng thời chiếm một admission slot - chỉ dùng slot đang trống), mỗi miss
+   một session riêng (replica nếu có) nên mỗi query có connection riêng;
+   kết quả được SETEX trong một pipeline. Query lỗi trả về {"error": ...} trong
+   results của nó (không cache), các queries khác vẫn có kết quả
+
+Wall time của batch ~ query chậm nhất thay vì tổng các queries. Response được
+ghép từ bytes đã serialize, payload cache hit không bị decode.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.admission import AdmissionRejectedError, is_statement_timeout, parallel_slots
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.tag_cache import GLOBAL_TAG, scope_tags, tag_versions
+from app.core.timing import span
+from app.crud import analytics, distribution
+from app.schemas.analytics import AnalyticsQuerySpec
+
+logger = get_logger("dashboard")
+
+CACHE_TTL_SECONDS = 60
+PREFECT_KEYS = [
+    analytics.PREFECT_CACHE_KEYS["summary"],
+    analytics.PREFECT_CACHE_KEYS["monthly_trends"],
+    analytics.PREFECT_CACHE_KEYS["top_users"],
+    analytics.PREFECT_UPDATED_AT_KEY,
+]
+
+
+@dataclass
+class _Plan:
+    result_id: str
+    keys: List[str]
+    compute: Optional[Callable[[Session], object]] = None  # None: chỉ đọc cache (Prefect)
+    payload: Optional[bytes] = None
+    failed: bool = False
+
+
+def _tags(spec: AnalyticsQuerySpec) -> list:
+    if spec.name == "distribution":
+        return scope_tags(spec.start_date, spec.end_date)
+    if spec.name == "growth":
+        return distribution.growth_tags(spec.start_date, spec.end_date, spec.store_id)
+    if spec.name == "prefect_cached":
+        return []
+    return [GLOBAL_TAG]
+
+
+def _top_users(limit: int):
+    # Giống endpoint: leaderboard (Redis) nếu đã build, không thì query DB
+    def compute(db: Session):
+        entries = analytics.leaderboard_top_users(limit)
+        return entries if entries is not None else analytics.compute_top_users(db, limit)
+
+    return compute
+
+
+def _plan(spec: AnalyticsQuerySpec, version: int) -> _Plan:
+    result_id = spec.result_id
+    if spec.name == "summary":
+        return _Plan(result_id, [analytics.summary_cache_key(version)], analytics.compute_summary)
+    if spec.name == "top_users":
+        limit = spec.limit or analytics.TOP_USERS_DEFAULT_LIMIT
+        return _Plan(result_id, [analytics.top_users_cache_key(version, limit)], _top_users(limit))
+    if spec.name == "distribution":
+        limit = spec.limit or 20
+        return _Plan(
+            result_id,
+            [distribution.cache_key(
+                f"distribution:{spec.dimension}", version, start=spec.start_date, end=spec.end_date, limit=limit
+            )],
+            lambda db: distribution.compute_distribution(db, spec.dimension, spec.start_date, spec.end_date, limit),
+        )
+    if spec.name == "growth":
+        return _Plan(
+            result_id,
+            [distribution.cache_key(
+                "growth", version, start=spec.start_date, end=spec.end_date, store=spec.store_id
+            )],
+            lambda db: distribution.compute_growth(db, spec.start_date, spec.end_date, spec.store_id),
+        )
+    return _Plan(result_id, PREFECT_KEYS)
+
+
+def _prefect_payload(values: list) -> bytes:
+    summary, monthly_trends, top_users, updated_at = values
+    if not (summary or monthly_trends or top_users):
+        return b"null"
+    return analytics.build_prefect_analytics_json(summary, monthly_trends, top_users, updated_at or "")
+
+
+def _run_miss(plan: _Plan):
+    from app.database import read_session, report_read_failure
+
+    try:
+        with read_session() as db:
+            try:
+                result = plan.compute(db)
+            except OperationalError as e:
+                report_read_failure(db, e)
+                raise
+        with span("serialize"):
+            plan.payload = dumps(result)
+    except AdmissionRejectedError:
+        raise  # Quá tải: cả batch 503 như các endpoint khác
+    except Exception as e:
+        logger.error("Dashboard query failed", query=plan.result_id, error=str(e))
+        plan.failed = True
+        plan.payload = dumps({"error": "Query timed out" if is_statement_timeout(e) else "Query failed"})
+
+
+def _run_misses(misses: List[_Plan]):
+    # Fan-out không vượt concurrency limit: bao nhiêu slot lấy được thì chạy bấy nhiêu query cùng lúc
+    with parallel_slots(min(len(misses), settings.dashboard_max_parallel_queries)) as workers:
+        if workers == 1:
+            for plan in misses:
+                _run_miss(plan)
+            return
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard") as executor:
+            # Mỗi task một bản copy context: timing spans + admission ticket của request
+            futures = [executor.submit(copy_context().run, _run_miss, plan) for plan in misses]
+            for future in futures:
+                future.result()
+
+
+def run_batch(specs: List[AnalyticsQuerySpec]) -> bytes:
+    """{"generation": <global>, "results": {id: payload}} dạng JSON bytes"""
+    start_time = time.time()
+    *versions, generation = tag_versions([_tags(spec) for spec in specs] + [[GLOBAL_TAG]])
+    plans = [_plan(spec, version) for spec, version in zip(specs, versions)]
+
+    keys = [key for plan in plans for key in plan.keys]
+    with span("redis"):
+        values = iter(r.mget(keys))
+    misses = []
+    for plan in plans:
+        found = [next(values) for _ in plan.keys]
+        if plan.compute is None:
+            plan.payload = _prefect_payload(found)
+        elif found[0] is not None:
+            plan.payload = to_bytes(found[0])
+        else:
+            misses.append(plan)
+
+    if misses:
+        _run_misses(misses)
+        computed = [plan for plan in misses if not plan.failed]
+        if computed:
+            with span("redis"):
+                pipe = r.pipeline(transaction=False)
+                for plan in computed:
+                    pipe.setex(plan.keys[0], CACHE_TTL_SECONDS, plan.payload)
+                pipe.execute()
+
+    logger.info("Dashboard batch served",
+                queries=len(plans),
+                cache_misses=len(misses),
+                query_time_ms=round((time.time() - start_time) * 1000, 2))
+    results = b",".join(dumps(plan.result_id) + b":" + plan.payload for plan in plans)
+    return b'{"generation":' + dumps(generation) + b',"results":{' + results + b"}}"
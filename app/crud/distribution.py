@@ -0,0 +1,268 @@
+"""
+Phân phối revenue theo store/user và tăng trưởng theo ngày - tính hoàn toàn trong DB.
+
+Mỗi endpoint là một SQL round trip (grouped aggregates + window functions),
+không kéo rows về pandas như transform_sales_analytics. Percentiles dùng
+percentile_cont trên PostgreSQL; dialect không có ordered-set aggregates
+(SQLite) dùng ROW_NUMBER() + nội suy tuyến tính cùng công thức.
+
+Kết quả được cache theo version của các tag mà query phụ thuộc (store / khoảng
+ngày / global, xem tag_cache) + tham số request, nên không cần invalidation riêng:
+ghi vào store hoặc ngày khác không làm mất cache của query đã lọc.
+"""
+
+import hashlib
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import Integer, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.tag_cache import scope_tags, tag_version
+from app.core.timing import span
+from app.models.models import SalesData
+
+logger = get_logger("distribution_analytics")
+
+CACHE_PREFIX = "analytics:stats"
+CACHE_TTL_SECONDS = 60
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+DIMENSIONS = {"store": SalesData.store_id, "user": SalesData.user_id}
+
+
+def _params_query(params: dict) -> str:
+    # Tham số sort theo tên, None bị bỏ - cùng request -> cùng key
+    return "&".join(f"{key}={value}" for key, value in sorted(params.items()) if value is not None)
+
+
+def cache_key(name: str, generation: int, **params) -> str:
+    """analytics:stats:<name>:g<version của tags>:a=1&b=2"""
+    return f"{CACHE_PREFIX}:{name}:g{generation}:{_params_query(params)}"
+
+
+def etag_resource(name: str, **params) -> str:
+    """Phần resource của ETag (make_etag thêm generation) - digest ngắn của tham số"""
+    digest = hashlib.blake2b(_params_query(params).encode(), digest_size=6).hexdigest()
+    return f"{name.replace(':', '-')}-{digest}"
+
+
+def _date_filters(start_date: Optional[date], end_date: Optional[date], store_id: Optional[int] = None) -> list:
+    filters = []
+    if start_date:
+        filters.append(SalesData.date >= start_date)
+    if end_date:
+        filters.append(SalesData.date <= end_date)
+    if store_id is not None:
+        filters.append(SalesData.store_id == store_id)
+    return filters
+
+
+def _distribution_query(dialect: str, dimension: str, filters: list, limit: int):
+    group_column = DIMENSIONS[dimension]
+    revenue_sum = func.sum(SalesData.revenue)
+
+    if dialect == "postgresql":
+        source = SalesData.__table__
+        key = group_column.label("key")
+        revenue = SalesData.revenue
+        ad_spend = SalesData.ad_spend
+        percentile_columns = [
+            func.percentile_cont(q).within_group(SalesData.revenue).label(name)
+            for name, q in PERCENTILES.items()
+        ]
+        where = filters
+        group_by = group_column
+    else:
+        ranked = (
+            select(
+                group_column.label("key"),
+                SalesData.revenue,
+                SalesData.ad_spend,
+                func.row_number().over(partition_by=group_column, order_by=SalesData.revenue).label("rn"),
+                func.count().over(partition_by=group_column).label("n"),
+            )
+            .where(*filters)
+            .subquery("ranked")
+        )
+        source = ranked
+        key = ranked.c.key
+        revenue = ranked.c.revenue
+        ad_spend = ranked.c.ad_spend
+        revenue_sum = func.sum(revenue)
+        percentile_columns = []
+        for name, q in PERCENTILES.items():
+            # percentile_cont: vị trí 1 + q*(n-1), nội suy giữa hai row liền kề
+            position = 1 + q * (ranked.c.n - 1)
+            lower_rank = cast(position, Integer)
+            lower = func.max(case((ranked.c.rn == lower_rank, revenue)))
+            upper = func.coalesce(func.max(case((ranked.c.rn == lower_rank + 1, revenue))), lower)
+            fraction = func.max(position - lower_rank)
+            percentile_columns.append((lower + fraction * (upper - lower)).label(name))
+        where = []
+        group_by = key
+
+    ad_spend_sum = func.sum(ad_spend)
+    return (
+        select(
+            key,
+            func.count().label("orders"),
+            revenue_sum.label("total_revenue"),
+            ad_spend_sum.label("total_ad_spend"),
+            func.avg(revenue).label("avg_order_value"),
+            *percentile_columns,
+        )
+        .select_from(source)
+        .where(*where)
+        .group_by(group_by)
+        .order_by(revenue_sum.desc())
+        .limit(limit)
+    )
+
+
+def compute_distribution(
+    db: Session,
+    dimension: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = 20,
+) -> list:
+    """Số orders, tổng revenue/ad_spend, ROAS, AOV và percentiles revenue mỗi order theo store/user"""
+    query = _distribution_query(
+        db.get_bind().dialect.name, dimension, _date_filters(start_date, end_date), limit
+    )
+    rows = db.execute(query).all()
+    return [
+        {
+            f"{dimension}_id": row.key,
+            "orders": row.orders,
+            "total_revenue": round(row.total_revenue or 0, 2),
+            "total_ad_spend": round(row.total_ad_spend or 0, 2),
+            "roas": round(row.total_revenue / row.total_ad_spend, 2) if row.total_ad_spend else 0,
+            "avg_order_value": round(row.avg_order_value or 0, 2),
+            "revenue_percentiles": {
+                name: round(getattr(row, name), 2) if getattr(row, name) is not None else None
+                for name in PERCENTILES
+            },
+        }
+        for row in rows
+    ]
+
+
+def _growth(current, previous) -> Optional[float]:
+    if current is None or not previous:
+        return None
+    return round((current - previous) / previous, 4)
+
+
+def compute_growth(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+) -> list:
+    """
+    Revenue theo ngày với day-over-day và week-over-week growth (LAG 1 / LAG 7
+    trên chuỗi ngày). Ngày không có sales không có row, nên growth chỉ được
+    tính khi row trước đúng là ngày hôm trước / 7 ngày trước.
+    """
+    # Lấy thêm 7 ngày trước start_date để ngày đầu tiên vẫn có LAG 1 / LAG 7
+    lookback_start = start_date - timedelta(days=7) if start_date else None
+    daily = (
+        select(
+            SalesData.date.label("date"),
+            func.sum(SalesData.revenue).label("revenue"),
+            func.sum(SalesData.ad_spend).label("ad_spend"),
+            func.count().label("orders"),
+        )
+        .where(*_date_filters(lookback_start, end_date, store_id))
+        .group_by(SalesData.date)
+        .subquery("daily")
+    )
+    order = daily.c.date
+    windowed = select(
+        daily.c.date,
+        daily.c.revenue,
+        daily.c.ad_spend,
+        daily.c.orders,
+        func.lag(daily.c.revenue, 1).over(order_by=order).label("prev_day_revenue"),
+        func.lag(daily.c.date, 1).over(order_by=order).label("prev_day_date"),
+        func.lag(daily.c.revenue, 7).over(order_by=order).label("prev_week_revenue"),
+        func.lag(daily.c.date, 7).over(order_by=order).label("prev_week_date"),
+    ).subquery("windowed")
+
+    query = select(windowed).order_by(windowed.c.date)
+    if start_date:
+        query = query.where(windowed.c.date >= start_date)
+
+    points = []
+    for row in db.execute(query):
+        day = _as_date(row.date)
+        prev_day = _as_date(row.prev_day_date)
+        prev_week = _as_date(row.prev_week_date)
+        points.append({
+            "date": day.isoformat(),
+            "revenue": round(row.revenue, 2),
+            "ad_spend": round(row.ad_spend, 2),
+            "orders": row.orders,
+            "roas": round(row.revenue / row.ad_spend, 2) if row.ad_spend else 0,
+            "dod_growth": _growth(row.revenue, row.prev_day_revenue)
+            if prev_day and (day - prev_day).days == 1 else None,
+            "wow_growth": _growth(row.revenue, row.prev_week_revenue)
+            if prev_week and (day - prev_week).days == 7 else None,
+        })
+    return points
+
+
+def _as_date(value):
+    # SQLite trả về chuỗi ISO cho cột date đi qua subquery
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def _cached(name: str, generation: int, compute, **params) -> bytes:
+    start_time = time.time()
+    key = cache_key(name, generation, **params)
+    with span("redis"):
+        cached_data = r.get(key)
+    if cached_data:
+        logger.info("Distribution stats cache hit", cache_key=key)
+        return to_bytes(cached_data)
+
+    with span("db"):
+        result = compute()
+    with span("serialize"):
+        payload = dumps(result)
+    with span("redis"):
+        r.setex(key, CACHE_TTL_SECONDS, payload)
+    logger.info("Distribution stats computed and cached",
+               cache_key=key,
+               rows=len(result),
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
+
+
+def growth_tags(start_date=None, end_date=None, store_id=None) -> list:
+    # compute_growth đọc thêm 7 ngày trước start_date (LAG)
+    lookback_start = start_date - timedelta(days=7) if start_date else None
+    return scope_tags(lookback_start, end_date, store_id)
+
+
+def get_distribution_json(db: Session, generation: int, dimension: str, start_date=None, end_date=None, limit=20) -> bytes:
+    return _cached(
+        f"distribution:{dimension}", tag_version(scope_tags(start_date, end_date), generation),
+        lambda: compute_distribution(db, dimension, start_date, end_date, limit),
+        start=start_date, end=end_date, limit=limit,
+    )
+
+
+def get_growth_json(db: Session, generation: int, start_date=None, end_date=None, store_id=None) -> bytes:
+    return _cached(
+        "growth", tag_version(growth_tags(start_date, end_date, store_id), generation),
+        lambda: compute_growth(db, start_date, end_date, store_id),
+        start=start_date, end=end_date, store=store_id,
+    )
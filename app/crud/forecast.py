@@ -0,0 +1,200 @@
+"""
+Dự báo revenue / ad_spend ngắn hạn (7 hoặc 30 ngày) theo store và tổng.
+
+Daily aggregates (store, ngày) được đọc bằng một SQL query rồi đổ vào mảng
+NumPy (series, metric, ngày) - ngày không có sales là 0. Mọi phương pháp chạy
+trên cả mảng cùng lúc (không loop theo store):
+
+- moving_average: trung bình MA_WINDOW ngày gần nhất
+- exponential_smoothing: simple exponential smoothing (alpha = SMOOTHING_ALPHA),
+  level cuối tính bằng một tích vô hướng với vector trọng số
+- seasonal_naive: lặp lại SEASON_DAYS ngày gần nhất (mùa vụ theo tuần)
+
+Cache theo tag của các store được hỏi (global nếu mọi store): ghi vào store khác
+không làm mất cache.
+"""
+
+import time
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.tag_cache import GLOBAL_TAG, store_tag, tag_version
+from app.core.timing import span
+from app.crud.distribution import cache_key
+from app.models.models import SalesData
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = get_logger("forecast_analytics")
+
+CACHE_TTL_SECONDS = 300
+MAX_HORIZON = 30
+METRICS = ("revenue", "ad_spend")
+METHODS = ("moving_average", "exponential_smoothing", "seasonal_naive")
+MA_WINDOW = 7
+SEASON_DAYS = 7
+SMOOTHING_ALPHA = 0.3
+
+
+def _numpy():
+    # numpy import ~60ms - chỉ load khi thật sự tính forecast (không lúc app start)
+    import numpy as np
+
+    return np
+
+
+def moving_average(history: "np.ndarray", horizon: int, window: int = MA_WINDOW) -> "np.ndarray":
+    np = _numpy()
+    level = history[..., -window:].mean(axis=-1)
+    return np.repeat(level[..., None], horizon, axis=-1)
+
+
+def exponential_smoothing(history: "np.ndarray", horizon: int, alpha: float = SMOOTHING_ALPHA) -> "np.ndarray":
+    np = _numpy()
+    # level_0 = x_0, level_t = alpha * x_t + (1 - alpha) * level_{t-1}
+    # => level cuối = sum(w_t * x_t) với w_0 = (1-alpha)^(n-1), w_t = alpha * (1-alpha)^(n-1-t)
+    days = history.shape[-1]
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (days - 1)
+    level = history @ weights
+    return np.repeat(level[..., None], horizon, axis=-1)
+
+
+def seasonal_naive(history: "np.ndarray", horizon: int, season: int = SEASON_DAYS) -> "np.ndarray":
+    np = _numpy()
+    days = history.shape[-1]
+    return history[..., days - season + np.arange(horizon) % season]
+
+
+def daily_matrix(
+    db: Session, start_date: date, end_date: date, store_ids: Optional[List[int]] = None
+) -> tuple:
+    """(store ids, mảng (store, metric, ngày)) từ một GROUP BY store_id, date"""
+    filters = [SalesData.date >= start_date, SalesData.date <= end_date]
+    if store_ids:
+        filters.append(SalesData.store_id.in_(store_ids))
+    query = (
+        select(
+            SalesData.store_id,
+            SalesData.date,
+            func.sum(SalesData.revenue),
+            func.sum(SalesData.ad_spend),
+        )
+        .where(*filters)
+        .group_by(SalesData.store_id, SalesData.date)
+    )
+    rows = db.execute(query).all()
+
+    np = _numpy()
+    row_stores = np.array([row[0] for row in rows], dtype=np.int64)
+    stores = np.array(sorted(set(store_ids)), dtype=np.int64) if store_ids else np.unique(row_stores)
+    days = (end_date - start_date).days + 1
+    matrix = np.zeros((len(stores), len(METRICS), days))
+    if rows:
+        store_index = np.searchsorted(stores, row_stores)
+        day_index = (
+            np.array([row[1] for row in rows], dtype="datetime64[D]") - np.datetime64(start_date, "D")
+        ).astype(np.int64)
+        matrix[store_index, :, day_index] = np.array([row[2:] for row in rows], dtype=float)
+    return stores.tolist(), matrix
+
+
+def _series(history: "np.ndarray", forecasts: list) -> dict:
+    revenue, ad_spend = history
+    return {
+        "history": {
+            "revenue": round(float(revenue.sum()), 2),
+            "ad_spend": round(float(ad_spend.sum()), 2),
+            "avg_daily_revenue": round(float(revenue.mean()), 2),
+            "last_7d_revenue": round(float(revenue[-7:].sum()), 2),
+            "last_7d_ad_spend": round(float(ad_spend[-7:].sum()), 2),
+        },
+        **{
+            metric: dict(zip(METHODS, method_values))
+            for metric, method_values in zip(METRICS, forecasts)
+        },
+    }
+
+
+def compute_forecast(
+    db: Session,
+    horizon: int = 7,
+    history_days: int = 90,
+    as_of: Optional[date] = None,
+    store_ids: Optional[List[int]] = None,
+) -> dict:
+    """History history_days ngày tới as_of (mặc định hôm nay), dự báo horizon ngày tiếp theo"""
+    as_of = as_of or date.today()
+    start_date = as_of - timedelta(days=history_days - 1)
+    stores, matrix = daily_matrix(db, start_date, as_of, store_ids)
+    np = _numpy()
+
+    # Hàng cuối = tổng mọi store, dự báo cùng một lượt với các store
+    series = np.concatenate([matrix, matrix.sum(axis=0, keepdims=True)])
+    forecasts = np.stack([
+        moving_average(series, horizon),
+        exponential_smoothing(series, horizon),
+        seasonal_naive(series, horizon),
+    ], axis=2)  # (series, metric, method, ngày)
+    forecasts = np.maximum(forecasts, 0).round(2).tolist()
+
+    return {
+        "as_of": as_of.isoformat(),
+        "horizon": horizon,
+        "history_days": history_days,
+        "dates": [(as_of + timedelta(days=offset)).isoformat() for offset in range(1, horizon + 1)],
+        "overall": _series(series[-1], forecasts[-1]),
+        "stores": [
+            {"store_id": store_id, **_series(series[index], forecasts[index])}
+            for index, store_id in enumerate(stores)
+        ],
+    }
+
+
+def forecast_tags(store_ids: Optional[List[int]] = None) -> list:
+    return [store_tag(store_id) for store_id in sorted(set(store_ids))] if store_ids else [GLOBAL_TAG]
+
+
+def stores_param(store_ids: Optional[List[int]] = None) -> Optional[str]:
+    """store ids dạng "1,2,5" cho cache key / ETag - thứ tự và trùng lặp trong query không đổi key"""
+    return ",".join(map(str, sorted(set(store_ids)))) if store_ids else None
+
+
+def get_forecast_json(
+    db: Session,
+    generation: int,
+    horizon: int = 7,
+    history_days: int = 90,
+    as_of: Optional[date] = None,
+    store_ids: Optional[List[int]] = None,
+) -> bytes:
+    start_time = time.time()
+    as_of = as_of or date.today()
+    key = cache_key(
+        "forecast", tag_version(forecast_tags(store_ids), generation),
+        as_of=as_of, horizon=horizon, history=history_days, stores=stores_param(store_ids),
+    )
+    with span("redis"):
+        cached_data = r.get(key)
+    if cached_data:
+        logger.info("Forecast cache hit", cache_key=key)
+        return to_bytes(cached_data)
+
+    with span("db"):
+        result = compute_forecast(db, horizon, history_days, as_of, store_ids)
+    with span("serialize"):
+        payload = dumps(result)
+    with span("redis"):
+        r.setex(key, CACHE_TTL_SECONDS, payload)
+    logger.info("Forecast computed and cached",
+               cache_key=key,
+               stores=len(result["stores"]),
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
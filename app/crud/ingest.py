@@ -0,0 +1,245 @@
+"""
+Async ingestion cho sales data qua Redis Stream.
+
+API validate payload rồi XADD vào stream `ingest:sales`, trả 202 ngay, không
+chờ PostgreSQL commit. Writer workers (scripts/ingest_worker.py) đọc stream
+bằng consumer group, insert theo micro-batch (một bulk INSERT + một commit),
+XACK sau khi commit rồi mới bump generation / cập nhật live counters.
+
+- At-least-once: worker chết giữa commit và XACK thì batch được giao lại
+  (XAUTOCLAIM sau INGEST_CLAIM_IDLE_MS) - có thể ghi trùng.
+- Batch lỗi được thử lại từng message để cô lập poison message. Message lỗi
+  quá INGEST_MAX_DELIVERIES lần (hoặc payload không parse được) chuyển sang
+  dead-letter stream `ingest:sales:dead` kèm lý do, rồi XACK.
+"""
+
+import os
+import socket
+import time
+from typing import List, Optional, Tuple
+
+from pydantic import ValidationError
+from redis.exceptions import ResponseError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, loads
+from app.core.timing import span
+from app.crud.cohorts import record_cohort_sales
+from app.models.models import SalesData
+from app.schemas.sales_data import SalesDataCreate
+
+logger = get_logger("ingest")
+
+STREAM_KEY = "ingest:sales"
+GROUP = "sales-writers"
+DEAD_LETTER_KEY = "ingest:sales:dead"
+
+
+def enqueue_sales(data: SalesDataCreate) -> str:
+    """XADD payload đã validate, trả về stream id (dùng làm receipt cho client)"""
+    with span("redis"):
+        return r.xadd(
+            STREAM_KEY,
+            {"payload": dumps(data.model_dump(mode="json")), "enqueued_at": time.time()},
+            maxlen=settings.ingest_stream_maxlen,
+            approximate=True,
+        )
+
+
+def ensure_group():
+    try:
+        r.xgroup_create(STREAM_KEY, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _parse(fields: dict) -> SalesDataCreate:
+    return SalesDataCreate.model_validate(loads(fields["payload"]))
+
+
+def _dead_letter(message_id: str, fields: dict, reason: str):
+    pipe = r.pipeline(transaction=True)
+    pipe.xadd(
+        DEAD_LETTER_KEY,
+        {**fields, "source_id": message_id, "error": reason[:500], "failed_at": time.time()},
+        maxlen=settings.ingest_stream_maxlen,
+        approximate=True,
+    )
+    pipe.xack(STREAM_KEY, GROUP, message_id)
+    pipe.execute()
+    logger.warning("Sales message dead-lettered", message_id=message_id, error=reason[:200])
+
+
+def _insert(db: Session, rows: List[SalesDataCreate]):
+    db.execute(insert(SalesData), [row.model_dump() for row in rows])
+    # Cohort tables cùng transaction: batch bị rollback thì cohort cũng không đổi
+    record_cohort_sales(db, [(row.user_id, row.store_id, row.date, row.revenue, row.ad_spend) for row in rows])
+    db.commit()
+
+
+def _after_commit(db: Session, rows: List[SalesDataCreate]):
+    # Cùng hiệu ứng với create_sales_data nhưng một lần cho cả batch
+    from app.crud.sales_data import invalidate_analytics
+
+    invalidate_analytics(db, [(row.user_id, row.store_id, row.date, row.revenue, row.ad_spend) for row in rows])
+
+
+def _delivery_counts(consumer: str, message_ids: List[str]) -> dict:
+    # Message ids của một lần đọc đã theo thứ tự - một XPENDING cho cả khoảng. Chỉ lấy PEL của
+    # consumer này: pending của consumer khác trong cùng khoảng id không chiếm chỗ trong count
+    pending = r.xpending_range(
+        STREAM_KEY, GROUP, min=message_ids[0], max=message_ids[-1], count=len(message_ids),
+        consumername=consumer,
+    )
+    return {entry["message_id"]: entry["times_delivered"] for entry in pending}
+
+
+def _write_one_by_one(
+    db: Session, consumer: str, messages: List[Tuple[str, dict, SalesDataCreate]]
+) -> Tuple[list, int]:
+    """
+    Batch lỗi: insert từng message. Message lỗi ở lại pending (retry sau
+    XAUTOCLAIM) hoặc vào dead-letter khi đã giao quá INGEST_MAX_DELIVERIES lần
+    """
+    written = []
+    dead = 0
+    deliveries = _delivery_counts(consumer, [message_id for message_id, _, _ in messages])
+    for message_id, fields, row in messages:
+        try:
+            _insert(db, [row])
+        except SQLAlchemyError as e:
+            db.rollback()
+            if deliveries.get(message_id, 1) >= settings.ingest_max_deliveries:
+                _dead_letter(message_id, fields, str(e))
+                dead += 1
+            else:
+                logger.warning("Sales message insert failed, will retry",
+                               message_id=message_id,
+                               deliveries=deliveries.get(message_id, 1),
+                               error=str(e)[:200])
+            continue
+        r.xack(STREAM_KEY, GROUP, message_id)
+        written.append((message_id, row))
+    return written, dead
+
+
+def _read(consumer: str, count: int, block_ms: Optional[int]) -> list:
+    # Message của consumer đã chết (pending quá lâu) được nhận lại trước
+    _, claimed, *_ = r.xautoclaim(
+        STREAM_KEY, GROUP, consumer, min_idle_time=settings.ingest_claim_idle_ms, count=count
+    )
+    if claimed:
+        return [(message_id, fields) for message_id, fields in claimed if fields]
+    response = r.xreadgroup(GROUP, consumer, {STREAM_KEY: ">"}, count=count, block=block_ms)
+    return response[0][1] if response else []
+
+
+def drain_once(db: Session, consumer: str, count: Optional[int] = None, block_ms: Optional[int] = None) -> dict:
+    """Đọc + ghi một micro-batch. Trả về số message đã ghi / dead-letter"""
+    messages = _read(consumer, count or settings.ingest_batch_size, block_ms)
+    if not messages:
+        return {"read": 0, "written": 0, "dead_lettered": 0}
+
+    start_time = time.time()
+    valid = []
+    dead = 0
+    for message_id, fields in messages:
+        try:
+            valid.append((message_id, fields, _parse(fields)))
+        except (KeyError, ValueError, ValidationError) as e:
+            _dead_letter(message_id, fields, f"invalid payload: {e}")
+            dead += 1
+
+    written = []
+    if valid:
+        try:
+            _insert(db, [row for _, _, row in valid])
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning("Sales batch insert failed, retrying one by one",
+                           batch_size=len(valid), error=str(e)[:200])
+            written, failed = _write_one_by_one(db, consumer, valid)
+            dead += failed
+        else:
+            r.xack(STREAM_KEY, GROUP, *(message_id for message_id, _, _ in valid))
+            written = [(message_id, row) for message_id, _, row in valid]
+
+    if written:
+        _after_commit(db, [row for _, row in written])
+
+    stats = {
+        "read": len(messages),
+        "written": len(written),
+        "dead_lettered": dead,
+    }
+    logger.info("Sales ingest batch written",
+                consumer=consumer,
+                batch_time_ms=round((time.time() - start_time) * 1000, 2),
+                **stats)
+    return stats
+
+
+def run_writer(should_stop, consumer: Optional[str] = None):
+    """Vòng lặp writer worker - chạy tới khi should_stop() trả True"""
+    from app.database import SessionLocal
+
+    consumer = consumer or consumer_name()
+    ensure_group()
+    logger.info("Sales ingest writer started", consumer=consumer, stream=STREAM_KEY, group=GROUP)
+    while not should_stop():
+        db = SessionLocal()
+        try:
+            drain_once(db, consumer, block_ms=settings.ingest_block_ms)
+        except Exception as e:
+            # Redis/DB tạm thời lỗi: message chưa XACK vẫn pending, thử lại sau
+            logger.error("Sales ingest writer error", consumer=consumer, error=str(e))
+            time.sleep(1)
+        finally:
+            db.close()
+    logger.info("Sales ingest writer stopped", consumer=consumer)
+
+
+def ingest_stats() -> dict:
+    """Độ dài stream, lag của consumer group, pending và tuổi message pending lâu nhất"""
+    try:
+        groups = {group["name"]: group for group in r.xinfo_groups(STREAM_KEY)}
+    except ResponseError:
+        # Stream chưa tồn tại
+        return {"stream_length": 0, "lag": 0, "pending": 0, "oldest_pending_ms": 0, "consumers": 0,
+                "dead_letters": r.xlen(DEAD_LETTER_KEY)}
+    group = groups.get(GROUP, {})
+    oldest_pending_ms = 0
+    if group.get("pending"):
+        oldest = r.xpending_range(STREAM_KEY, GROUP, min="-", max="+", count=1)
+        if oldest:
+            oldest_pending_ms = int(time.time() * 1000) - int(oldest[0]["message_id"].split("-")[0])
+    return {
+        "stream_length": r.xlen(STREAM_KEY),
+        # lag: số entries chưa giao cho consumer nào (Redis >= 7)
+        "lag": group.get("lag"),
+        "pending": group.get("pending", 0),
+        "oldest_pending_ms": oldest_pending_ms,
+        "consumers": group.get("consumers", 0),
+        "dead_letters": r.xlen(DEAD_LETTER_KEY),
+    }
+
+
+def replay_dead_letters(limit: int = 100) -> int:
+    """Đưa dead letters (sau khi đã sửa nguyên nhân) trở lại stream chính"""
+    entries = r.xrange(DEAD_LETTER_KEY, count=limit)
+    for message_id, fields in entries:
+        pipe = r.pipeline(transaction=True)
+        pipe.xadd(STREAM_KEY, {"payload": fields.get("payload", ""), "enqueued_at": time.time()})
+        pipe.xdel(DEAD_LETTER_KEY, message_id)
+        pipe.execute()
+    return len(entries)
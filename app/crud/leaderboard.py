@@ -0,0 +1,190 @@
+"""
+Leaderboards revenue theo user trong Redis sorted sets.
+
+Boards: all-time, theo tháng (YYYY-MM) và theo store. Mỗi insert sales data
+ZINCRBY vào các board liên quan trong cùng MULTI/EXEC với live counters
+(app.crud.live_analytics.record_sales). Top N / phân trang là ZREVRANGE
+O(log N + limit), rank của một user là ZREVRANK O(log N) - không còn
+JOIN + GROUP BY + ORDER BY SUM(revenue) trên toàn bộ sales_data.
+
+Rebuild từ DB: `python scripts/rebuild_leaderboards.py` hoặc
+POST /admin/analytics/live/rebuild.
+"""
+
+import time
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.models.models import SalesData, User
+
+logger = get_logger("leaderboard")
+
+KEY_PREFIX = "leaderboard:revenue"
+ALL_TIME_KEY = f"{KEY_PREFIX}:all"
+BOARDS_KEY = "leaderboard:boards"  # set mọi board theo tháng/store - để rebuild dọn board cũ
+READY_KEY = "leaderboard:ready"
+USER_EMAILS_KEY = "leaderboard:user_emails"  # hash user_id -> email
+
+REBUILD_CHUNK_SIZE = 10_000
+
+
+def month_key(month: str) -> str:
+    return f"{KEY_PREFIX}:month:{month}"
+
+
+def store_key(store_id: int) -> str:
+    return f"{KEY_PREFIX}:store:{store_id}"
+
+
+def board_key(month: Optional[str] = None, store_id: Optional[int] = None) -> str:
+    """Key của board theo filter - chỉ hỗ trợ một chiều (tháng hoặc store)"""
+    if month and store_id is not None:
+        raise ValueError("Leaderboard supports filtering by month or store, not both")
+    if month:
+        return month_key(month)
+    if store_id is not None:
+        return store_key(store_id)
+    return ALL_TIME_KEY
+
+
+def _boards_for(store_id: int, sale_date) -> tuple:
+    # sale_date có thể là date hoặc chuỗi ISO "YYYY-MM-DD"
+    return ALL_TIME_KEY, month_key(str(sale_date)[:7]), store_key(store_id)
+
+
+def add_sales(pipe, rows: Iterable[Tuple[int, int, object, float]]):
+    """
+    Thêm ZINCRBY cho các sales (user_id, store_id, date, revenue) vào pipeline
+    của caller - gộp theo (board, user) trước để batch lớn tốn ít lệnh.
+    """
+    increments = defaultdict(float)
+    for user_id, store_id, sale_date, revenue in rows:
+        for key in _boards_for(store_id, sale_date):
+            increments[key, user_id] += revenue
+
+    boards = set()
+    for (key, user_id), revenue in increments.items():
+        pipe.zincrby(key, revenue, user_id)
+        if key != ALL_TIME_KEY:
+            boards.add(key)
+    if boards:
+        pipe.sadd(BOARDS_KEY, *boards)
+
+
+def rebuild_leaderboards(db: Session) -> dict:
+    """
+    Tính lại mọi board từ một aggregate query. Board mới được ghi vào key tạm
+    rồi RENAME trong một MULTI/EXEC, nên reader không bao giờ thấy board rỗng.
+    """
+    start_time = time.time()
+    year = extract("year", SalesData.date)
+    month = extract("month", SalesData.date)
+    rows = (
+        db.query(SalesData.user_id, SalesData.store_id, year, month, func.sum(SalesData.revenue))
+        .group_by(SalesData.user_id, SalesData.store_id, year, month)
+        .yield_per(REBUILD_CHUNK_SIZE)
+    )
+
+    boards = defaultdict(lambda: defaultdict(float))
+    for user_id, store_id, sale_year, sale_month, revenue in rows:
+        revenue = float(revenue or 0)
+        boards[ALL_TIME_KEY][user_id] += revenue
+        boards[month_key(f"{int(sale_year):04d}-{int(sale_month):02d}")][user_id] += revenue
+        boards[store_key(store_id)][user_id] += revenue
+
+    pipe = r.pipeline(transaction=False)
+    for key, scores in boards.items():
+        tmp_key = f"{key}:rebuild"
+        pipe.delete(tmp_key)
+        items = list(scores.items())
+        for i in range(0, len(items), REBUILD_CHUNK_SIZE):
+            pipe.zadd(tmp_key, {str(user_id): score for user_id, score in items[i:i + REBUILD_CHUNK_SIZE]})
+    pipe.execute()
+
+    old_boards = r.smembers(BOARDS_KEY)
+    new_boards = set(boards) - {ALL_TIME_KEY}
+    pipe = r.pipeline(transaction=True)
+    for key in boards:
+        pipe.rename(f"{key}:rebuild", key)
+    stale = (old_boards - new_boards) | ({ALL_TIME_KEY} if not boards else set())
+    if stale:
+        pipe.delete(*stale)
+    pipe.delete(BOARDS_KEY)
+    if new_boards:
+        pipe.sadd(BOARDS_KEY, *new_boards)
+    pipe.set(READY_KEY, int(time.time()))
+    pipe.execute()
+
+    result = {
+        "boards": len(boards),
+        "users": len(boards[ALL_TIME_KEY]) if ALL_TIME_KEY in boards else 0,
+        "leaderboard_rebuild_time_ms": round((time.time() - start_time) * 1000, 2),
+    }
+    logger.info("Leaderboards rebuilt", **result)
+    return result
+
+
+def is_ready() -> bool:
+    return bool(r.exists(READY_KEY))
+
+
+def hydrate_emails(user_ids: list) -> dict:
+    """
+    user_id (str) -> email. HMGET từ Redis hash, user chưa có trong hash được
+    lấy bằng một query IN duy nhất rồi ghi lại vào hash.
+    """
+    if not user_ids:
+        return {}
+    emails = dict(zip(user_ids, r.hmget(USER_EMAILS_KEY, user_ids)))
+    missing = [int(user_id) for user_id, email in emails.items() if email is None]
+    if missing:
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            found = {
+                str(user_id): email
+                for user_id, email in db.query(User.id, User.email).filter(User.id.in_(missing))
+            }
+        finally:
+            db.close()
+        if found:
+            r.hset(USER_EMAILS_KEY, mapping=found)
+        emails.update(found)
+    return emails
+
+
+def top(key: str, limit: int, offset: int = 0) -> list:
+    """Trang [offset, offset + limit) của board, revenue giảm dần"""
+    entries = r.zrevrange(key, offset, offset + limit - 1, withscores=True)
+    emails = hydrate_emails([user_id for user_id, _ in entries])
+    return [
+        {
+            "rank": offset + i + 1,
+            "user_id": int(user_id),
+            "email": emails.get(user_id),
+            "total_revenue": round(score, 2),
+        }
+        for i, (user_id, score) in enumerate(entries)
+    ]
+
+
+def total_users(key: str) -> int:
+    return r.zcard(key)
+
+
+def rank_of(key: str, user_id: int) -> Optional[dict]:
+    """Rank (1-based) + revenue của user trong board, None nếu user chưa có sales"""
+    pipe = r.pipeline(transaction=False)
+    pipe.zrevrank(key, user_id)
+    pipe.zscore(key, user_id)
+    pipe.zcard(key)
+    rank, score, card = pipe.execute()
+    if rank is None:
+        return None
+    return {"rank": rank + 1, "user_id": user_id, "total_revenue": round(score, 2), "total_users": card}
@@ -0,0 +1,146 @@
+"""
+Analytics counters duy trì incremental trong Redis cho real-time push.
+
+Mỗi lần insert sales data: INCRBYFLOAT tổng revenue/ad_spend và ZINCRBY
+revenue của user vào các leaderboards (app.crud.leaderboard), cùng một
+MULTI/EXEC với PUBLISH thông báo cho các broadcaster (app.core.realtime).
+Đọc snapshot chỉ tốn Redis, không query DB - số dashboard clients không
+ảnh hưởng tới DB load.
+
+Counters được khởi tạo một lần từ DB (rebuild_live_counters), sau đó chỉ
+cập nhật incremental. Rebuild lại bằng POST /admin/analytics/live/rebuild
+nếu Redis bị flush hoặc nghi ngờ lệch.
+"""
+
+import threading
+import time
+from typing import Iterable, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.http_cache import GENERATION_KEY, UPDATED_AT_KEY
+from app.core.logging_config import get_logger
+from app.core.realtime import LiveAnalyticsBroadcaster
+from app.core.redis_client import r
+from app.core.serialization import dumps
+from app.crud import approx_analytics, leaderboard
+from app.models.models import SalesData
+
+logger = get_logger("live_analytics")
+
+REVENUE_KEY = "analytics:live:revenue"
+AD_SPEND_KEY = "analytics:live:ad_spend"
+COUNT_KEY = "analytics:live:count"
+READY_KEY = "analytics:live:ready"
+REBUILD_LOCK_KEY = "analytics:live:rebuild_lock"
+EVENTS_CHANNEL = "analytics:live:events"
+
+
+def record_sales(rows: Iterable[Tuple[int, int, object, float, float]]):
+    """
+    Cập nhật counters, leaderboards và sketches cho các sales vừa commit - rows là
+    (user_id, store_id, date, revenue, ad_spend). Một MULTI/EXEC cho cả batch.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+
+    pipe = r.pipeline(transaction=True)
+    pipe.incrbyfloat(REVENUE_KEY, sum(row[3] for row in rows))
+    pipe.incrbyfloat(AD_SPEND_KEY, sum(row[4] for row in rows))
+    pipe.incrby(COUNT_KEY, len(rows))
+    leaderboard.add_sales(pipe, (row[:4] for row in rows))
+    approx_analytics.add_sales(pipe, ((row[0], row[1], row[3]) for row in rows))
+    pipe.publish(EVENTS_CHANNEL, len(rows))
+    pipe.execute()
+
+
+def rebuild_live_counters(db: Session) -> dict:
+    """
+    Tính lại counters, leaderboards và sketches từ DB và ghi đè. Insert commit trong lúc
+    rebuild đang chạy có thể bị đếm thiếu - chạy lại nếu cần.
+    """
+    start_time = time.time()
+    totals = db.query(
+        func.coalesce(func.sum(SalesData.revenue), 0),
+        func.coalesce(func.sum(SalesData.ad_spend), 0),
+        func.count(SalesData.id),
+    ).one()
+    boards = leaderboard.rebuild_leaderboards(db)
+    sketch_stats = approx_analytics.rebuild_sketches(db)
+
+    pipe = r.pipeline(transaction=True)
+    pipe.mset({REVENUE_KEY: float(totals[0]), AD_SPEND_KEY: float(totals[1]), COUNT_KEY: totals[2]})
+    pipe.set(READY_KEY, int(time.time()))
+    pipe.publish(EVENTS_CHANNEL, "rebuild")
+    pipe.execute()
+
+    result = {
+        "sales_count": totals[2],
+        **boards,
+        **sketch_stats,
+        "rebuild_time_ms": round((time.time() - start_time) * 1000, 2),
+    }
+    logger.info("Live analytics counters rebuilt", **result)
+    return result
+
+
+def ensure_live_counters(background: bool = False) -> bool:
+    """
+    Rebuild nếu counters/leaderboards/sketches chưa được khởi tạo (Redis mới/flush). Chỉ một worker
+    chạy rebuild. background=True: rebuild trong thread riêng, trả về ngay (cho request handlers).
+    """
+    if r.exists(READY_KEY, leaderboard.READY_KEY, approx_analytics.READY_KEY) == 3:
+        return False
+    if not r.set(REBUILD_LOCK_KEY, 1, nx=True, ex=300):
+        return False
+
+    if background:
+        threading.Thread(target=_rebuild_and_unlock, name="live-counters-rebuild", daemon=True).start()
+    else:
+        _rebuild_and_unlock()
+    return True
+
+
+def _rebuild_and_unlock():
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_live_counters(db)
+    finally:
+        db.close()
+        r.delete(REBUILD_LOCK_KEY)
+
+
+def build_live_snapshot_json(limit: int = None) -> bytes:
+    """
+    Summary + top users từ counters (cùng schema với /analytics/summary và
+    /analytics/top_users) kèm generation hiện tại.
+    """
+    limit = limit or settings.live_top_users
+    revenue, ad_spend, count, generation, updated_at = r.mget(
+        REVENUE_KEY, AD_SPEND_KEY, COUNT_KEY, GENERATION_KEY, UPDATED_AT_KEY
+    )
+    total_revenue = float(revenue or 0)
+    total_ad_spend = float(ad_spend or 0)
+
+    return dumps({
+        "summary": {
+            "total_revenue": round(total_revenue, 2),
+            "total_ad_spend": round(total_ad_spend, 2),
+            "roas": round(total_revenue / total_ad_spend, 2) if total_ad_spend > 0 else 0,
+        },
+        "top_users": [
+            {key: entry[key] for key in ("user_id", "email", "total_revenue")}
+            for entry in leaderboard.top(leaderboard.ALL_TIME_KEY, limit)
+        ],
+        "sales_count": int(count or 0),
+        "generation": int(generation or 0),
+        "updated_at": int(updated_at) if updated_at else None,
+    })
+
+
+broadcaster = LiveAnalyticsBroadcaster(EVENTS_CHANNEL, build_live_snapshot_json, prepare=ensure_live_counters)
@@ -1,15 +1,38 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.models import SalesData, User, Store
 from app.schemas.sales_data import SalesDataCreate
-from app.core.redis_client import r
+from app.core.tag_cache import bump_tags, sales_tags
+from app.core.serialization import dumps
+from app.crud.cohorts import record_cohort_sales
+from app.crud.live_analytics import record_sales
+from app.crud.tenant_analytics import bump_tenant_generations, forget_lookups
 from app.core.logging_config import get_logger
-from faker import Faker
 from datetime import datetime, timedelta
+from functools import lru_cache
+import itertools
 import random
 
-fake = Faker()
 logger = get_logger("sales_crud")
 
+@lru_cache
+def get_faker():
+    """Faker chỉ được import/khởi tạo khi thật sự tạo fake data (import chậm)"""
+    from faker import Faker
+    return Faker()
+
+def invalidate_analytics(db: Session, rows: list) -> int:
+    """
+    Gọi sau khi commit rows (user_id, store_id, date, revenue, ad_spend): bump tags
+    global/store/user/date + generation của tenants, cập nhật live counters.
+    Trả về global generation mới
+    """
+    generation = bump_tags(sales_tags(rows))
+    bump_tenant_generations(db, {store_id for _, store_id, *_ in rows})
+    # Counters cho real-time stream + leaderboards - không cần query lại DB
+    record_sales(rows)
+    return generation
+
 def create_sales_data(db: Session, data: SalesDataCreate):
     logger.info("Creating new sales data",
                 revenue=data.revenue,
@@ -19,14 +42,18 @@ def create_sales_data(db: Session, data: SalesDataCreate):
 
     sales = SalesData(**data.dict())
     db.add(sales)
+    record_cohort_sales(db, [(data.user_id, data.store_id, data.date, data.revenue, data.ad_spend)])
     db.commit()
     db.refresh(sales)
 
-    # invalidate cache sau khi insert
-    r.delete("analytics:summary")
+    # Bump generations: cache keys và ETag analytics bị ảnh hưởng đổi theo
+    generation = invalidate_analytics(
+        db, [(sales.user_id, sales.store_id, sales.date, sales.revenue, sales.ad_spend)]
+    )
     logger.info("Sales data created successfully",
                 sales_id=sales.id,
-                cache_invalidated=True)
+                cache_invalidated=True,
+                analytics_generation=generation)
 
     return sales
 
@@ -36,9 +63,43 @@ def get_all_sales_data(db: Session):
     logger.info("Sales data fetched", count=len(sales_data))
     return sales_data
 
+def stream_sales_data_json(db: Session, batch_size: int = 1000):
+    """
+    Toàn bộ sales data dưới dạng JSON array, từng batch một (không load hết ORM
+    objects vào memory). Query và batch đầu chạy ngay khi gọi - lỗi DB nổi lên
+    trước khi response bắt đầu; trả về generator của các chunks. Caller đóng session.
+    """
+    logger.info("Streaming all sales data", batch_size=batch_size)
+    columns = (
+        SalesData.date,
+        SalesData.revenue,
+        SalesData.ad_spend,
+        SalesData.store_id,
+        SalesData.user_id,
+        SalesData.id,
+    )
+    result = db.execute(
+        select(*columns).order_by(SalesData.id).execution_options(yield_per=batch_size)
+    )
+    partitions = result.partitions()
+    return _sales_chunks(next(partitions, []), partitions)
+
+def _sales_chunks(first: list, partitions):
+    count = 0
+    try:
+        yield b"["
+        for rows in itertools.chain([first] if first else [], partitions):
+            chunk = b",".join(dumps(row._asdict()) for row in rows)
+            yield (b"," if count else b"") + chunk
+            count += len(rows)
+        yield b"]"
+    finally:
+        logger.info("Sales data streamed", count=count)
+
 def generate_fake_sales_data(db: Session, count: int = 50):
     """Tạo dữ liệu fake cho SalesData"""
     logger.info("Starting fake data generation", requested_count=count)
+    fake = get_faker()
 
     # Lấy danh sách users và stores có sẵn
     users = db.query(User).all()
@@ -54,6 +115,7 @@ def generate_fake_sales_data(db: Session, count: int = 50):
         db.add(fake_user)
         db.commit()
         db.refresh(fake_user)
+        forget_lookups(emails=[fake_user.email])
         users = [fake_user]
         logger.info("Fake user created", user_id=fake_user.id, email=fake_user.email)
 
@@ -67,10 +129,12 @@ def generate_fake_sales_data(db: Session, count: int = 50):
         db.add(fake_store)
         db.commit()
         db.refresh(fake_store)
+        forget_lookups(store_ids=[fake_store.id])
         stores = [fake_store]
         logger.info("Fake store created", store_id=fake_store.id, name=fake_store.name)
 
     created_sales = []
+    live_rows = []  # (user_id, store_id, date, revenue, ad_spend) - tránh refresh từng object sau commit
     total_revenue = 0
     total_ad_spend = 0
 
@@ -95,6 +159,7 @@ def generate_fake_sales_data(db: Session, count: int = 50):
 
         db.add(sales_data)
         created_sales.append(sales_data)
+        live_rows.append((sales_data.user_id, sales_data.store_id, fake_date, revenue, ad_spend))
 
         # Log progress mỗi 10 record
         if (i + 1) % 10 == 0:
@@ -103,17 +168,18 @@ def generate_fake_sales_data(db: Session, count: int = 50):
                        total=count,
                        progress_percent=round((i+1)/count*100, 1))
 
+    record_cohort_sales(db, live_rows)
     db.commit()
 
     # Invalidate cache sau khi tạo fake data
-    r.delete("analytics:summary")
-    r.delete("analytics:top_users")
+    generation = invalidate_analytics(db, live_rows)
 
     logger.info("Fake data generation completed",
                 total_created=len(created_sales),
                 total_revenue=total_revenue,
                 total_ad_spend=total_ad_spend,
                 average_revenue=round(total_revenue/len(created_sales), 2),
-                cache_invalidated=True)
+                cache_invalidated=True,
+                analytics_generation=generation)
 
     return created_sales
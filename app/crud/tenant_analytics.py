@@ -0,0 +1,213 @@
+"""
+Analytics theo tenant - tenant là user sở hữu stores (Store.owner_id).
+
+Dữ liệu của tenant là sales_data của các stores thuộc tenant đó, lọc bằng
+`store_id IN (stores của owner)` (+ khoảng ngày) nên đi theo idx_sales_store_date.
+
+Mỗi tenant có generation counter riêng (tenant:<id>:analytics:generation), chỉ
+bump khi có sales ghi vào stores của tenant đó. Cache key và ETag chứa
+generation của tenant, nên một lần ghi chỉ làm mất cache của đúng tenant bị ảnh
+hưởng thay vì toàn bộ analytics cache.
+"""
+
+import time
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.admission import admit_current
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.serialization import dumps, to_bytes
+from app.core.tenant_quota import tenant_query_slot
+from app.core.timing import span
+from app.crud.distribution import etag_resource
+from app.models.models import SalesData, Store, User
+
+logger = get_logger("tenant_analytics")
+
+STORE_OWNERS_KEY = "tenant:store_owners"  # hash store_id -> owner_id
+TENANT_IDS_KEY = "tenant:ids"  # hash email -> user_id (token cũ không có claim uid)
+LOOKUP_TTL_SECONDS = 3600  # Hai hash trên được build lại từ DB sau tối đa khoảng này
+CACHE_TTL_SECONDS = 60
+
+
+def tenant_key(tenant_id: int, *parts) -> str:
+    return ":".join(("tenant", str(tenant_id), *map(str, parts)))
+
+
+def generation_key(tenant_id: int) -> str:
+    return tenant_key(tenant_id, "analytics", "generation")
+
+
+def updated_at_key(tenant_id: int) -> str:
+    return tenant_key(tenant_id, "analytics", "generation", "updated_at")
+
+
+def get_tenant_generation(tenant_id: int) -> Tuple[int, int]:
+    """(generation, updated_at) của tenant - một round trip Redis"""
+    with span("redis"):
+        generation, updated_at = r.mget(generation_key(tenant_id), updated_at_key(tenant_id))
+    if updated_at is None:
+        updated_at = int(time.time())
+        r.set(updated_at_key(tenant_id), updated_at, nx=True)
+    return int(generation or 0), int(updated_at)
+
+
+def _cache_lookup(key: str, mapping: dict):
+    pipe = r.pipeline(transaction=False)
+    pipe.hset(key, mapping=mapping)
+    # TTL chỉ đặt khi hash chưa có (NX): ghi thường xuyên không kéo dài mãi mapping cũ
+    pipe.expire(key, LOOKUP_TTL_SECONDS, nx=True)
+    pipe.execute()
+
+
+def forget_lookups(store_ids: Iterable[int] = (), emails: Iterable[str] = ()):
+    """Gọi sau khi tạo/sửa stores hoặc users - xoá mapping cũ (vd: id được dùng lại sau khi reset DB)"""
+    store_ids, emails = list(store_ids), list(emails)
+    pipe = r.pipeline(transaction=False)
+    if store_ids:
+        pipe.hdel(STORE_OWNERS_KEY, *store_ids)
+    if emails:
+        pipe.hdel(TENANT_IDS_KEY, *emails)
+    pipe.execute()
+
+
+def tenant_id_for_email(db: Session, email: str) -> Optional[int]:
+    """user id của email - Redis hash trước, DB khi chưa có"""
+    cached = r.hget(TENANT_IDS_KEY, email)
+    if cached is not None:
+        return int(cached)
+    user_id = db.execute(select(User.id).where(User.email == email)).scalar()
+    if user_id is not None:
+        _cache_lookup(TENANT_IDS_KEY, {email: user_id})
+    return user_id
+
+
+def store_owners(db: Session, store_ids: Iterable[int]) -> dict:
+    """store_id -> owner_id (HMGET, chỉ query DB cho stores chưa có trong hash)"""
+    store_ids = sorted(set(store_ids))
+    if not store_ids:
+        return {}
+    owners = {
+        store_id: int(owner_id)
+        for store_id, owner_id in zip(store_ids, r.hmget(STORE_OWNERS_KEY, store_ids))
+        if owner_id is not None
+    }
+    missing = [store_id for store_id in store_ids if store_id not in owners]
+    if missing:
+        rows = db.execute(select(Store.id, Store.owner_id).where(Store.id.in_(missing))).all()
+        found = {row.id: row.owner_id for row in rows if row.owner_id is not None}
+        if found:
+            _cache_lookup(STORE_OWNERS_KEY, found)
+        owners.update(found)
+    return owners
+
+
+def bump_tenant_generations(db: Session, store_ids: Iterable[int]) -> dict:
+    """Gọi sau khi ghi sales data - chỉ invalidate analytics của owners các stores bị ghi"""
+    tenant_ids = sorted(set(store_owners(db, store_ids).values()))
+    if not tenant_ids:
+        return {}
+    now = int(time.time())
+    pipe = r.pipeline()
+    for tenant_id in tenant_ids:
+        pipe.incr(generation_key(tenant_id))
+        pipe.set(updated_at_key(tenant_id), now)
+    results = pipe.execute()
+    return dict(zip(tenant_ids, results[::2]))
+
+
+def _scope(tenant_id: int, start_date: Optional[date] = None, end_date: Optional[date] = None) -> list:
+    tenant_stores = select(Store.id).where(Store.owner_id == tenant_id)
+    filters = [SalesData.store_id.in_(tenant_stores)]
+    if start_date:
+        filters.append(SalesData.date >= start_date)
+    if end_date:
+        filters.append(SalesData.date <= end_date)
+    return filters
+
+
+def compute_tenant_summary(db: Session, tenant_id: int, start_date=None, end_date=None) -> dict:
+    """Tổng revenue/ad_spend/ROAS, số orders và stores có sales của tenant"""
+    total_revenue, total_ad_spend, orders, stores = db.execute(
+        select(
+            func.coalesce(func.sum(SalesData.revenue), 0),
+            func.coalesce(func.sum(SalesData.ad_spend), 0),
+            func.count(),
+            func.count(func.distinct(SalesData.store_id)),
+        ).where(*_scope(tenant_id, start_date, end_date))
+    ).one()
+    return {
+        "total_revenue": round(total_revenue, 2),
+        "total_ad_spend": round(total_ad_spend, 2),
+        "roas": round(total_revenue / total_ad_spend, 2) if total_ad_spend > 0 else 0,
+        "orders": orders,
+        "stores": stores,
+    }
+
+
+def compute_tenant_top_users(db: Session, tenant_id: int, limit: int = 3, start_date=None, end_date=None) -> list:
+    """Top users theo revenue trong các stores của tenant"""
+    total_revenue = func.sum(SalesData.revenue)
+    rows = db.execute(
+        select(User.id.label("user_id"), User.email, total_revenue.label("total_revenue"))
+        .join(SalesData, SalesData.user_id == User.id)
+        .where(*_scope(tenant_id, start_date, end_date))
+        .group_by(User.id, User.email)
+        .order_by(total_revenue.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {"user_id": row.user_id, "email": row.email, "total_revenue": round(row.total_revenue, 2)}
+        for row in rows
+    ]
+
+
+def cache_key(tenant_id: int, name: str, generation: int, **params) -> str:
+    """tenant:<id>:analytics:<name>:g<generation>:<digest tham số>"""
+    return tenant_key(tenant_id, "analytics", f"g{generation}", etag_resource(name, **params))
+
+
+def _cached(tenant_id: int, name: str, generation: int, compute, **params) -> bytes:
+    start_time = time.time()
+    key = cache_key(tenant_id, name, generation, **params)
+    with span("redis"):
+        cached_data = r.get(key)
+    if cached_data:
+        logger.info("Tenant analytics cache hit", tenant_id=tenant_id, cache_key=key)
+        return to_bytes(cached_data)
+
+    # Slot admission trước quota: lần chạy lại sau khi chờ slot không tính quota hai lần.
+    # Quota chỉ áp cho query thật sự chạm DB
+    admit_current()
+    with tenant_query_slot(tenant_id):
+        with span("db"):
+            result = compute()
+    with span("serialize"):
+        payload = dumps(result)
+    with span("redis"):
+        r.setex(key, CACHE_TTL_SECONDS, payload)
+    logger.info("Tenant analytics computed and cached",
+               tenant_id=tenant_id,
+               cache_key=key,
+               query_time_ms=round((time.time() - start_time) * 1000, 2))
+    return payload
+
+
+def get_tenant_summary_json(db: Session, tenant_id: int, generation: int, start_date=None, end_date=None) -> bytes:
+    return _cached(
+        tenant_id, "summary", generation,
+        lambda: compute_tenant_summary(db, tenant_id, start_date, end_date),
+        start=start_date, end=end_date,
+    )
+
+
+def get_tenant_top_users_json(db: Session, tenant_id: int, generation: int, limit=3, start_date=None, end_date=None) -> bytes:
+    return _cached(
+        tenant_id, "top_users", generation,
+        lambda: compute_tenant_top_users(db, tenant_id, limit, start_date, end_date),
+        start=start_date, end=end_date, limit=limit,
+    )
@@ -1,11 +1,17 @@
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
+from app.core.prepared import PreparedQuery
+from app.crud.tenant_analytics import forget_lookups
 from app.models.models import User
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Chạy trên mọi request cần user (login, register, get_current_user)
+USER_BY_EMAIL = PreparedQuery("user_by_email", select(User).where(User.email == bindparam("email")))
+
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    return USER_BY_EMAIL.execute(db, email=email).scalars().first()
 
 def create_user(db: Session, email:str, password:str):
     hashed_pw = pwd_context.hash(password)
@@ -13,6 +19,7 @@ def create_user(db: Session, email:str, password:str):
     db.add(user)
     db.commit()
     db.refresh(user)
+    forget_lookups(emails=[email])
     return user
 
 def verify_password(plain_pw: str, hashed_pw: str):
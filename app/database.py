@@ -1,18 +1,230 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import itertools
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional
 
-import os
-from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-load_dotenv()
+from app.core.admission import is_statement_timeout, on_session_begin
+from app.core.config import settings
+from app.core.http_cache import written_within
+from app.core.logging_config import get_logger
 
-DB_URL = (
-    f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}"
-    f"@{os.getenv('POSTGRES_HOST')}:{os.getenv('POSTGRES_PORT')}/{os.getenv('POSTGRES_DB')}"
-)
+logger = get_logger("database")
 
-engine = create_engine(DB_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _create_engine(url: str) -> Engine:
+    engine = create_engine(url)
+    if settings.query_profiling_enabled:
+        from app.core.query_profiler import install_query_profiler
+
+        install_query_profiler(engine)
+    return engine
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """Engine được tạo lần đầu khi cần (lifespan hoặc session đầu tiên), không phải lúc import"""
+    return _create_engine(settings.sqlalchemy_database_url)
+
+
+# PostgreSQL standby: 0 khi đã replay hết WAL nhận được (primary rảnh không bị tính là lag)
+_REPLICATION_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replication_lag_seconds(conn: Connection) -> Optional[float]:
+    """Độ trễ replay của replica (giây), None nếu dialect không có khái niệm replication"""
+    if conn.dialect.name != "postgresql":
+        conn.execute(text("SELECT 1"))
+        return None
+    return float(conn.execute(_REPLICATION_LAG_SQL).scalar() or 0)
+
+
+class _Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.ejected_until = 0.0
+        self.checked_at = float("-inf")
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """
+    Chọn engine cho read-only sessions: round-robin giữa các replicas.
+
+    Mỗi replica được kiểm tra (SELECT 1 / replication lag) tối đa một lần mỗi
+    `check_interval` giây, ngay trên request chọn nó. Replica lỗi kết nối bị
+    loại (ejected) trong `eject_seconds`; replica trễ hơn `max_lag_seconds` bị bỏ
+    qua tới lần kiểm tra sau. Không còn replica dùng được -> None (caller dùng primary).
+    """
+
+    def __init__(
+        self,
+        engines: List[Engine],
+        max_lag_seconds: Optional[float] = None,
+        eject_seconds: float = 30,
+        check_interval: float = 5,
+    ):
+        self._replicas = [_Replica(engine) for engine in engines]
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.max_lag_seconds = max_lag_seconds
+        self.eject_seconds = eject_seconds
+        self.check_interval = check_interval
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [replica.engine for replica in self._replicas]
+
+    def choose(self) -> Optional[Engine]:
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[next(self._counter) % len(self._replicas)]
+            if self._usable(replica):
+                return replica.engine
+        return None
+
+    def _usable(self, replica: _Replica) -> bool:
+        now = time.monotonic()
+        if replica.ejected_until > now:
+            return False
+        if now - replica.checked_at >= self.check_interval:
+            self._check(replica, now)
+        if replica.ejected_until > now:
+            return False
+        return self.max_lag_seconds is None or replica.lag is None or replica.lag <= self.max_lag_seconds
+
+    def _check(self, replica: _Replica, now: float):
+        with self._lock:
+            if now - replica.checked_at < self.check_interval:
+                return  # Thread khác vừa kiểm tra
+            replica.checked_at = now
+        try:
+            with replica.engine.connect() as conn:
+                replica.lag = replication_lag_seconds(conn)
+            replica.error = None
+        except Exception as e:
+            self._eject(replica, str(e))
+
+    def _eject(self, replica: _Replica, error: str):
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        replica.error = error[:200]
+        logger.warning("Database replica ejected",
+                       replica=replica.engine.url.render_as_string(hide_password=True),
+                       eject_seconds=self.eject_seconds,
+                       error=replica.error)
+
+    def report_failure(self, engine: Engine, error: str):
+        """Gọi khi query trên replica lỗi kết nối - loại replica ngay, không chờ lần kiểm tra sau"""
+        for replica in self._replicas:
+            if replica.engine is engine:
+                self._eject(replica, error)
+
+    def check_all(self) -> list:
+        """
+        Probe ngay mọi replica cho health check. Chỉ báo cáo: không đụng tới
+        ejected_until / checked_at / lag, replica bị loại vẫn bị loại tới hết hạn.
+        """
+        now = time.monotonic()
+        results = []
+        for replica in self._replicas:
+            lag, error = None, None
+            try:
+                with replica.engine.connect() as conn:
+                    lag = replication_lag_seconds(conn)
+            except Exception as e:
+                error = str(e)[:200]
+            results.append({
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": error is None,
+                "ejected": replica.ejected_until > now,
+                "lag_seconds": lag,
+                "error": error,
+            })
+        return results
+
+    def status(self) -> list:
+        now = time.monotonic()
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.ejected_until <= now,
+                "lag_seconds": replica.lag,
+                "error": replica.error,
+            }
+            for replica in self._replicas
+        ]
+
+
+@lru_cache
+def get_replica_router() -> ReplicaRouter:
+    urls = [url.strip() for url in settings.replica_database_urls.split(",") if url.strip()]
+    return ReplicaRouter(
+        [_create_engine(url) for url in urls],
+        max_lag_seconds=settings.replica_max_lag_seconds,
+        eject_seconds=settings.replica_eject_seconds,
+        check_interval=settings.replica_check_interval_seconds,
+    )
+
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker tự bind vào engine ở lần gọi đầu tiên"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+# Admission slot + statement_timeout theo deadline của request (no-op ngoài route nặng)
+event.listen(SessionLocal, "after_begin", on_session_begin)
 
 Base = declarative_base()
+
+
+def read_session() -> Session:
+    """Session cho query chỉ đọc - replica nếu có replica dùng được, ngược lại primary"""
+    router = get_replica_router()
+    # Ngay sau một lần ghi replica có thể chưa replay kịp: kết quả cũ sẽ bị cache / ETag
+    # dưới generation mới tới lần ghi sau -> đọc primary trong replica_read_after_write_seconds
+    if not router.engines or written_within(settings.replica_read_after_write_seconds):
+        return SessionLocal()
+    engine = router.choose()
+    return SessionLocal(bind=engine) if engine is not None else SessionLocal()
+
+
+def report_read_failure(db: Session, error: BaseException):
+    """
+    Lỗi khi query trên read session: replica mất kết nối giữa chừng bị loại ngay để
+    request sau đi replica khác/primary. Query bị huỷ do statement_timeout (deadline
+    của request) không phải lỗi replica.
+    """
+    if isinstance(error, OperationalError) and not is_statement_timeout(error):
+        get_replica_router().report_failure(db.get_bind(), str(error))
+
+
+def init_db() -> Engine:
+    """Tạo engine và bind SessionLocal - gọi trong app lifespan"""
+    engine = get_engine()
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def dispose_db():
+    """Đóng connection pool khi shutdown"""
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    if get_replica_router.cache_info().currsize:
+        for engine in get_replica_router().engines:
+            engine.dispose()
@@ -1,8 +1,83 @@
-from app.database import SessionLocal
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.auth import decode_token_claims, decode_token_subject, is_admin_email
+from app.core.timing import span
+from app.crud.user import get_user_by_email
+from app.database import SessionLocal, read_session, report_read_failure
+from app.models.models import User
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session cho endpoints chỉ đọc - replica (round-robin) nếu cấu hình, không thì primary"""
+    db = read_session()
+    try:
+        yield db
+    except OperationalError as e:
+        report_read_failure(db, e)
+        raise
+    finally:
+        db.close()
+
+def get_stream_read_db():
+    """
+    Read session cho StreamingResponse: body được gửi sau khi dependency đã thoát,
+    nên response tự đóng session khi stream xong. Ở đây chỉ đóng khi handler lỗi.
+    """
+    db = read_session()
+    try:
+        yield db
+    except BaseException as e:
+        report_read_failure(db, e)
+        db.close()
+        raise
+
+def get_token_subject(token: str = Depends(oauth2_scheme)) -> str:
+    """Chỉ verify JWT (signature + exp), không query DB"""
+    with span("auth"):
+        email = decode_token_subject(token)
+    if not email:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return email
+
+def get_tenant_id(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> int:
+    """User id của token (claim uid) - tenant của analytics theo owner"""
+    with span("auth"):
+        claims = decode_token_claims(token)
+    if not claims or not claims.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if claims.get("uid") is not None:
+        return int(claims["uid"])
+    # Token phát hành trước khi có claim uid
+    from app.crud.tenant_analytics import tenant_id_for_email
+
+    with span("auth"):
+        tenant_id = tenant_id_for_email(db, claims["sub"])
+    if tenant_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return tenant_id
+
+def get_current_user(
+    email: str = Depends(get_token_subject), db: Session = Depends(get_db)
+) -> User:
+    with span("auth"):
+        user = get_user_by_email(db, email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+def get_admin_subject(email: str = Depends(get_token_subject)) -> str:
+    """Admin = email nằm trong ADMIN_EMAILS (không cần DB)"""
+    if not is_admin_email(email):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return email
@@ -1,21 +1,64 @@
-from fastapi import FastAPI
-from .database import Base, engine
-from app.models import models  # Import models để register với SQLAlchemy
-from app.routers import sales, auth, health, prefect_api
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import OperationalError
+from app.core.admission import RETRY_AFTER_SECONDS, AdmissionRejectedError, is_statement_timeout
+from app.database import init_db, dispose_db
+from app.core.redis_client import get_redis, close_redis
+from app.routers import sales, auth, health, prefect_api, admin, realtime, tenant_analytics, dashboard
+from app.crud.live_analytics import broadcaster
+from app.middleware.compression_middleware import CompressionMiddleware
 from app.middleware.logging_middleware import LoggingMiddleware
 from app.core.logging_config import logger
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("🚀 SaaS Analytics API starting up...")
+    # Tạo DB engine + Redis client ở đây thay vì lúc import module
+    # Schema do Alembic quản lý: chạy `python scripts/migrate.py upgrade` trước khi start app
+    init_db()
+    get_redis()
+    yield
+    await broadcaster.stop()
+    close_redis()
+    dispose_db()
+    logger.info("🛑 SaaS Analytics API shutting down...")
+
+
 app = FastAPI(
     title="SaaS Analytics API",
     description="API phân tích dữ liệu bán hàng với logging và monitoring",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# Thêm middleware
+# Thêm middleware (add sau = chạy ngoài cùng)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(LoggingMiddleware)
 
-# Tạo bảng tự động nếu chưa có
-Base.metadata.create_all(bind=engine)
+# Quá tải / hết deadline: trả 503 nhanh để client retry, không giữ connection và thread
+@app.exception_handler(AdmissionRejectedError)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejectedError):
+    logger.warning("Request shed by admission control", path=request.url.path, reason=exc.detail)
+    return ORJSONResponse(
+        {"detail": exc.detail}, status_code=503, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(OperationalError)
+async def operational_error_handler(request: Request, exc: OperationalError):
+    if not is_statement_timeout(exc):
+        raise exc
+    logger.warning("Query cancelled by request deadline", path=request.url.path)
+    return ORJSONResponse(
+        {"detail": "Request deadline exceeded"},
+        status_code=503,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
 
 @app.get("/")
 def home():
@@ -27,11 +70,7 @@ app.include_router(sales.router)
 app.include_router(auth.router)
 app.include_router(health.router)
 app.include_router(prefect_api.router)
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("🚀 SaaS Analytics API starting up...")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("🛑 SaaS Analytics API shutting down...")
\ No newline at end of file
+app.include_router(admin.router)
+app.include_router(realtime.router)
+app.include_router(tenant_analytics.router)
+app.include_router(dashboard.router)
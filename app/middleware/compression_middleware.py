@@ -0,0 +1,107 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import is_compressible, negotiate_encoding, stream_compressor
+from app.core.config import settings
+
+
+class CompressionMiddleware:
+    """
+    Nén response theo Accept-Encoding (zstd / br / gzip).
+
+    - Body hoàn chỉnh nhỏ hơn settings.compression_min_size: trả nguyên.
+    - Streaming response (more_body): nén từng chunk với flush, bỏ Content-Length.
+    - Response đã có Content-Encoding (vd: compressed variant lấy từ cache) đi thẳng qua.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_size if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Giữ lại start message cho đến khi biết body có đáng nén không
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or not is_compressible(headers.get("content-type", ""))
+                or message["status"] in (204, 304)
+            )
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None and not more_body:
+            # Body hoàn chỉnh trong một message
+            if len(body) < self.minimum_size:
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = stream_compressor(self.encoding)
+            compressed = self.compressor.compress(body) + self.compressor.finish()
+            headers = self._compressed_headers()
+            headers["Content-Length"] = str(len(compressed))
+            await self.send(self.start_message)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+
+        if self.compressor is None:
+            # Streaming response: header gửi ngay, body nén từng chunk
+            self.compressor = stream_compressor(self.encoding)
+            headers = self._compressed_headers()
+            del headers["Content-Length"]
+            await self.send(self.start_message)
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _compressed_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        return headers
@@ -1,11 +1,57 @@
 from fastapi import Request, Response
 import time
 import uuid
+from urllib.parse import parse_qsl, urlencode
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.auth import decode_token_subject, is_admin_email
+from app.core.config import settings
 from app.core.logging_config import get_logger
+from app.core.query_profiler import finish_profile, profile_headers, start_profile
+from app.core.redis_client import r
+from app.core.sampling_profiler import ProfilerBusyError, SamplingProfiler
+from app.core.timing import start_timings
 
 logger = get_logger("request_middleware")
 
+PROFILE_KEY_PREFIX = "profiler:request"
+# Giá trị của các query params này không bao giờ được ghi vào log
+SENSITIVE_QUERY_PARAMS = {"token", "access_token", "ticket"}
+
+
+def _log_url(request: Request) -> str:
+    url = request.url
+    if not url.query:
+        return str(url)
+    params = [
+        (key, "[REDACTED]" if key.lower() in SENSITIVE_QUERY_PARAMS else value)
+        for key, value in parse_qsl(url.query, keep_blank_values=True)
+    ]
+    return str(url.replace(query=urlencode(params)))
+
+
+async def _on_body_complete(body_iterator, callback):
+    """Chạy callback khi app gửi xong body (kể cả lỗi / client ngắt kết nối giữa chừng)"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        callback()
+
+
+def _save_profile(request_id: str, sampler: SamplingProfiler):
+    r.setex(f"{PROFILE_KEY_PREFIX}:{request_id}", settings.profiler_result_ttl, sampler.folded())
+
+
+def _profile_requested(request: Request) -> bool:
+    """Per-request sampling profile: header X-Profile: 1 từ admin token"""
+    if request.headers.get("x-profile", "").lower() not in ("1", "true"):
+        return False
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    return scheme.lower() == "bearer" and is_admin_email(decode_token_subject(token))
+
+
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # Tạo request ID duy nhất
@@ -17,7 +63,7 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             "Request started",
             request_id=request_id,
             method=request.method,
-            url=str(request.url),
+            url=_log_url(request),
             client_ip=request.client.host if request.client else "unknown",
             user_agent=request.headers.get("user-agent", "unknown"),
         )
@@ -25,26 +71,68 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         # Thêm request_id vào request state
         request.state.request_id = request_id
 
+        # Timing spans + SQL profiling: contextvar set ở đây được app (và threadpool) kế thừa
+        timings = start_timings()
+        profile = start_profile() if settings.query_profiling_enabled else None
+
+        sampler = None
+        profile_status = None
+        if _profile_requested(request):
+            try:
+                sampler = SamplingProfiler(settings.profiler_interval_ms / 1000).start()
+            except ProfilerBusyError:
+                profile_status = "busy"
+
         try:
             # Xử lý request
-            response: Response = await call_next(request)
+            try:
+                response: Response = await call_next(request)
+            finally:
+                if sampler is not None:
+                    sampler.stop()
 
             # Tính thời gian xử lý
             process_time = time.time() - start_time
+            process_time_ms = round(process_time * 1000, 2)
 
-            # Log response
-            logger.info(
-                "Request completed",
-                request_id=request_id,
-                method=request.method,
-                url=str(request.url),
-                status_code=response.status_code,
-                process_time_ms=round(process_time * 1000, 2),
-            )
+            extra_timings = {}
+            if profile is not None:
+                extra_timings["sql"] = (profile.total_ms, f"{profile.count} queries")
+
+            if sampler is not None:
+                # Redis client đồng bộ: ghi trong threadpool để không chặn event loop
+                await run_in_threadpool(_save_profile, request_id, sampler)
+                profile_status = "captured"
+
+            def complete():
+                # Body stream (vd: /sales-data/) vẫn query sau khi headers đã gửi -> profile chốt ở đây
+                db_fields = {}
+                if profile is not None:
+                    route = request.scope.get("route")
+                    db_fields = finish_profile(profile, request_id, route.path if route else request.url.path)
+
+                # Log response
+                logger.info(
+                    "Request completed",
+                    request_id=request_id,
+                    method=request.method,
+                    url=_log_url(request),
+                    status_code=response.status_code,
+                    process_time_ms=round((time.time() - start_time) * 1000, 2),
+                    timings_ms=timings.as_log_fields(),
+                    **db_fields,
+                )
+
+            response.body_iterator = _on_body_complete(response.body_iterator, complete)
 
-            # Thêm headers cho tracing
+            # Thêm headers cho tracing (SQL headers chỉ tính queries trước khi body bắt đầu)
             response.headers["X-Request-ID"] = request_id
-            response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
+            response.headers["X-Process-Time"] = str(process_time_ms)
+            response.headers["Server-Timing"] = timings.server_timing_header(process_time_ms, extra_timings)
+            if profile is not None:
+                response.headers.update(profile_headers(profile))
+            if profile_status is not None:
+                response.headers["X-Profile-Status"] = profile_status
 
             return response
 
@@ -55,9 +143,9 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 "Request failed",
                 request_id=request_id,
                 method=request.method,
-                url=str(request.url),
+                url=_log_url(request),
                 error=str(e),
                 error_type=type(e).__name__,
                 process_time_ms=round(process_time * 1000, 2),
             )
-            raise
\ No newline at end of file
+            raise
@@ -39,3 +39,33 @@ class SalesData(Base):
         Index('idx_sales_revenue_user', 'revenue', 'user_id'),  # For top users queries
         Index('idx_sales_store_date', 'store_id', 'date'),  # For store analytics
     )
+
+
+# Cohort analytics (app/crud/cohorts.py): cập nhật incremental khi ghi sales, rebuild bởi nightly ETL
+class UserCohort(Base):
+    """First sale của mỗi user - cohort = tháng của first sale"""
+    __tablename__ = "user_cohorts"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    first_sale_date = Column(Date, nullable=False)
+    cohort_month = Column(Date, nullable=False, index=True)  # Ngày đầu tháng
+
+
+class UserMonthlyActivity(Base):
+    """Revenue/orders mỗi (user, tháng) có sales - đủ để chuyển user sang cohort khác khi first sale lùi lại"""
+    __tablename__ = "user_monthly_activity"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0)
+    ad_spend = Column(Float, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+
+
+class CohortPeriod(Base):
+    """Aggregate mỗi (cohort, period): period = số tháng kể từ tháng của cohort"""
+    __tablename__ = "cohort_periods"
+    cohort_month = Column(Date, primary_key=True)
+    period = Column(Integer, primary_key=True)
+    active_users = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    ad_spend = Column(Float, nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
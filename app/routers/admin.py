@@ -0,0 +1,89 @@
+"""
+Admin endpoints - sampling profiler cho production (không cần restart worker)
+và bảo trì real-time analytics counters.
+
+- Per-request: gửi request bất kỳ với header `X-Profile: 1` + admin token,
+  sau đó lấy profile bằng X-Request-ID của response.
+- Time window: POST /admin/profiler/capture?seconds=30 profile cả worker trong 30s.
+
+Output là folded stacks - vẽ flame graph bằng `flamegraph.pl`, speedscope.app hoặc inferno.
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.redis_client import r
+from app.core.sampling_profiler import ProfilerBusyError, SamplingProfiler
+from app.crud import ingest, live_analytics
+from app.dependencies.deps import get_admin_subject, get_db
+from app.middleware.logging_middleware import PROFILE_KEY_PREFIX
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+logger = get_logger("admin")
+
+
+@router.post("/profiler/capture", response_class=PlainTextResponse)
+async def capture_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(None, gt=0),
+    admin: str = Depends(get_admin_subject),
+):
+    """Profile worker hiện tại trong `seconds` giây, trả về folded stacks"""
+    if seconds > settings.profiler_max_window_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be <= {settings.profiler_max_window_seconds}",
+        )
+
+    profiler = SamplingProfiler((interval_ms or settings.profiler_interval_ms) / 1000)
+    try:
+        profiler.start()
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info("Sampling profile started", admin=admin, seconds=seconds)
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+
+    logger.info("Sampling profile captured", admin=admin, **profiler.summary())
+    return PlainTextResponse(
+        profiler.folded(),
+        headers={f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in profiler.summary().items()},
+    )
+
+
+@router.get("/profiler/requests/{request_id}", response_class=PlainTextResponse)
+def get_request_profile(request_id: str, admin: str = Depends(get_admin_subject)):
+    """Folded stacks của request đã được profile bằng header X-Profile: 1"""
+    folded = r.get(f"{PROFILE_KEY_PREFIX}:{request_id}")
+    if folded is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    return PlainTextResponse(folded)
+
+
+@router.post("/analytics/live/rebuild")
+def rebuild_live_counters(db: Session = Depends(get_db), admin: str = Depends(get_admin_subject)):
+    """Tính lại Redis counters của /analytics/stream và leaderboards từ DB (sau khi Redis bị flush/lệch)"""
+    logger.info("Live analytics rebuild requested", admin=admin)
+    return live_analytics.rebuild_live_counters(db)
+
+
+@router.get("/ingest")
+def ingest_status(admin: str = Depends(get_admin_subject)):
+    """Độ dài stream, consumer lag, pending và dead letters của async ingestion"""
+    return ingest.ingest_stats()
+
+
+@router.post("/ingest/dead-letters/replay")
+def replay_dead_letters(limit: int = Query(100, ge=1, le=10_000), admin: str = Depends(get_admin_subject)):
+    """Đưa dead letters trở lại stream sau khi đã sửa nguyên nhân (vd: store bị thiếu)"""
+    replayed = ingest.replay_dead_letters(limit)
+    logger.info("Ingest dead letters replayed", admin=admin, replayed=replayed)
+    return {"replayed": replayed}
@@ -8,7 +8,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from app.schemas.user import UserOut
 from app.models.models import User
-from app.core.config import SECRET_KEY, ALGORITHM
+from app.core.config import settings
 
 router = APIRouter()
 
@@ -26,13 +26,13 @@ def login(user: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get
     db_user = user_crud.get_user_by_email(db, user.username)
     if not db_user or not user_crud.verify_password(user.password, db_user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    access_token = create_access_token(data={"sub": db_user.email})
+    access_token = create_access_token(data={"sub": db_user.email, "uid": db_user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me")
 def get_me(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         email: str = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Could not validate credentials")
@@ -0,0 +1,25 @@
+"""
+Dashboard: nhiều analytics queries trong một round trip HTTP.
+
+Chỉ verify JWT một lần (không lookup user), cache lookups gộp thành MGET,
+cache misses chạy song song - xem app/crud/dashboard.py.
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.admission import AdmissionRoute, admission
+from app.core.serialization import RawJSONResponse
+from app.crud import dashboard
+from app.dependencies.deps import get_token_subject
+from app.schemas.analytics import BatchAnalyticsRequest, BatchAnalyticsResponse
+
+router = APIRouter(prefix="/analytics", tags=["Dashboard"], route_class=AdmissionRoute)
+
+
+@router.post("/batch", response_model=BatchAnalyticsResponse, dependencies=[admission("analytics")])
+def analytics_batch(body: BatchAnalyticsRequest, _subject: str = Depends(get_token_subject)):
+    """
+    Ví dụ body: {"queries": [{"name": "summary"}, {"name": "top_users", "limit": 5},
+    {"id": "growth_s1", "name": "growth", "store_id": 1}, {"name": "prefect_cached"}]}
+    """
+    return RawJSONResponse(dashboard.run_batch(body.queries))
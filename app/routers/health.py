@@ -3,6 +3,11 @@ from sqlalchemy.orm import Session
 from app.dependencies.deps import get_db
 from app.core.redis_client import r
 from app.core.logging_config import get_logger
+from app.core.query_profiler import query_metrics
+from app.core.admission import admission_stats
+from app.crud.ingest import ingest_stats
+from app.database import get_replica_router
+from app.crud.live_analytics import broadcaster
 import psutil
 import time
 from datetime import datetime
@@ -64,6 +69,15 @@ def detailed_health_check(db: Session = Depends(get_db)):
         health_status["status"] = "unhealthy"
         logger.error("Redis health check failed", error=str(e))
 
+    # Kiểm tra read replicas (replica lỗi không làm service unhealthy - reads fallback về primary)
+    replicas = get_replica_router()
+    if replicas.engines:
+        replica_status = replicas.check_all()
+        health_status["checks"]["replicas"] = {
+            "status": "healthy" if all(replica["healthy"] for replica in replica_status) else "degraded",
+            "replicas": replica_status,
+        }
+
     # Thời gian phản hồi
     response_time = round((time.time() - start_time) * 1000, 2)
     health_status["response_time_ms"] = response_time
@@ -113,7 +127,12 @@ def system_metrics():
                 "percent": (disk.used / disk.total) * 100
             },
             "network": network_stats
-        }
+        },
+        "database_queries": query_metrics.snapshot(),
+        "live_analytics_subscribers": broadcaster.subscriber_count,
+        "ingest": ingest_stats(),
+        "database_replicas": get_replica_router().status(),
+        "admission": admission_stats(),
     }
 
     logger.info("System metrics collected",
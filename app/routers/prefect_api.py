@@ -3,16 +3,19 @@ Prefect API Integration
 API endpoints để trigger và monitor Prefect workflows
 """
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordBearer
 from typing import Dict, List
 import asyncio
 from datetime import datetime
 
 from app.core.logging_config import get_logger
-from app.orchestration.prefect_workflows import (
-    daily_analytics_etl_flow,
-    data_quality_check_flow
+from app.core.compression import compressed_json_response
+from app.core.redis_client import r
+from app.crud.analytics import (
+    PREFECT_CACHE_KEYS,
+    PREFECT_UPDATED_AT_KEY,
+    build_prefect_analytics_json,
 )
 
 router = APIRouter(prefix="/prefect", tags=["Prefect Orchestration"])
@@ -30,6 +33,9 @@ async def trigger_daily_etl(
 
         # Run flow in background
         def run_flow():
+            # Import Prefect/pandas khi flow thật sự chạy, không phải lúc app boot
+            from app.orchestration.prefect_workflows import daily_analytics_etl_flow
+
             try:
                 result = daily_analytics_etl_flow()
                 logger.info("Daily ETL flow completed", result=result)
@@ -61,6 +67,8 @@ async def trigger_data_quality_check(
         logger.info("Manual trigger of data quality check requested")
 
         def run_quality_check():
+            from app.orchestration.prefect_workflows import data_quality_check_flow
+
             try:
                 result = data_quality_check_flow()
                 logger.info("Data quality check completed", result=result)
@@ -96,6 +104,8 @@ async def get_prefect_flows_info():
                         "extract_sales_data",
                         "transform_sales_analytics",
                         "load_analytics_cache",
+                        "rebuild_cohort_tables",
+                        "build_sales_forecast",
                         "generate_daily_report"
                     ],
                     "schedule": "Daily at 2:00 AM",
@@ -133,41 +143,38 @@ async def get_prefect_flows_info():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/analytics/cached")
-async def get_cached_analytics():
+async def get_cached_analytics(request: Request):
     """Get analytics data processed by Prefect flows"""
     try:
-        from app.core.redis_client import r
-        import json
-
-        cached_data = {}
-
-        # Get Prefect-processed analytics
-        summary_data = r.get("analytics:summary_prefect")
-        if summary_data:
-            cached_data["summary"] = json.loads(summary_data)
-
-        monthly_data = r.get("analytics:monthly_trends")
-        if monthly_data:
-            cached_data["monthly_trends"] = json.loads(monthly_data)
-
-        top_users_data = r.get("analytics:top_users_prefect")
-        if top_users_data:
-            cached_data["top_users"] = json.loads(top_users_data)
-
-        if not cached_data:
+        # Get Prefect-processed analytics (một round trip cho mọi keys)
+        summary_data, monthly_data, top_users_data, updated_at = r.mget(
+            PREFECT_CACHE_KEYS["summary"],
+            PREFECT_CACHE_KEYS["monthly_trends"],
+            PREFECT_CACHE_KEYS["top_users"],
+            PREFECT_UPDATED_AT_KEY,
+        )
+
+        if not (summary_data or monthly_data or top_users_data):
             return {
                 "message": "No cached analytics data found",
                 "suggestion": "Run the daily ETL flow to generate analytics data",
                 "endpoint": "/prefect/flows/daily-etl/run"
             }
 
-        cached_data["data_source"] = "prefect_etl_pipeline"
-        cached_data["last_updated"] = datetime.now().isoformat()
+        # Payload ghép từ bytes đã cache, không decode/re-encode;
+        # compressed variant được nén sẵn lúc ETL load
+        payload = build_prefect_analytics_json(
+            summary_data,
+            monthly_data,
+            top_users_data,
+            updated_at or datetime.now().isoformat(),
+        )
 
         logger.info("Cached analytics data retrieved",
-                   cached_items=len(cached_data))
+                   cached_items=sum(1 for item in (summary_data, monthly_data, top_users_data) if item),
+                   payload_bytes=len(payload))
 
-        return cached_data
+        return compressed_json_response(request, payload)
 
     except Exception as e:
         logger.error("Failed to get cached analytics", error=str(e))
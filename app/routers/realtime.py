@@ -0,0 +1,111 @@
+"""
+Real-time analytics push - thay cho dashboard poll /analytics/summary.
+
+- Ticket:    POST /analytics/stream/ticket (Authorization: Bearer <JWT>) -> ticket một lần
+- SSE:       GET /analytics/stream?ticket=...  (EventSource, hoặc Authorization header)
+- WebSocket: WS  /analytics/ws?ticket=...
+
+Mỗi message là snapshot {summary, top_users, sales_count, generation, updated_at}
+build từ Redis counters (app.crud.live_analytics), gửi ngay khi kết nối và mỗi
+khi có sales data mới.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.auth import decode_token_subject
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.stream_tickets import issue_ticket, redeem_ticket
+from app.crud.live_analytics import broadcaster
+from app.dependencies.deps import get_token_subject
+from app.schemas.analytics import StreamTicketResponse
+
+router = APIRouter(prefix="/analytics", tags=["Realtime"])
+logger = get_logger("realtime_api")
+
+
+async def _stream_subject(authorization: Optional[str], ticket: Optional[str]) -> Optional[str]:
+    # EventSource / WebSocket trên browser không gửi được header -> ?ticket= (một lần, không phải JWT)
+    if ticket:
+        return await run_in_threadpool(redeem_ticket, ticket)
+    if authorization:
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() == "bearer":
+            return decode_token_subject(credentials)
+    return None
+
+
+@router.post("/stream/ticket", response_model=StreamTicketResponse)
+def stream_ticket(subject: str = Depends(get_token_subject)):
+    """Ticket ngắn hạn, dùng một lần cho ?ticket= của /analytics/stream và /analytics/ws"""
+    return {"ticket": issue_ticket(subject), "expires_in": settings.stream_ticket_ttl_seconds}
+
+
+async def _sse_events(queue: asyncio.Queue):
+    try:
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), timeout=settings.live_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # Comment line giữ connection qua proxy/load balancer
+                yield b": keepalive\n\n"
+                continue
+            yield b"event: analytics\ndata: " + payload + b"\n\n"
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+@router.get("/stream")
+async def analytics_stream(request: Request, ticket: Optional[str] = Query(None)):
+    """Server-Sent Events: snapshot analytics mỗi khi có thay đổi"""
+    subject = await _stream_subject(request.headers.get("authorization"), ticket)
+    if subject is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    queue = await broadcaster.subscribe()
+    logger.info("SSE client connected", subject=subject, subscribers=broadcaster.subscriber_count)
+    return StreamingResponse(
+        _sse_events(queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def analytics_ws(websocket: WebSocket, ticket: Optional[str] = Query(None)):
+    """WebSocket: cùng payload với SSE, server chỉ push (message từ client bị bỏ qua)"""
+    subject = await _stream_subject(websocket.headers.get("authorization"), ticket)
+    if subject is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = await broadcaster.subscribe()
+    logger.info("WebSocket client connected", subject=subject, subscribers=broadcaster.subscriber_count)
+
+    async def wait_disconnect():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    disconnect = asyncio.create_task(wait_disconnect())
+    try:
+        while True:
+            update = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({update, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                update.cancel()
+                break
+            await websocket.send_text(update.result().decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnect.cancel()
+        broadcaster.unsubscribe(queue)
+        logger.info("WebSocket client disconnected", subject=subject)
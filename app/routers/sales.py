@@ -1,50 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from datetime import date
+from typing import List, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.core.config import ALGORITHM, SECRET_KEY
+from app.core.admission import AdmissionRoute, AdmissionTicket, admission, get_limiter
+from app.core.http_cache import (
+    cache_headers,
+    get_generation,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from app.core.serialization import RawJSONResponse, dumps
 from app.crud import analytics as analytics_crud
+from app.crud import approx_analytics
+from app.crud import cohorts
+from app.crud import columnar
+from app.crud import distribution
+from app.crud import forecast
+from app.crud import ingest
+from app.crud import leaderboard
+from app.crud import live_analytics
 from app.crud import sales_data as crud
-from app.dependencies.deps import get_db
-from app.models.models import User
-from app.schemas.analytics import SummaryResponse, TopUserResponse
-from app.schemas.sales_data import SalesDataCreate, SalesDataOut
-
-router = APIRouter()
+from app.dependencies.deps import get_current_user, get_db, get_read_db, get_stream_read_db, get_token_subject
+from app.schemas.analytics import (
+    ApproxSummaryResponse,
+    CohortRow,
+    DistributionRow,
+    ForecastResponse,
+    GrowthPoint,
+    LeaderboardResponse,
+    MonthlyTrendPoint,
+    SummaryResponse,
+    TopUserResponse,
+    UserRankResponse,
+    UserRoasRow,
+)
+from app.schemas.sales_data import IngestAccepted, SalesDataCreate, SalesDataOut
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
+router = APIRouter(route_class=AdmissionRoute)
 
+# Slot chỉ bị chiếm khi cache miss thật sự query DB / scan Parquet - cache hit và 304 không chờ
+ANALYTICS_ADMISSION = admission("analytics")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
 
-
-@router.post("/sales-data/", response_model=SalesDataOut)
+@router.post("/sales-data/", response_model=SalesDataOut, responses={202: {"model": IngestAccepted}})
 def create_sales(
     data: SalesDataCreate,
+    mode: Literal["sync", "async"] = Query(
+        "sync", description="async: XADD vào Redis Stream, trả 202 ngay; writer workers ghi DB theo batch"
+    ),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    subject: str = Depends(get_token_subject),
 ):
+    if mode == "async":
+        # Không chạm DB: token đã verify, payload đã validate
+        stream_id = ingest.enqueue_sales(data)
+        return RawJSONResponse(dumps({"status": "accepted", "stream_id": stream_id}), status_code=202)
+
+    get_current_user(subject, db)
     return crud.create_sales_data(db, data)
 
 
-@router.get("/sales-data/", response_model=list[SalesDataOut])
-def read_sales(db: Session = Depends(get_db)):
-    return crud.get_all_sales_data(db)
+class _SalesStream(StreamingResponse):
+    """Trả slot admission + đóng session khi response kết thúc, kể cả lỗi hoặc client ngắt giữa chừng"""
+
+    def __init__(self, chunks, ticket: AdmissionTicket, db: Session):
+        super().__init__(chunks, media_type="application/json")
+        self.ticket = ticket
+        self.db = db
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
+            await run_in_threadpool(self.db.close)
+
+
+@router.get(
+    "/sales-data/",
+    response_class=StreamingResponse,
+    responses={200: {"model": list[SalesDataOut], "description": "JSON array, stream theo batch 1000 rows"}},
+)
+async def read_sales(db: Session = Depends(get_stream_read_db)):
+    # Full scan: chờ slot trên event loop trước khi query để 503 trả về được khi quá tải.
+    # Không đặt statement_timeout - stream dài là bình thường
+    ticket = AdmissionTicket(get_limiter("sales_list"), deadline=None)
+    await ticket.admit()
+    try:
+        # Query + batch đầu chạy trước khi trả response: lỗi DB vẫn là 500, không phải 200 bị cắt
+        chunks = await run_in_threadpool(crud.stream_sales_data_json, db)
+    except BaseException:
+        ticket.release()
+        raise
+    # Stream theo batch (CompressionMiddleware nén từng chunk)
+    return _SalesStream(chunks, ticket, db)
 
 
 @router.post("/sales-data/generate-fake")
@@ -74,15 +128,272 @@ def generate_fake_sales(
         raise HTTPException(status_code=500, detail=f"Lỗi khi tạo fake data: {str(e)}")
 
 
-@router.get("/analytics/summary", response_model=SummaryResponse)
+# Analytics endpoints chỉ cần token hợp lệ (không lookup user) để request
+# If-None-Match khớp được trả 304 mà không chạm DB.
+# Session từ get_read_db (replica nếu có) chỉ mở connection khi thật sự query.
+@router.get("/analytics/summary", response_model=Union[SummaryResponse, ApproxSummaryResponse], dependencies=[ANALYTICS_ADMISSION])
 def analytics_summary(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    request: Request,
+    approx: bool = Query(False, description="Ước lượng từ sample + sketches, kèm error bounds"),
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
 ):
-    return analytics_crud.get_summary(db)
+    generation, updated_at = get_generation()
+    etag = make_etag("summary-approx" if approx else "summary", generation, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    if approx:
+        payload = approx_analytics.get_approx_summary_json(db, generation)
+    else:
+        payload = analytics_crud.get_summary_json(db, generation)
+    # response_model chỉ dùng cho OpenAPI docs - payload đã serialize sẵn, trả thẳng bytes
+    return RawJSONResponse(payload, headers=cache_headers(etag, updated_at))
 
 
-@router.get("/analytics/top_users", response_model=list[TopUserResponse])
+@router.get("/analytics/top_users", response_model=list[TopUserResponse], dependencies=[ANALYTICS_ADMISSION])
 def top_users(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    request: Request,
+    limit: int = Query(analytics_crud.TOP_USERS_DEFAULT_LIMIT, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
+):
+    generation, updated_at = get_generation()
+    etag = make_etag(f"top_users-{limit}", generation, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        analytics_crud.get_top_users_json(db, limit, generation), headers=cache_headers(etag, updated_at)
+    )
+
+
+@router.get("/analytics/distribution", response_model=list[DistributionRow], dependencies=[ANALYTICS_ADMISSION])
+def revenue_distribution(
+    request: Request,
+    dimension: Literal["store", "user"] = "store",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
+):
+    """Orders, revenue, ROAS, average order value và percentiles revenue theo store/user"""
+    generation, updated_at = get_generation()
+    etag = make_etag(
+        distribution.etag_resource(f"distribution:{dimension}", start=start_date, end=end_date, limit=limit),
+        generation,
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        distribution.get_distribution_json(db, generation, dimension, start_date, end_date, limit),
+        headers=cache_headers(etag, updated_at),
+    )
+
+
+@router.get("/analytics/growth", response_model=list[GrowthPoint], dependencies=[ANALYTICS_ADMISSION])
+def revenue_growth(
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
+):
+    """Revenue theo ngày với day-over-day / week-over-week growth (toàn bộ hoặc một store)"""
+    generation, updated_at = get_generation()
+    etag = make_etag(
+        distribution.etag_resource("growth", start=start_date, end=end_date, store=store_id),
+        generation,
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        distribution.get_growth_json(db, generation, start_date, end_date, store_id),
+        headers=cache_headers(etag, updated_at),
+    )
+
+
+@router.get("/analytics/forecast", response_model=ForecastResponse, dependencies=[ANALYTICS_ADMISSION])
+def revenue_forecast(
+    request: Request,
+    horizon: int = Query(7, ge=1, le=forecast.MAX_HORIZON, description="Số ngày dự báo (thường 7 hoặc 30)"),
+    history_days: int = Query(90, ge=14, le=730),
+    as_of: Optional[date] = Query(None, description="Ngày cuối của history (mặc định hôm nay)"),
+    store_id: Optional[List[int]] = Query(None, description="Lặp lại để chọn nhiều store, bỏ trống = mọi store"),
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
+):
+    """Dự báo revenue/ad_spend (moving average, exponential smoothing, seasonal naive) theo store và tổng"""
+    as_of = as_of or date.today()
+    generation, updated_at = get_generation()
+    etag = make_etag(
+        distribution.etag_resource(
+            "forecast", as_of=as_of, horizon=horizon, history=history_days, stores=forecast.stores_param(store_id)
+        ),
+        generation,
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        forecast.get_forecast_json(db, generation, horizon, history_days, as_of, store_id),
+        headers=cache_headers(etag, updated_at),
+    )
+
+
+@router.get("/analytics/cohorts", response_model=list[CohortRow], dependencies=[ANALYTICS_ADMISSION])
+def cohort_retention(
+    request: Request,
+    start_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Cohort đầu tiên (YYYY-MM)"),
+    end_month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Cohort cuối cùng (YYYY-MM)"),
+    max_periods: Optional[int] = Query(None, ge=1, le=120, description="Số tháng tối đa sau tháng của cohort"),
+    db: Session = Depends(get_read_db),
+    _subject: str = Depends(get_token_subject),
+):
+    """Users theo tháng của first sale: active users, retention, revenue mỗi tháng sau đó"""
+    generation, updated_at = get_generation()
+    etag = make_etag(
+        distribution.etag_resource("cohorts", start=start_month, end=end_month, periods=max_periods),
+        generation,
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        cohorts.get_cohorts_json(db, generation, start_month, end_month, max_periods),
+        headers=cache_headers(etag, updated_at),
+    )
+
+
+def _columnar_snapshot() -> dict:
+    try:
+        return columnar.current_snapshot()
+    except columnar.SnapshotNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _columnar_headers(snapshot: dict, etag: str, updated_at: int) -> dict:
+    # Dữ liệu columnar chỉ mới đến lần export gần nhất - client biết độ trễ qua header
+    return {
+        **cache_headers(etag, updated_at),
+        "X-Snapshot-Id": snapshot["snapshot_id"],
+        "X-Snapshot-Exported-At": snapshot["exported_at"],
+    }
+
+
+@router.get("/analytics/monthly_trends", response_model=list[MonthlyTrendPoint], dependencies=[ANALYTICS_ADMISSION])
+def monthly_trends(
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    _subject: str = Depends(get_token_subject),
+):
+    """Revenue, ad spend, ROAS, orders, active users theo tháng - đọc từ Parquet snapshot, không query DB"""
+    snapshot = _columnar_snapshot()
+    updated_at = snapshot["exported_at_ts"]
+    etag = make_etag(
+        distribution.etag_resource("monthly_trends", start=start_date, end=end_date, store=store_id, user=user_id),
+        snapshot["generation"],
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        columnar.get_monthly_trends_json(snapshot, start_date, end_date, store_id, user_id),
+        headers=_columnar_headers(snapshot, etag, updated_at),
+    )
+
+
+@router.get("/analytics/users/roas", response_model=list[UserRoasRow], dependencies=[ANALYTICS_ADMISSION])
+def users_roas(
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    store_id: Optional[int] = None,
+    order_by: Literal["revenue", "roas"] = "revenue",
+    limit: int = Query(20, ge=1, le=1000),
+    _subject: str = Depends(get_token_subject),
+):
+    """ROAS theo user trên toàn bộ lịch sử (hoặc khoảng ngày / một store) - đọc từ Parquet snapshot"""
+    snapshot = _columnar_snapshot()
+    updated_at = snapshot["exported_at_ts"]
+    etag = make_etag(
+        distribution.etag_resource(
+            "user_roas", start=start_date, end=end_date, store=store_id, order=order_by, limit=limit
+        ),
+        snapshot["generation"],
+        updated_at,
+    )
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    return RawJSONResponse(
+        columnar.get_user_roas_json(snapshot, start_date, end_date, store_id, order_by, limit),
+        headers=_columnar_headers(snapshot, etag, updated_at),
+    )
+
+
+def _leaderboard_key(month: Optional[str], store_id: Optional[int]) -> str:
+    try:
+        key = leaderboard.board_key(month, store_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not leaderboard.is_ready():
+        # Rebuild chạy nền (hoặc worker khác đang rebuild) - request không chờ full scan
+        live_analytics.ensure_live_counters(background=True)
+        raise HTTPException(
+            status_code=503, detail="Leaderboard is being rebuilt", headers={"Retry-After": "5"}
+        )
+    return key
+
+
+@router.get("/analytics/leaderboard", response_model=LeaderboardResponse)
+def leaderboard_page(
+    request: Request,
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM"),
+    store_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    _subject: str = Depends(get_token_subject),
+):
+    """Xếp hạng user theo revenue (all-time / theo tháng / theo store), phân trang O(log N + limit)"""
+    key = _leaderboard_key(month, store_id)
+    generation, updated_at = get_generation()
+    etag = make_etag(f"leaderboard-{key}-{limit}-{offset}", generation, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    payload = {
+        "board": key,
+        "total_users": leaderboard.total_users(key),
+        "limit": limit,
+        "offset": offset,
+        "entries": leaderboard.top(key, limit, offset),
+    }
+    return RawJSONResponse(dumps(payload), headers=cache_headers(etag, updated_at))
+
+
+@router.get("/analytics/leaderboard/users/{user_id}", response_model=UserRankResponse)
+def leaderboard_user_rank(
+    user_id: int,
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="YYYY-MM"),
+    store_id: Optional[int] = None,
+    _subject: str = Depends(get_token_subject),
 ):
-    return analytics_crud.get_top_users(db)
+    """Rank của một user trong board - ZREVRANK O(log N)"""
+    key = _leaderboard_key(month, store_id)
+    rank = leaderboard.rank_of(key, user_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="User has no sales in this leaderboard")
+    return {"board": key, **rank}
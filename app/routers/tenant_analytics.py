@@ -0,0 +1,80 @@
+"""
+Analytics của tenant đang đăng nhập (các stores mà user sở hữu).
+
+Cache và ETag theo generation riêng của tenant; query khi cache miss bị giới
+hạn bởi quota rate/concurrency của tenant (429 + Retry-After khi vượt) và
+admission control chung của nhóm "analytics" (503 + Retry-After khi quá tải).
+"""
+
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from app.core.admission import AdmissionRoute, admission
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified_response
+from app.core.serialization import RawJSONResponse
+from app.core.tenant_quota import QuotaExceededError
+from app.crud import tenant_analytics
+from app.crud.analytics import TOP_USERS_DEFAULT_LIMIT
+from app.crud.distribution import etag_resource
+from app.dependencies.deps import get_read_db, get_tenant_id
+from app.schemas.analytics import TenantSummaryResponse, TopUserResponse
+
+router = APIRouter(
+    prefix="/analytics/me",
+    tags=["Tenant Analytics"],
+    dependencies=[admission("analytics")],
+    route_class=AdmissionRoute,
+)
+
+
+def _tenant_response(request: Request, tenant_id: int, name: str, build, **params):
+    generation, updated_at = tenant_analytics.get_tenant_generation(tenant_id)
+    etag = make_etag(f"tenant{tenant_id}-{etag_resource(name, **params)}", generation, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at, private=True)
+
+    try:
+        payload = build(generation)
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+    return RawJSONResponse(payload, headers=cache_headers(etag, updated_at, private=True))
+
+
+@router.get("/summary", response_model=TenantSummaryResponse)
+def tenant_summary(
+    request: Request,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    tenant_id: int = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    """Revenue, ad spend, ROAS, orders trên các stores của user đang đăng nhập"""
+    return _tenant_response(
+        request, tenant_id, "summary",
+        lambda generation: tenant_analytics.get_tenant_summary_json(
+            db, tenant_id, generation, start_date, end_date
+        ),
+        start=start_date, end=end_date,
+    )
+
+
+@router.get("/top_users", response_model=list[TopUserResponse])
+def tenant_top_users(
+    request: Request,
+    limit: int = Query(TOP_USERS_DEFAULT_LIMIT, ge=1, le=100),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    tenant_id: int = Depends(get_tenant_id),
+    db: Session = Depends(get_read_db),
+):
+    """Top users theo revenue trong các stores của user đang đăng nhập"""
+    return _tenant_response(
+        request, tenant_id, "top_users",
+        lambda generation: tenant_analytics.get_tenant_top_users_json(
+            db, tenant_id, generation, limit, start_date, end_date
+        ),
+        start=start_date, end=end_date, limit=limit,
+    )
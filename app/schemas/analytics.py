@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import date
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel, Field, model_validator
 
 
 class SummaryResponse(BaseModel):
@@ -7,7 +10,199 @@ class SummaryResponse(BaseModel):
     roas: float
 
 
+class ApproxErrorBounds(BaseModel):
+    confidence: float
+    total_revenue: float  # ± nửa độ rộng khoảng tin cậy
+    total_ad_spend: float
+    distinct_counts_relative_std_error: float
+    percentiles_relative_error: float
+
+
+class ApproxSampling(BaseModel):
+    method: str
+    sample_percent: float
+    sample_rows: int
+
+
+class ApproxSummaryResponse(SummaryResponse):
+    distinct_users: int
+    distinct_stores: int
+    revenue_percentiles: dict[str, Optional[float]]
+    approximate: bool
+    error_bounds: ApproxErrorBounds
+    sampling: ApproxSampling
+
+
 class TopUserResponse(BaseModel):
     user_id: int
-    email: str
+    email: Optional[str]  # None nếu user không còn (email hydrate từ leaderboard / cache)
+    total_revenue: float
+
+
+class StreamTicketResponse(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    email: Optional[str]
+    total_revenue: float
+
+
+class LeaderboardResponse(BaseModel):
+    board: str
+    total_users: int
+    limit: int
+    offset: int
+    entries: list[LeaderboardEntry]
+
+
+class UserRankResponse(BaseModel):
+    board: str
+    user_id: int
+    rank: int
+    total_revenue: float
+    total_users: int
+
+
+class RevenuePercentiles(BaseModel):
+    p50: Optional[float]
+    p90: Optional[float]
+    p99: Optional[float]
+
+
+class DistributionRow(BaseModel):
+    store_id: Optional[int] = None  # dimension=store
+    user_id: Optional[int] = None  # dimension=user
+    orders: int
     total_revenue: float
+    total_ad_spend: float
+    roas: float
+    avg_order_value: float
+    revenue_percentiles: RevenuePercentiles
+
+
+class GrowthPoint(BaseModel):
+    date: date
+    revenue: float
+    ad_spend: float
+    orders: int
+    roas: float
+    dod_growth: Optional[float]  # None nếu thiếu ngày hôm trước
+    wow_growth: Optional[float]  # None nếu thiếu ngày cùng thứ tuần trước
+
+
+class ForecastMethods(BaseModel):
+    moving_average: list[float]
+    exponential_smoothing: list[float]
+    seasonal_naive: list[float]  # Lặp lại tuần gần nhất
+
+
+class ForecastHistory(BaseModel):
+    revenue: float  # Tổng trong history_days
+    ad_spend: float
+    avg_daily_revenue: float
+    last_7d_revenue: float
+    last_7d_ad_spend: float
+
+
+class SeriesForecast(BaseModel):
+    history: ForecastHistory
+    revenue: ForecastMethods
+    ad_spend: ForecastMethods
+
+
+class StoreForecast(SeriesForecast):
+    store_id: int
+
+
+class ForecastResponse(BaseModel):
+    as_of: date  # Ngày cuối của history, dự báo bắt đầu từ ngày sau
+    horizon: int
+    history_days: int
+    dates: list[date]
+    overall: SeriesForecast
+    stores: list[StoreForecast]
+
+
+class CohortPeriodPoint(BaseModel):
+    period: int  # Số tháng kể từ tháng của cohort
+    month: str  # YYYY-MM
+    active_users: int
+    retention: float  # active_users / users của cohort
+    revenue: float
+    ad_spend: float
+    orders: int
+    revenue_per_user: float  # revenue / users của cohort
+
+
+class CohortRow(BaseModel):
+    cohort: str  # YYYY-MM của first sale
+    users: int
+    revenue: float
+    periods: list[CohortPeriodPoint]
+
+
+class MonthlyTrendPoint(BaseModel):
+    month: str  # YYYY-MM
+    revenue: float
+    ad_spend: float
+    roas: float
+    orders: int
+    active_users: int
+
+
+class UserRoasRow(BaseModel):
+    user_id: int
+    revenue: float
+    ad_spend: float
+    roas: float
+    orders: int
+
+
+class TenantSummaryResponse(SummaryResponse):
+    orders: int
+    stores: int  # Số stores của tenant có sales trong khoảng ngày
+
+
+BATCH_LIMIT_MAX = {"top_users": 100, "distribution": 500}
+
+
+class AnalyticsQuerySpec(BaseModel):
+    id: Optional[str] = Field(None, max_length=64, description="Key trong results (mặc định = name)")
+    name: Literal["summary", "top_users", "distribution", "growth", "prefect_cached"]
+    limit: Optional[int] = Field(None, ge=1, le=500)
+    dimension: Literal["store", "user"] = "store"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    store_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def limit_within_endpoint_max(self):
+        # Cùng giới hạn với query param `limit` của endpoint tương ứng
+        max_limit = BATCH_LIMIT_MAX.get(self.name)
+        if self.limit is not None and max_limit is not None and self.limit > max_limit:
+            raise ValueError(f"limit for {self.name} must be <= {max_limit}")
+        return self
+
+    @property
+    def result_id(self) -> str:
+        return self.id or self.name
+
+
+class BatchAnalyticsRequest(BaseModel):
+    queries: list[AnalyticsQuerySpec] = Field(min_length=1, max_length=20)
+
+    @model_validator(mode="after")
+    def unique_ids(self):
+        ids = [query.result_id for query in self.queries]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Query ids must be unique (set `id` when repeating a query name)")
+        return self
+
+
+class BatchAnalyticsResponse(BaseModel):
+    generation: int
+    results: dict[str, Any]
@@ -12,4 +12,8 @@ class SalesDataOut(SalesDataCreate):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class IngestAccepted(BaseModel):
+    status: str
+    stream_id: str  # Redis Stream entry id của message
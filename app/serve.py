@@ -0,0 +1,97 @@
+"""
+Production server: gunicorn master + uvicorn workers (uvloop + httptools).
+
+    python -m app.serve                          # workers = số CPU khả dụng
+    python -m app.serve --workers 8 --port 8080
+    SERVE_MAX_REQUESTS=0 python -m app.serve     # cấu hình qua env / .env (SERVE_*)
+
+- Preload: app được import trong master rồi mới fork, worker mới (kể cả khi
+  recycle) không phải import lại. DB engine / Redis client được tạo lazily
+  trong mỗi worker (lifespan), không có connection nào bị chia sẻ qua fork.
+- Max requests: worker được recycle sau SERVE_MAX_REQUESTS (+ jitter) requests,
+  chặn memory tăng dần.
+- Graceful drain: SIGTERM -> master ngừng nhận connection mới, workers xử lý
+  nốt requests đang chạy trong SERVE_GRACEFUL_TIMEOUT giây rồi chạy lifespan
+  shutdown. Connection SSE / WebSocket bị đóng khi hết timeout.
+
+Dev server có auto-reload vẫn là `uvicorn app.main:app --reload`.
+"""
+
+import argparse
+import os
+import sys
+
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+
+from app.core.config import settings
+
+
+class UvloopHttptoolsWorker(UvicornWorker):
+    # Chọn tường minh thay vì "auto" - thiếu uvloop/httptools thì worker lỗi ngay khi start
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+def default_workers() -> int:
+    """Số CPU process được phép chạy (tôn trọng cpuset/affinity của container)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        return os.cpu_count() or 1
+
+
+def build_options(args: argparse.Namespace) -> dict:
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers or default_workers(),
+        "worker_class": "app.serve.UvloopHttptoolsWorker",
+        "preload_app": args.preload,
+        "backlog": args.backlog,
+        "keepalive": args.keepalive,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter if args.max_requests else 0,
+        "graceful_timeout": args.graceful_timeout,
+        "timeout": args.timeout,
+        # Access log đã có ở LoggingMiddleware (structured, kèm request id)
+        "accesslog": None,
+        "errorlog": "-",
+    }
+
+
+class ServeApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app.main import app
+
+        return app
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Chạy SaaS Analytics API cho production")
+    parser.add_argument("--host", default=settings.serve_host)
+    parser.add_argument("--port", type=int, default=settings.serve_port)
+    parser.add_argument("--workers", type=int, default=settings.serve_workers, help="0 = số CPU")
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=settings.serve_preload)
+    parser.add_argument("--backlog", type=int, default=settings.serve_backlog)
+    parser.add_argument("--keepalive", type=int, default=settings.serve_keepalive)
+    parser.add_argument("--max-requests", type=int, default=settings.serve_max_requests)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.serve_max_requests_jitter)
+    parser.add_argument("--graceful-timeout", type=int, default=settings.serve_graceful_timeout)
+    parser.add_argument("--timeout", type=int, default=settings.serve_timeout)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    ServeApplication(build_options(parse_args(argv))).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
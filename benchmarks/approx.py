@@ -0,0 +1,136 @@
+"""
+Approximate vs exact analytics benchmark
+
+So sánh latency và sai số của `?approx=true` (TABLESAMPLE + HLL + quantile sketch)
+với exact path (SUM / COUNT DISTINCT / percentile trên toàn bảng). Gọi thẳng crud
+layer, không qua cache, để đo chi phí tính toán thật. Cần Redis (REDIS_HOST).
+
+    python -m benchmarks.approx --rows 1000000 --repeat 5
+    python -m benchmarks.approx --rows 10000000 --sample-percent 0.5 --output benchmarks/results/approx.json
+
+Trên SQLite sample vẫn phải scan toàn bảng (không có TABLESAMPLE) - chỉ đo sai số có ý nghĩa.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from benchmarks.seed import seed
+from benchmarks.stats import summarize_latencies
+from app.models.models import SalesData
+
+QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+def exact_summary(db) -> dict:
+    total_revenue, total_ad_spend, users, stores, rows = db.execute(
+        select(
+            func.sum(SalesData.revenue),
+            func.sum(SalesData.ad_spend),
+            func.count(func.distinct(SalesData.user_id)),
+            func.count(func.distinct(SalesData.store_id)),
+            func.count(),
+        )
+    ).one()
+
+    percentiles = {}
+    if db.get_bind().dialect.name == "postgresql":
+        values = db.execute(
+            select(*(
+                func.percentile_disc(q).within_group(SalesData.revenue)
+                for q in QUANTILES.values()
+            ))
+        ).one()
+        percentiles = dict(zip(QUANTILES, values))
+    else:
+        for name, q in QUANTILES.items():
+            percentiles[name] = db.execute(
+                select(SalesData.revenue).order_by(SalesData.revenue).offset(int(q * (rows - 1))).limit(1)
+            ).scalar()
+
+    return {
+        "total_revenue": total_revenue or 0,
+        "total_ad_spend": total_ad_spend or 0,
+        "distinct_users": users,
+        "distinct_stores": stores,
+        "revenue_percentiles": percentiles,
+    }
+
+
+def _relative_error(approx: float, exact: float) -> float:
+    return abs(approx - exact) / abs(exact) if exact else 0.0
+
+
+def accuracy_report(approx: dict, exact: dict) -> dict:
+    report = {
+        key: round(_relative_error(approx[key], exact[key]), 5)
+        for key in ("total_revenue", "total_ad_spend", "distinct_users", "distinct_stores")
+    }
+    for name in QUANTILES:
+        report[name] = round(_relative_error(approx["revenue_percentiles"][name], exact["revenue_percentiles"][name]), 5)
+    bounds = approx["error_bounds"]
+    report["total_revenue_within_ci"] = abs(approx["total_revenue"] - exact["total_revenue"]) <= bounds["total_revenue"]
+    report["total_ad_spend_within_ci"] = abs(approx["total_ad_spend"] - exact["total_ad_spend"]) <= bounds["total_ad_spend"]
+    return report
+
+
+def timed(fn, db, repeat: int) -> tuple:
+    latencies = []
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(db)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return result, summarize_latencies(latencies, time.perf_counter() - start, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approximate vs exact analytics benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sample-percent", type=float, help="Override APPROX_SAMPLE_PERCENT")
+    parser.add_argument("--output", type=Path, help="Ghi kết quả JSON")
+    args = parser.parse_args(argv)
+
+    from app.core.config import settings
+    from app.crud import approx_analytics
+    from app.database import SessionLocal
+
+    if args.sample_percent:
+        settings.approx_sample_percent = args.sample_percent
+    # Benchmark luôn đo sampled path, kể cả khi sample nhỏ
+    settings.approx_min_sample_rows = 0
+
+    seed_info = seed(args.rows)
+    db = SessionLocal()
+    try:
+        exact, exact_latency = timed(exact_summary, db, args.repeat)
+        approx, approx_latency = timed(approx_analytics.compute_approx_summary, db, args.repeat)
+    finally:
+        db.close()
+
+    results = {
+        "rows": seed_info["rows"],
+        "dialect": seed_info["dialect"],
+        "sample_percent": settings.approx_sample_percent,
+        "latency_ms": {"exact": exact_latency, "approx": approx_latency},
+        "speedup_p50": round(exact_latency["p50_ms"] / max(approx_latency["p50_ms"], 1e-9), 2),
+        "relative_error": accuracy_report(approx, exact),
+        "exact": exact,
+        "approx": approx,
+    }
+    output = json.dumps(results, indent=2, default=str)
+    print(output)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+ETL benchmark + memory profiling harness
+
+Chạy từng Prefect task (extract -> transform -> load -> report, gọi thẳng task.fn
+ngoài Prefect engine) rồi cả daily_analytics_etl_flow thật (qua Prefect engine, gồm
+forecast / columnar snapshot / cohorts và overhead orchestration) trên datasets
+synthetic tăng dần.
+Mỗi stage ghi lại wall time, peak RSS (sampling psutil) và allocations
+(tracemalloc), sau đó in scaling report (log-log slope giữa các kích thước).
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.etl --sizes 10000 100000 1000000
+    python -m benchmarks.etl --sizes 10000 100000 --no-tracemalloc --output benchmarks/results/etl.json
+
+Stage load và flow cần Redis (REDIS_HOST). Dataset được seed tăng dần bằng benchmarks/seed.py,
+nên các size nhỏ phải chạy trước size lớn (--sizes được sort tăng dần).
+"""
+
+import argparse
+import gc
+import json
+import math
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+import psutil
+
+from benchmarks.seed import seed
+
+STAGES = ("extract", "transform", "load", "report")
+
+
+class RssSampler:
+    """Sample RSS của process trong background thread để lấy peak của từng stage"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.process.memory_info().rss
+        self.peak = self.baseline
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def measure(fn, *args, trace_allocations: bool = True):
+    """Chạy fn(*args), trả về (result, metrics)"""
+    gc.collect()
+    if trace_allocations:
+        tracemalloc.start()
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        result = fn(*args)
+        wall = time.perf_counter() - start
+
+    metrics = {
+        "wall_s": round(wall, 4),
+        "rss_baseline_mb": round(rss.baseline / 2**20, 1),
+        "rss_peak_mb": round(rss.peak / 2**20, 1),
+        "rss_delta_mb": round((rss.peak - rss.baseline) / 2**20, 1),
+    }
+    if trace_allocations:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats = snapshot.statistics("lineno")
+        metrics.update({
+            "alloc_peak_mb": round(peak / 2**20, 2),
+            "alloc_retained_mb": round(current / 2**20, 2),
+            "alloc_blocks": sum(stat.count for stat in stats),
+            "top_allocations": [
+                {"site": str(stat.traceback[0]), "size_mb": round(stat.size / 2**20, 2), "count": stat.count}
+                for stat in stats[:3]
+            ],
+        })
+    return result, metrics
+
+
+def _fn(task):
+    """Hàm gốc của Prefect task (bỏ qua engine/orchestration)"""
+    return getattr(task, "fn", task)
+
+
+def run_pipeline(trace_allocations: bool) -> dict:
+    from app.orchestration import prefect_workflows as wf
+
+    stages = {}
+    extracted, stages["extract"] = measure(_fn(wf.extract_sales_data), trace_allocations=trace_allocations)
+    transformed, stages["transform"] = measure(
+        _fn(wf.transform_sales_analytics), extracted, trace_allocations=trace_allocations
+    )
+    _, stages["load"] = measure(_fn(wf.load_analytics_cache), transformed, trace_allocations=trace_allocations)
+    _, stages["report"] = measure(_fn(wf.generate_daily_report), transformed, trace_allocations=trace_allocations)
+    del extracted, transformed
+
+    # End-to-end: một lần chạy flow thật, không phải tổng các stages ở trên
+    _, stages["flow"] = measure(wf.daily_analytics_etl_flow, trace_allocations=trace_allocations)
+    return stages
+
+
+def scaling_report(results: list) -> list:
+    """
+    Slope log(wall)/log(rows) giữa hai size liên tiếp: ~1 là tuyến tính,
+    >1.2 là superlinear - stage sẽ nổ trước khi data tăng tới production.
+    """
+    lines = [f"{'rows':>10}  {'stage':<10} {'wall_s':>9} {'rss_peak_mb':>12} {'alloc_peak_mb':>14} {'slope':>6}"]
+    for i, entry in enumerate(results):
+        for stage in (*STAGES, "flow"):
+            metrics = entry["stages"][stage]
+            slope = ""
+            if i > 0:
+                prev = results[i - 1]
+                prev_wall = prev["stages"][stage]["wall_s"]
+                if prev_wall > 0 and metrics["wall_s"] > 0 and entry["rows"] != prev["rows"]:
+                    value = math.log(metrics["wall_s"] / prev_wall) / math.log(entry["rows"] / prev["rows"])
+                    slope = f"{value:.2f}" + (" !" if value > 1.2 else "")
+            lines.append(
+                f"{entry['rows']:>10,}  {stage:<10} {metrics['wall_s']:>9.3f} {metrics['rss_peak_mb']:>12.1f} "
+                f"{metrics.get('alloc_peak_mb', float('nan')):>14.2f} {slope:>6}"
+            )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ETL pipeline benchmark + memory profiling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Tắt tracemalloc (wall time chính xác hơn)")
+    parser.add_argument("--output", type=Path, help="Ghi kết quả JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in sorted(args.sizes):
+        seed_info = seed(rows)
+        stages = run_pipeline(trace_allocations=not args.no_tracemalloc)
+        results.append({"rows": seed_info["rows"], "seed": seed_info, "stages": stages})
+        print(f"done {rows:,} rows: flow {stages['flow']['wall_s']:.2f}s", file=sys.stderr)
+
+    print("\n".join(scaling_report(results)))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2, default=str) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
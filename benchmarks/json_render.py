@@ -0,0 +1,93 @@
+"""
+JSON rendering benchmark
+So sánh requests/sec của analytics cache-hit path trước và sau khi chuyển sang orjson:
+
+  legacy: json.loads(cached) -> dict -> response_model validation -> JSONResponse (json.dumps)
+  fast:   cached bytes -> RawJSONResponse (không decode, không validate)
+
+Chỉ đo phần rendering (cache payload giữ trong memory) để tách khỏi latency của Redis/DB.
+
+    python -m benchmarks.json_render --requests 5000 --top-users 100
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.serialization import RawJSONResponse, dumps
+from app.schemas.analytics import SummaryResponse, TopUserResponse
+
+
+def build_payloads(top_users: int) -> dict:
+    summary = {"total_revenue": 1234567.89, "total_ad_spend": 234567.12, "roas": 5.26}
+    users = [
+        {
+            "user_id": i,
+            "email": f"user{i}@example.com",
+            "total_revenue": round(random.uniform(100, 100000), 2),
+        }
+        for i in range(top_users)
+    ]
+    return {"summary": summary, "top_users": users}
+
+
+def build_app(payloads: dict) -> FastAPI:
+    # Payload như đang nằm trong Redis (decode_responses=True -> str)
+    legacy_cache = {name: json.dumps(data) for name, data in payloads.items()}
+    fast_cache = {name: dumps(data).decode() for name, data in payloads.items()}
+
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/legacy/summary", response_model=SummaryResponse)
+    def legacy_summary():
+        return json.loads(legacy_cache["summary"])
+
+    @app.get("/legacy/top_users", response_model=list[TopUserResponse])
+    def legacy_top_users():
+        return json.loads(legacy_cache["top_users"])
+
+    @app.get("/fast/summary", response_model=SummaryResponse)
+    def fast_summary():
+        return RawJSONResponse(fast_cache["summary"].encode())
+
+    @app.get("/fast/top_users", response_model=list[TopUserResponse])
+    def fast_top_users():
+        return RawJSONResponse(fast_cache["top_users"].encode())
+
+    return app
+
+
+def run(client: TestClient, path: str, requests: int) -> float:
+    for _ in range(min(200, requests)):  # warmup
+        client.get(path)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(path)
+    return requests / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="orjson vs json rendering benchmark")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--top-users", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    client = TestClient(build_app(build_payloads(args.top_users)))
+
+    print(f"{'endpoint':<12} {'legacy req/s':>14} {'fast req/s':>12} {'speedup':>8}")
+    for endpoint in ("summary", "top_users"):
+        legacy = run(client, f"/legacy/{endpoint}", args.requests)
+        fast = run(client, f"/fast/{endpoint}", args.requests)
+        print(f"{endpoint:<12} {legacy:>14.0f} {fast:>12.0f} {fast / legacy:>7.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
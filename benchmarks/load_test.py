@@ -0,0 +1,268 @@
+"""
+Load test / latency benchmark cho các hot paths của API
+
+Seed dữ liệu (xem benchmarks/seed.py), chạy từng scenario với N requests và
+concurrency cho trước, đo p50/p95/p99 latency + throughput, ghi JSON để so sánh
+giữa các commits. Cần Redis (REDIS_HOST) cho analytics scenarios.
+
+    # In-process (ASGI transport) trên SQLite
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.load_test run --rows 100000
+
+    # Server đang chạy + Postgres local, lưu kết quả theo commit
+    python -m benchmarks.load_test run --base-url http://localhost:8000 --rows 10000000 \\
+        --output benchmarks/results/load_$(git rev-parse --short HEAD).json
+
+    # So sánh, exit code 1 nếu có regression vượt threshold
+    python -m benchmarks.load_test compare base.json new.json --threshold 0.10
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD, seed
+from benchmarks.stats import summarize_latencies
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    auth: bool = False
+    # Gọi trước mỗi request (vd: xoá cache cho cold-cache scenario)
+    before_request: Optional[Callable[[], None]] = None
+    # Sinh body cho POST
+    json_body: Optional[Callable[[], dict]] = None
+    form_body: Optional[dict] = None
+    # Scenario nặng (vd: list toàn bộ sales_data) chạy ít requests hơn
+    request_fraction: float = 1.0
+    headers: dict = field(default_factory=dict)
+
+
+def _drop_analytics_cache():
+    # Cache key theo global generation: bump -> mọi analytics cache key cũ không còn được đọc
+    from app.core.tag_cache import GLOBAL_TAG, bump_tags
+
+    bump_tags([GLOBAL_TAG])
+
+
+DASHBOARD_QUERIES = {
+    "queries": [
+        {"name": "summary"},
+        {"name": "top_users", "limit": 10},
+        {"name": "distribution", "dimension": "store"},
+        {"name": "growth"},
+        {"name": "prefect_cached"},
+    ]
+}
+
+
+def build_scenarios(seed_info: dict) -> list:
+    store_ids = range(1, seed_info["stores"] + 1)
+    user_ids = range(1, seed_info["users"] + 1)
+
+    def new_sale():
+        revenue = round(random.uniform(100, 5000), 2)
+        return {
+            "date": date.today().isoformat(),
+            "revenue": revenue,
+            "ad_spend": round(random.uniform(10, revenue * 0.3), 2),
+            "store_id": random.choice(store_ids),
+            "user_id": random.choice(user_ids),
+        }
+
+    return [
+        Scenario("health", "GET", "/health/"),
+        Scenario("health_detailed", "GET", "/health/detailed"),
+        Scenario("login", "POST", "/login", form_body={"username": BENCH_EMAIL, "password": BENCH_PASSWORD}),
+        Scenario("analytics_summary_hot", "GET", "/analytics/summary", auth=True),
+        Scenario(
+            "analytics_summary_cold",
+            "GET",
+            "/analytics/summary",
+            auth=True,
+            before_request=_drop_analytics_cache,
+            request_fraction=0.2,
+        ),
+        Scenario("analytics_top_users", "GET", "/analytics/top_users", auth=True),
+        # Một request thay cho summary + top_users + distribution + growth + prefect cached
+        Scenario("dashboard_batch_hot", "POST", "/analytics/batch", auth=True, json_body=lambda: DASHBOARD_QUERIES),
+        Scenario(
+            "dashboard_batch_cold",
+            "POST",
+            "/analytics/batch",
+            auth=True,
+            json_body=lambda: DASHBOARD_QUERIES,
+            before_request=_drop_analytics_cache,
+            request_fraction=0.2,
+        ),
+        Scenario(
+            "sales_list",
+            "GET",
+            "/sales-data/",
+            request_fraction=0.02,
+            headers={"Accept-Encoding": "gzip"},
+        ),
+        Scenario("sales_create", "POST", "/sales-data/", auth=True, json_body=new_sale),
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    requests = max(1, int(requests * scenario.request_fraction))
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            if scenario.before_request:
+                scenario.before_request()
+            kwargs = {"headers": scenario.headers}
+            if scenario.json_body:
+                kwargs["json"] = scenario.json_body()
+            if scenario.form_body:
+                kwargs["data"] = scenario.form_body
+            start = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **kwargs)
+                await response.aread()
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return summarize_latencies(latencies, time.perf_counter() - wall_start, errors)
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post("/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args) -> dict:
+    seed_info = seed(args.rows, reset=args.reset)
+
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        token = await login(client)
+        results = {}
+        for scenario in build_scenarios(seed_info):
+            if args.only and scenario.name not in args.only:
+                continue
+            if scenario.auth:
+                scenario.headers = {**scenario.headers, "Authorization": f"Bearer {token}"}
+            # Warmup (cũng làm nóng cache cho *_hot scenarios)
+            await run_scenario(client, scenario, args.warmup, 1)
+            results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+            print(f"{scenario.name:<24} {json.dumps(results[scenario.name])}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            **seed_info,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """
+    Regression khi p95 tăng hoặc throughput giảm quá `threshold` (tỉ lệ).
+    Trả về list các dòng report; dòng bắt đầu bằng 'REGRESSION' là lỗi.
+    """
+    lines = []
+    for name, new_stats in new["scenarios"].items():
+        base_stats = base["scenarios"].get(name)
+        if not base_stats:
+            lines.append(f"new       {name}: no baseline")
+            continue
+        p95_change = (new_stats["p95_ms"] - base_stats["p95_ms"]) / max(base_stats["p95_ms"], 1e-9)
+        rps_change = (new_stats["throughput_rps"] - base_stats["throughput_rps"]) / max(base_stats["throughput_rps"], 1e-9)
+        status = "REGRESSION" if p95_change > threshold or rps_change < -threshold else "ok"
+        lines.append(
+            f"{status:<10}{name}: p95 {base_stats['p95_ms']:.2f} -> {new_stats['p95_ms']:.2f} ms ({p95_change:+.1%}), "
+            f"rps {base_stats['throughput_rps']:.1f} -> {new_stats['throughput_rps']:.1f} ({rps_change:+.1%})"
+        )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API load test / latency benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Seed + chạy scenarios")
+    run.add_argument("--rows", type=int, default=10_000, help="Số SalesData rows (10k -> 10M)")
+    run.add_argument("--reset", action="store_true")
+    run.add_argument("--requests", type=int, default=500, help="Requests mỗi scenario")
+    run.add_argument("--concurrency", type=int, default=10)
+    run.add_argument("--warmup", type=int, default=10)
+    run.add_argument("--timeout", type=float, default=120.0)
+    run.add_argument("--base-url", help="Chạy với server thật thay vì in-process ASGI")
+    run.add_argument("--only", nargs="*", help="Chỉ chạy các scenario này")
+    run.add_argument("--output", type=Path, help="Ghi kết quả JSON")
+
+    cmp = sub.add_parser("compare", help="So sánh hai file kết quả")
+    cmp.add_argument("base", type=Path)
+    cmp.add_argument("new", type=Path)
+    cmp.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        lines = compare(json.loads(args.base.read_text()), json.loads(args.new.read_text()), args.threshold)
+        print("\n".join(lines))
+        return 1 if any(line.startswith("REGRESSION") for line in lines) else 0
+
+    results = asyncio.run(run_benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
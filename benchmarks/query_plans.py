@@ -0,0 +1,302 @@
+"""
+Query plan regression harness cho analytics và listing queries
+
+Chạy từng hot query đã đăng ký (gọi thẳng crud layer, nên SQL chính là SQL
+production), bắt các statements thật sự được execute rồi EXPLAIN lại chúng:
+
+- PostgreSQL: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) - plan shape + shared buffers
+- SQLite: EXPLAIN QUERY PLAN - chỉ plan shape (dùng cho dev/test)
+
+So với baseline đã commit (benchmarks/baselines/query_plans_<dialect>.json):
+plan shape đổi (vd: index scan -> seq scan) hoặc buffers tăng quá threshold là
+regression (exit code 1). Cùng dữ liệu sinh index report: index nào được hot
+query nào dùng, index nào không query nào dùng (+ pg_stat_user_indexes trên Postgres).
+
+    # Postgres local, dataset lớn (seed một lần, chạy lại không seed thêm)
+    python -m benchmarks.query_plans run --rows 1000000 --output benchmarks/results/query_plans.json
+    python -m benchmarks.query_plans baseline --rows 1000000     # ghi lại baseline sau khi review plan mới
+
+Buffers phụ thuộc số rows: so sánh chỉ có nghĩa trên cùng --rows với baseline.
+"""
+
+import argparse
+import json
+import re
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.crud import analytics, distribution, sales_data, tenant_analytics
+from app.models.models import SalesData, Store
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+# Buffers dao động nhẹ giữa các lần chạy (hint bits, visibility map) - bỏ qua chênh lệch nhỏ
+MIN_BUFFER_DELTA = 100
+
+
+@dataclass
+class QueryParams:
+    start_date: date
+    end_date: date
+    store_id: int
+    tenant_id: int
+
+
+def _first_sales_batch(db: Session, params: QueryParams):
+    # GET /sales-data/: chỉ cần statement + batch đầu của stream, không kéo hết bảng
+    sales_data.stream_sales_data_json(db, batch_size=1000).close()
+
+
+HOT_QUERIES: dict[str, Callable[[Session, QueryParams], object]] = {
+    "analytics.summary": lambda db, p: analytics.compute_summary(db),
+    "analytics.top_users": lambda db, p: analytics.compute_top_users(db, 10),
+    "distribution.store_30d": lambda db, p: distribution.compute_distribution(db, "store", p.start_date, p.end_date, 20),
+    "distribution.user_30d": lambda db, p: distribution.compute_distribution(db, "user", p.start_date, p.end_date, 20),
+    "growth.all_30d": lambda db, p: distribution.compute_growth(db, p.start_date, p.end_date),
+    "growth.store_30d": lambda db, p: distribution.compute_growth(db, p.start_date, p.end_date, p.store_id),
+    "tenant.summary_30d": lambda db, p: tenant_analytics.compute_tenant_summary(db, p.tenant_id, p.start_date, p.end_date),
+    "tenant.top_users": lambda db, p: tenant_analytics.compute_tenant_top_users(db, p.tenant_id, 10),
+    "sales_data.list": _first_sales_batch,
+}
+
+
+def default_params(db: Session) -> QueryParams:
+    end_date = date.today()
+    store_id, tenant_id = db.execute(select(Store.id, Store.owner_id).order_by(Store.id).limit(1)).one()
+    return QueryParams(end_date - timedelta(days=30), end_date, store_id, tenant_id)
+
+
+@contextmanager
+def capture_statements(engine: Engine):
+    """(statement, parameters) của mọi cursor execute trong block"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _pg_nodes(node: dict, depth: int = 0):
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from _pg_nodes(child, depth + 1)
+
+
+def _pg_plan(conn, statement: str, parameters) -> dict:
+    raw = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters).scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    root = plan["Plan"]
+    shape, indexes, seq_scans = [], set(), set()
+    for depth, node in _pg_nodes(root):
+        line = node["Node Type"]
+        if node.get("Relation Name"):
+            line += f" on {node['Relation Name']}"
+        if node.get("Index Name"):
+            line += f" using {node['Index Name']}"
+            indexes.add(node["Index Name"])
+        if node["Node Type"] == "Seq Scan":
+            seq_scans.add(node["Relation Name"])
+        shape.append("  " * depth + line)
+    return {
+        "shape": shape,
+        "indexes": sorted(indexes),
+        "seq_scans": sorted(seq_scans),
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "execution_ms": round(plan.get("Execution Time", 0.0), 3),
+    }
+
+
+_SQLITE_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _sqlite_plan(conn, statement: str, parameters) -> dict:
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    depths = {0: -1}
+    shape, indexes, seq_scans = [], set(), set()
+    for node_id, parent, _, detail in rows:
+        depths[node_id] = depths.get(parent, -1) + 1
+        shape.append("  " * depths[node_id] + detail)
+        indexes.update(_SQLITE_INDEX.findall(detail))
+        scan = _SQLITE_SCAN.match(detail)
+        if scan:
+            seq_scans.add(scan.group(1))
+    return {"shape": shape, "indexes": sorted(indexes), "seq_scans": sorted(seq_scans), "buffers": None}
+
+
+def explain(engine: Engine, statement: str, parameters) -> dict:
+    explain_one = _pg_plan if engine.dialect.name == "postgresql" else _sqlite_plan
+    with engine.connect() as conn:
+        return explain_one(conn, statement, parameters)
+
+
+def capture_plans(engine: Engine, only=None) -> dict:
+    """name -> list plans (một plan mỗi statement query đó execute)"""
+    # Connection mới: SQLite giữ prepared EXPLAIN QUERY PLAN cũ sau khi index bị drop/tạo
+    engine.dispose()
+    with Session(engine) as db:
+        params = default_params(db)
+    # SQLite "SCAN <subquery/CTE>" không phải full scan một bảng
+    tables = set(inspect(engine).get_table_names())
+    plans = {}
+    for name, run in HOT_QUERIES.items():
+        if only and name not in only:
+            continue
+        with capture_statements(engine) as captured:
+            with Session(engine) as db:
+                run(db, params)
+        plans[name] = [explain(engine, statement, parameters) for statement, parameters in captured]
+        for plan in plans[name]:
+            plan["seq_scans"] = [table for table in plan["seq_scans"] if table in tables]
+    return plans
+
+
+def index_report(engine: Engine, plans: dict) -> dict:
+    """Index của sales_data/stores: hot queries nào dùng, index nào không được dùng"""
+    inspector = inspect(engine)
+    declared = {
+        index["name"]: {"table": table, "columns": index["column_names"]}
+        for table in (SalesData.__tablename__, Store.__tablename__)
+        for index in inspector.get_indexes(table)
+    }
+    used_by = {name: [] for name in declared}
+    for query, query_plans in plans.items():
+        for index in {index for plan in query_plans for index in plan["indexes"]}:
+            used_by.setdefault(index, []).append(query)
+
+    report = {
+        "indexes": {name: {**declared.get(name, {}), "used_by": sorted(queries)} for name, queries in used_by.items()},
+        "unused_by_hot_queries": sorted(name for name, queries in used_by.items() if not queries),
+        "seq_scans": {
+            query: sorted({table for plan in query_plans for table in plan["seq_scans"]})
+            for query, query_plans in plans.items()
+            if any(plan["seq_scans"] for plan in query_plans)
+        },
+    }
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT indexrelname AS name, idx_scan, idx_tup_read,
+                       pg_relation_size(indexrelid) AS size_bytes
+                FROM pg_stat_user_indexes
+                WHERE relname IN ('sales_data', 'stores')
+            """)).mappings().all()
+        # idx_scan tính từ lần reset stats cuối - phản ánh cả traffic thật nếu chạy trên bản sao production
+        report["pg_stat_user_indexes"] = {row["name"]: dict(row) for row in rows}
+        report["never_scanned"] = sorted(row["name"] for row in rows if row["idx_scan"] == 0)
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Regression khi plan shape đổi, xuất hiện seq scan mới, hoặc buffers tăng
+    quá `threshold`. Dòng bắt đầu bằng 'REGRESSION' là lỗi.
+    """
+    lines = []
+    for name, plans in current["plans"].items():
+        base_plans = baseline["plans"].get(name)
+        if base_plans is None:
+            lines.append(f"new       {name}: no baseline")
+            continue
+        problems = []
+        base_shapes = [plan["shape"] for plan in base_plans]
+        if [plan["shape"] for plan in plans] != base_shapes:
+            problems.append("plan shape changed")
+        new_seq = sorted(
+            {table for plan in plans for table in plan["seq_scans"]}
+            - {table for plan in base_plans for table in plan["seq_scans"]}
+        )
+        if new_seq:
+            problems.append(f"new seq scan on {', '.join(new_seq)}")
+        buffers = sum(plan["buffers"] or 0 for plan in plans)
+        base_buffers = sum(plan["buffers"] or 0 for plan in base_plans)
+        if base_buffers and buffers - base_buffers > max(MIN_BUFFER_DELTA, base_buffers * threshold):
+            problems.append(f"buffers {base_buffers} -> {buffers} ({(buffers - base_buffers) / base_buffers:+.1%})")
+
+        if problems:
+            lines.append(f"REGRESSION {name}: {'; '.join(problems)}")
+            for plan in plans:
+                lines.extend(f"    {line}" for line in plan["shape"])
+        else:
+            detail = f" buffers {base_buffers} -> {buffers}" if base_buffers else ""
+            lines.append(f"ok        {name}:{detail}")
+    return lines
+
+
+def baseline_path(dialect: str) -> Path:
+    return BASELINE_DIR / f"query_plans_{dialect}.json"
+
+
+def run(args) -> dict:
+    from app.database import get_engine
+
+    if not args.skip_seed:
+        from benchmarks.seed import seed
+
+        seed(args.rows)
+    engine = get_engine()
+    with Session(engine) as db:
+        rows = db.execute(select(func.count()).select_from(SalesData)).scalar()
+    plans = capture_plans(engine, args.only)
+    return {
+        "meta": {"dialect": engine.dialect.name, "rows": rows},
+        "plans": plans,
+        "index_report": index_report(engine, plans),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query plan regression harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (
+        ("run", "Seed + capture plans, so với baseline (exit 1 nếu regression)"),
+        ("baseline", "Seed + capture plans, ghi đè baseline"),
+    ):
+        cmd = sub.add_parser(command, help=help_text)
+        cmd.add_argument("--rows", type=int, default=1_000_000)
+        cmd.add_argument("--skip-seed", action="store_true", help="Dùng dữ liệu hiện có")
+        cmd.add_argument("--only", nargs="*", help="Chỉ chạy các queries này")
+        cmd.add_argument("--threshold", type=float, default=0.20, help="Buffers tăng quá tỉ lệ này là regression")
+        cmd.add_argument("--output", type=Path, help="Ghi plans + index report JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    path = baseline_path(result["meta"]["dialect"])
+    output = json.dumps(result, indent=2, default=str)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+
+    if args.command == "baseline":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"meta": result["meta"], "plans": result["plans"]}, indent=2) + "\n")
+        print(f"Baseline written to {path}", file=sys.stderr)
+        return 0
+
+    print(json.dumps(result["index_report"], indent=2, default=str))
+    if not path.exists():
+        print(f"No baseline at {path} - run `python -m benchmarks.query_plans baseline` first", file=sys.stderr)
+        return 1
+    baseline = json.loads(path.read_text())
+    if baseline["meta"]["rows"] != result["meta"]["rows"]:
+        print(f"warning: baseline has {baseline['meta']['rows']} rows, current run {result['meta']['rows']}",
+              file=sys.stderr)
+    lines = compare(baseline, result, args.threshold)
+    print("\n".join(lines))
+    return 1 if any(line.startswith("REGRESSION") for line in lines) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
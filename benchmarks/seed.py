@@ -0,0 +1,215 @@
+"""
+Seed dữ liệu synthetic cho benchmarks (10k -> 10M SalesData rows)
+
+Chạy trên DB trong DATABASE_URL / POSTGRES_* - dùng DB riêng cho benchmark, không dùng DB thật:
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.seed --rows 100000
+    python -m benchmarks.seed --rows 10000000 --reset     # Postgres: dùng COPY
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func, insert, select, text
+
+from app.crud.user import pwd_context
+from app.database import get_engine
+from app.models.models import SalesData, Store, User
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def ensure_schema():
+    """Schema benchmark DB cũng đi qua Alembic, giống production"""
+    config = Config(str(PROJECT_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_DIR / "migrations"))
+    command.upgrade(config, "head")
+
+
+def reset_data():
+    engine = get_engine()
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("TRUNCATE sales_data, stores, users RESTART IDENTITY CASCADE"))
+        else:
+            for table in ("sales_data", "stores", "users"):
+                conn.execute(text(f"DELETE FROM {table}"))
+
+
+def _seed_users_and_stores(conn, users: int, stores: int) -> tuple:
+    # Hash một lần rồi dùng lại - bcrypt cho từng user sẽ mất hàng giờ
+    hashed = pwd_context.hash(BENCH_PASSWORD)
+    if conn.execute(select(User.id).where(User.email == BENCH_EMAIL)).first() is None:
+        conn.execute(insert(User), [{"email": BENCH_EMAIL, "hashed_password": hashed}])
+
+    existing = conn.execute(select(func.count()).select_from(User)).scalar()
+    if existing < users:
+        conn.execute(
+            insert(User),
+            [
+                {"email": f"bench{i}@example.com", "hashed_password": hashed}
+                for i in range(existing, users)
+            ],
+        )
+    user_ids = conn.execute(select(User.id).order_by(User.id)).scalars().all()
+
+    existing = conn.execute(select(func.count()).select_from(Store)).scalar()
+    if existing < stores:
+        conn.execute(
+            insert(Store),
+            [
+                {"name": f"Bench Store {i}", "owner_id": user_ids[i % len(user_ids)]}
+                for i in range(existing, stores)
+            ],
+        )
+    store_ids = conn.execute(select(Store.id).order_by(Store.id)).scalars().all()
+    return user_ids, store_ids
+
+
+def _generate_rows(count: int, user_ids: list, store_ids: list, days: int, rng: random.Random):
+    start = date.today() - timedelta(days=days)
+    for _ in range(count):
+        revenue = round(rng.uniform(100, 5000), 2)
+        yield (
+            start + timedelta(days=rng.randrange(days)),
+            revenue,
+            round(rng.uniform(10, revenue * 0.3), 2),
+            rng.choice(store_ids),
+            rng.choice(user_ids),
+        )
+
+
+def _copy_batch(conn, rows):
+    """PostgreSQL COPY - nhanh hơn executemany cả chục lần với hàng triệu rows"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(str(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    cursor.copy_expert(
+        "COPY sales_data (date, revenue, ad_spend, store_id, user_id) FROM STDIN", buffer
+    )
+
+
+def _insert_batch(conn, rows):
+    conn.execute(
+        insert(SalesData),
+        [
+            {"date": d, "revenue": rev, "ad_spend": ad, "store_id": s, "user_id": u}
+            for d, rev, ad, s, u in rows
+        ],
+    )
+
+
+def seed(
+    rows: int,
+    users: int = None,
+    stores: int = None,
+    days: int = 365,
+    batch_size: int = 50_000,
+    reset: bool = False,
+    random_seed: int = 42,
+) -> dict:
+    """
+    Đảm bảo DB có ít nhất `rows` sales_data rows. Chạy lại với cùng tham số sẽ
+    không seed thêm, nên nhiều benchmark có thể dùng chung một dataset.
+    """
+    ensure_schema()
+    if reset:
+        reset_data()
+
+    users = users or max(10, rows // 1000)
+    stores = stores or max(5, users // 10)
+    rng = random.Random(random_seed)
+    engine = get_engine()
+    write_batch = _copy_batch if engine.dialect.name == "postgresql" else _insert_batch
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        user_ids, store_ids = _seed_users_and_stores(conn, users, stores)
+        existing = conn.execute(select(func.count()).select_from(SalesData)).scalar()
+
+    remaining = max(0, rows - existing)
+    while remaining:
+        count = min(batch_size, remaining)
+        with engine.begin() as conn:
+            write_batch(conn, list(_generate_rows(count, user_ids, store_ids, days, rng)))
+        remaining -= count
+        print(f"  seeded {rows - remaining:,}/{rows:,} rows", file=sys.stderr)
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE sales_data"))
+
+    if reset or existing < rows:
+        # Bulk insert không đi qua record_sales / record_cohort_sales - tính lại leaderboards/counters
+        # trong Redis và cohort tables
+        _rebuild_redis_aggregates()
+        _rebuild_cohorts()
+
+    return {
+        "rows": max(rows, existing),
+        "users": len(user_ids),
+        "stores": len(store_ids),
+        "days": days,
+        "dialect": engine.dialect.name,
+        "seed_seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def _rebuild_redis_aggregates():
+    from app.crud.live_analytics import rebuild_live_counters
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_live_counters(db)
+    except Exception as e:  # Redis không bắt buộc cho mọi benchmark
+        print(f"  skipped Redis leaderboard rebuild: {e}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+def _rebuild_cohorts():
+    from redis.exceptions import RedisError
+
+    from app.crud.cohorts import rebuild_cohorts
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rebuild_cohorts(db)
+    except RedisError as e:  # Tables đã commit, chỉ bỏ bước invalidate cache
+        print(f"  skipped analytics cache invalidation after cohort rebuild: {e}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed synthetic benchmark data")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--stores", type=int)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--reset", action="store_true", help="Xoá dữ liệu cũ trước khi seed")
+    args = parser.parse_args(argv)
+
+    info = seed(args.rows, args.users, args.stores, args.days, args.batch_size, args.reset)
+    print(info)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Throughput của production server (python -m app.serve) so với dev server
+
+Chạy từng server setup thành subprocess trên cùng DB/Redis, bắn cùng scenarios
+của benchmarks.load_test qua HTTP thật, rồi SIGTERM và đo thời gian drain:
+
+- dev:        uvicorn app.main:app (1 process, như Dockerfile cũ)
+- dev_reload: uvicorn app.main:app --reload (như docker-compose cũ)
+- prod:       python -m app.serve (gunicorn + N uvicorn workers, uvloop + httptools)
+
+    python -m benchmarks.serve --rows 100000 --concurrency 64 --requests 5000
+    python -m benchmarks.serve --skip-seed --only health --output benchmarks/results/serve.json
+
+Kết quả phụ thuộc số CPU - luôn ghi kèm `cpus` trong meta.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.load_test import build_scenarios, login, run_scenario
+
+SETUPS = {
+    "dev": ["uvicorn", "app.main:app"],
+    "dev_reload": ["uvicorn", "app.main:app", "--reload"],
+    "prod": [sys.executable, "-m", "app.serve"],
+}
+DEFAULT_SCENARIOS = ["health", "analytics_summary_hot", "analytics_top_users"]
+
+
+def _start(setup: str, port: int, workers: int) -> subprocess.Popen:
+    command = [*SETUPS[setup], "--host", "127.0.0.1", "--port", str(port)]
+    if setup == "prod" and workers:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def _wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/health/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+def _stop(process: subprocess.Popen) -> float:
+    """SIGTERM tới cả process group, trả về thời gian drain (giây)"""
+    start = time.perf_counter()
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    return round(time.perf_counter() - start, 3)
+
+
+async def _run_scenarios(base_url: str, scenarios: list, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        token = await login(client) if any(scenario.auth for scenario in scenarios) else None
+        results = {}
+        for scenario in scenarios:
+            if scenario.auth:
+                scenario.headers = {**scenario.headers, "Authorization": f"Bearer {token}"}
+            await run_scenario(client, scenario, args.warmup, args.concurrency)
+            results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Production vs dev server throughput")
+    parser.add_argument("--setups", nargs="*", default=list(SETUPS), choices=list(SETUPS))
+    parser.add_argument("--only", nargs="*", default=DEFAULT_SCENARIOS, help="Scenarios của benchmarks.load_test")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Dùng DB hiện có (scenario health không cần seed)")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=0, help="Workers cho prod (0 = số CPU)")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    seed_info = {"users": 1, "stores": 1}
+    if not args.skip_seed:
+        from benchmarks.seed import seed
+
+        seed_info = seed(args.rows)
+
+    results = {}
+    for offset, setup in enumerate(args.setups):
+        port = args.port + offset
+        base_url = f"http://127.0.0.1:{port}"
+        scenarios = [scenario for scenario in build_scenarios(seed_info) if scenario.name in args.only]
+        process = _start(setup, port, args.workers)
+        try:
+            _wait_ready(base_url)
+            results[setup] = asyncio.run(_run_scenarios(base_url, scenarios, args))
+        finally:
+            drain_seconds = _stop(process)
+        results[setup]["shutdown_seconds"] = drain_seconds
+        print(f"{setup:<12} {json.dumps(results[setup])}", file=sys.stderr)
+
+    if "dev" in results and "prod" in results:
+        results["prod_vs_dev_throughput"] = {
+            name: round(results["prod"][name]["throughput_rps"] / max(results["dev"][name]["throughput_rps"], 1e-9), 2)
+            for name in args.only
+            if name in results["prod"]
+        }
+
+    output = json.dumps({
+        "meta": {
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers or "auto",
+        },
+        "results": results,
+    }, indent=2)
+    print(output)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Startup benchmark
+Đo cold-start import time của app.main và profile import (python -X importtime)
+
+    python -m benchmarks.startup                 # 10 lần cold import, in median/p95
+    python -m benchmarks.startup --runs 20 --top 30 --output benchmarks/results/startup_profile.txt
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+TARGET_MODULE = "app.main"
+
+# Heavy dependencies không được load lúc import app.main
+LAZY_MODULES = ["prefect", "pandas", "faker", "numpy"]
+
+
+def _run_python(code: str, extra_args=None) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    return subprocess.run(
+        [sys.executable, *(extra_args or []), "-c", code],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure_cold_import(runs: int) -> list:
+    """Mỗi lần chạy là một process mới - giống worker cold start"""
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {TARGET_MODULE}; "
+        "print(time.perf_counter() - t)"
+    )
+    return [float(_run_python(code).stdout.strip()) * 1000 for _ in range(runs)]
+
+
+def loaded_lazy_modules() -> list:
+    code = (
+        f"import sys, {TARGET_MODULE}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    out = _run_python(code).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+
+def import_profile(top: int) -> list:
+    """Parse output của -X importtime, trả về top module theo cumulative time (us)"""
+    stderr = _run_python(f"import {TARGET_MODULE}", ["-X", "importtime"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--output", type=Path, help="Ghi report ra file (vd: benchmarks/results/startup_profile.txt)")
+    args = parser.parse_args(argv)
+
+    timings = sorted(measure_cold_import(args.runs))
+    p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+    lazy_loaded = loaded_lazy_modules()
+
+    lines = [
+        f"Cold import of {TARGET_MODULE} ({args.runs} runs, python {sys.version.split()[0]})",
+        f"  median: {statistics.median(timings):.1f} ms",
+        f"  p95:    {p95:.1f} ms",
+        f"  min:    {timings[0]:.1f} ms",
+        f"Heavy modules loaded at import: {', '.join(lazy_loaded) or 'none'}",
+        "",
+        f"Top {args.top} imports by cumulative time (-X importtime):",
+        f"  {'cumulative_ms':>13}  {'self_ms':>8}  module",
+    ]
+    for cumulative_us, self_us, name in import_profile(args.top):
+        lines.append(f"  {cumulative_us / 1000:>13.1f}  {self_us / 1000:>8.1f}  {name}")
+
+    report = "\n".join(lines)
+    print(report)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(report + "\n")
+
+    # Fail (cho CI) nếu có heavy dependency bị import lại lúc boot
+    return 1 if lazy_loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
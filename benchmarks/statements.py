@@ -0,0 +1,108 @@
+"""
+Micro-benchmark: chi phí mỗi lần gọi của các queries nóng
+
+  orm:      db.query(...) dựng lại mỗi lần gọi (cách cũ)
+  core:     Core statement build sẵn (app.core.prepared), không PREPARE
+  prepared: như core + PREPARE/EXECUTE server-side (chỉ PostgreSQL)
+
+Dataset nhỏ để thời gian chạy query không che mất overhead build/compile phía Python.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.statements --calls 5000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import analytics
+from app.crud.user import get_user_by_email
+from app.models.models import SalesData, User
+from benchmarks.seed import BENCH_EMAIL, seed
+
+
+def _orm_user(db: Session):
+    return db.query(User).filter(User.email == BENCH_EMAIL).first()
+
+
+def _orm_summary(db: Session):
+    return db.query(
+        func.sum(SalesData.revenue).label("total_revenue"),
+        func.sum(SalesData.ad_spend).label("total_ad_spend"),
+    ).first()
+
+
+def _orm_top_users(db: Session):
+    return (
+        db.query(User.id.label("user_id"), User.email, func.sum(SalesData.revenue).label("total_revenue"))
+        .join(SalesData, SalesData.user_id == User.id)
+        .group_by(User.id, User.email)
+        .order_by(func.sum(SalesData.revenue).desc())
+        .limit(10)
+        .all()
+    )
+
+
+QUERIES = {
+    "user_by_email": (_orm_user, lambda db: get_user_by_email(db, BENCH_EMAIL)),
+    "summary": (_orm_summary, lambda db: analytics.SUMMARY_QUERY.execute(db).first()),
+    "top_users": (_orm_top_users, lambda db: analytics.TOP_USERS_QUERY.execute(db, limit=10).all()),
+}
+
+
+def per_call_us(db: Session, fn, calls: int) -> float:
+    for _ in range(min(200, calls)):  # warmup: compiled cache + PREPARE
+        fn(db)
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(db)
+    return round((time.perf_counter() - start) / calls * 1e6, 1)
+
+
+def run(calls: int, rows: int) -> dict:
+    from app.database import get_engine
+
+    seed(rows)
+    engine = get_engine()
+    variants = ["orm", "core"] + (["prepared"] if engine.dialect.name == "postgresql" else [])
+    results = {}
+    prepared_setting = settings.db_prepared_statements
+    try:
+        for name, (orm_fn, fast_fn) in QUERIES.items():
+            timings = {}
+            for variant in variants:
+                settings.db_prepared_statements = variant == "prepared"
+                with Session(engine) as db:
+                    timings[variant] = per_call_us(db, orm_fn if variant == "orm" else fast_fn, calls)
+            best = min(timings[v] for v in variants if v != "orm")
+            timings["saved_us"] = round(timings["orm"] - best, 1)
+            results[name] = timings
+            print(f"{name:15} " + "  ".join(f"{k}={v}us" for k, v in timings.items()), file=sys.stderr)
+    finally:
+        settings.db_prepared_statements = prepared_setting
+    return {"meta": {"dialect": engine.dialect.name, "rows": rows, "calls": calls}, "queries": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ORM query vs prepared statement per-call overhead")
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args(argv)
+
+    result = run(args.calls, args.rows)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(output + "\n")
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
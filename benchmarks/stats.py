@@ -0,0 +1,26 @@
+"""Helpers thống kê dùng chung cho các benchmark"""
+
+import math
+import statistics
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile trên list đã sort"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies_ms: list, wall_time_s: float, errors: int = 0) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
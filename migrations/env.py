@@ -0,0 +1,53 @@
+"""
+Alembic environment
+Dùng chung engine/metadata với app để autogenerate thấy đủ models
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import Base, get_engine
+from app.models import models  # noqa: F401 - register models với metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Sinh SQL ra stdout (alembic upgrade head --sql) mà không cần kết nối DB"""
+    context.configure(
+        url=get_engine().url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Chạy migrations trên DB thật"""
+    with get_engine().connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # Mỗi revision một transaction riêng, để autocommit_block()
+            # (CREATE INDEX CONCURRENTLY) không bị kẹt trong transaction lớn
+            transaction_per_migration=True,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,48 @@
+"""
+Helpers cho migrations
+Tạo/xoá index trên bảng lớn (sales_data) mà không lock writes
+"""
+
+from alembic import op
+
+
+def _is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: list, **kw):
+    """
+    CREATE INDEX CONCURRENTLY trên PostgreSQL, CREATE INDEX thường trên DB khác.
+
+    CONCURRENTLY không chạy được trong transaction nên phải nằm trong
+    autocommit_block(). Nếu build bị huỷ giữa chừng, Postgres để lại index
+    INVALID - cần drop_index_concurrently rồi chạy lại migration.
+    """
+    if not _is_postgresql():
+        op.create_index(index_name, table_name, columns, if_not_exists=True, **kw)
+        return
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            index_name,
+            table_name,
+            columns,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+            **kw,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str):
+    """DROP INDEX CONCURRENTLY trên PostgreSQL, DROP INDEX thường trên DB khác"""
+    if not _is_postgresql():
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name=table_name,
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,69 @@
+"""baseline schema: users, stores, sales_data
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+Schema hiện tại (trước đây được tạo bằng Base.metadata.create_all).
+DB đã được tạo bằng create_all thì chỉ cần stamp:
+    python scripts/migrate.py upgrade   # tự stamp 0001 nếu bảng đã tồn tại
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "stores",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("owner_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_stores_id", "stores", ["id"])
+    op.create_index("ix_stores_name", "stores", ["name"])
+    op.create_index("ix_stores_owner_id", "stores", ["owner_id"])
+
+    op.create_table(
+        "sales_data",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=True),
+        sa.Column("revenue", sa.Float(), nullable=True),
+        sa.Column("ad_spend", sa.Float(), nullable=True),
+        sa.Column("store_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["store_id"], ["stores.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_sales_data_id", "sales_data", ["id"])
+    op.create_index("ix_sales_data_date", "sales_data", ["date"])
+    op.create_index("ix_sales_data_revenue", "sales_data", ["revenue"])
+    op.create_index("ix_sales_data_store_id", "sales_data", ["store_id"])
+    op.create_index("ix_sales_data_user_id", "sales_data", ["user_id"])
+    op.create_index("idx_sales_date_user", "sales_data", ["date", "user_id"])
+    op.create_index("idx_sales_revenue_user", "sales_data", ["revenue", "user_id"])
+    op.create_index("idx_sales_store_date", "sales_data", ["store_id", "date"])
+
+
+def downgrade():
+    op.drop_table("sales_data")
+    op.drop_table("stores")
+    op.drop_table("users")
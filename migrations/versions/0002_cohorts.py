@@ -0,0 +1,58 @@
+"""cohort analytics tables: user_cohorts, user_monthly_activity, cohort_periods
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00
+
+Bảng mới, rỗng sau upgrade - điền dữ liệu từ sales_data hiện có bằng:
+    python scripts/rebuild_cohorts.py
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_cohorts",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("first_sale_date", sa.Date(), nullable=False),
+        sa.Column("cohort_month", sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index("ix_user_cohorts_cohort_month", "user_cohorts", ["cohort_month"])
+
+    op.create_table(
+        "user_monthly_activity",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("ad_spend", sa.Float(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "month"),
+    )
+
+    op.create_table(
+        "cohort_periods",
+        sa.Column("cohort_month", sa.Date(), nullable=False),
+        sa.Column("period", sa.Integer(), nullable=False),
+        sa.Column("active_users", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("ad_spend", sa.Float(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("cohort_month", "period"),
+    )
+
+
+def downgrade():
+    op.drop_table("cohort_periods")
+    op.drop_table("user_monthly_activity")
+    op.drop_index("ix_user_cohorts_cohort_month", table_name="user_cohorts")
+    op.drop_table("user_cohorts")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Export sales_data thành Parquet snapshot (partition theo tháng, nén zstd) cho
+/analytics/monthly_trends và /analytics/users/roas
+
+Chạy định kỳ (cron / Prefect daily ETL) hoặc sau bulk load:
+
+    python scripts/export_columnar.py
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def main() -> int:
+    from app.crud.columnar import export_snapshot
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(export_snapshot(db))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
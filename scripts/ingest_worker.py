@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Writer worker cho async ingestion (POST /sales-data/?mode=async)
+
+Đọc Redis Stream `ingest:sales` bằng consumer group, insert theo micro-batch.
+Chạy nhiều process (máy khác nhau hoặc cùng máy) để tăng throughput - mỗi
+process là một consumer riêng trong group:
+
+    python scripts/ingest_worker.py
+"""
+
+import signal
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def main() -> int:
+    from app.crud.ingest import run_writer
+
+    stopping = []
+    # Dừng sau batch hiện tại (message chưa XACK vẫn pending, không mất)
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+
+    run_writer(lambda: bool(stopping))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Migration CLI
+Chạy Alembic migrations tách biệt khỏi app boot (deploy step / init container)
+
+    python scripts/migrate.py upgrade            # lên head
+    python scripts/migrate.py downgrade -1
+    python scripts/migrate.py revision -m "add idx" --autogenerate
+    python scripts/migrate.py current | history | stamp <rev>
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+BASELINE_REVISION = "0001"
+
+
+def get_alembic_config() -> Config:
+    """Alembic config trỏ tới alembic.ini ở root project"""
+    config = Config(str(PROJECT_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_DIR / "migrations"))
+    return config
+
+
+def adopt_existing_schema(config: Config):
+    """
+    DB cũ được tạo bằng create_all không có bảng alembic_version.
+    Stamp baseline để upgrade không cố tạo lại bảng đã tồn tại.
+    """
+    from sqlalchemy import inspect
+
+    from app.database import get_engine
+
+    tables = set(inspect(get_engine()).get_table_names())
+    if "alembic_version" not in tables and "sales_data" in tables:
+        print(f"🔖 Existing schema detected, stamping baseline {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SaaS Analytics API migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    upgrade = sub.add_parser("upgrade", help="Upgrade schema (mặc định: head)")
+    upgrade.add_argument("revision", nargs="?", default="head")
+    upgrade.add_argument("--sql", action="store_true", help="Chỉ in SQL, không chạy")
+
+    downgrade = sub.add_parser("downgrade", help="Downgrade schema")
+    downgrade.add_argument("revision")
+
+    revision = sub.add_parser("revision", help="Tạo revision mới")
+    revision.add_argument("-m", "--message", required=True)
+    revision.add_argument("--autogenerate", action="store_true")
+
+    stamp = sub.add_parser("stamp", help="Đánh dấu revision mà không chạy migration")
+    stamp.add_argument("revision")
+
+    sub.add_parser("current", help="Revision hiện tại của DB")
+    sub.add_parser("history", help="Danh sách revisions")
+
+    args = parser.parse_args(argv)
+    config = get_alembic_config()
+
+    if args.command == "upgrade":
+        if not args.sql:
+            adopt_existing_schema(config)
+        command.upgrade(config, args.revision, sql=args.sql)
+    elif args.command == "downgrade":
+        command.downgrade(config, args.revision)
+    elif args.command == "revision":
+        command.revision(config, message=args.message, autogenerate=args.autogenerate)
+    elif args.command == "stamp":
+        command.stamp(config, args.revision)
+    elif args.command == "current":
+        command.current(config, verbose=True)
+    elif args.command == "history":
+        command.history(config)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Rebuild cohort tables (user_cohorts, user_monthly_activity, cohort_periods) từ sales_data
+
+Chạy sau migration 0002 (bảng cohort rỗng), sau bulk load không đi qua API
+(COPY, restore backup) hoặc khi nghi ngờ aggregates bị lệch. Nightly ETL cũng
+chạy bước này:
+
+    python scripts/rebuild_cohorts.py
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def main() -> int:
+    from app.crud.cohorts import rebuild_cohorts
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(rebuild_cohorts(db))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
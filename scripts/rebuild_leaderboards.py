@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Rebuild Redis leaderboards + live analytics counters từ DB
+
+Chạy sau khi Redis bị flush, sau bulk load không đi qua API (COPY, restore
+backup) hoặc khi nghi ngờ counters bị lệch:
+
+    python scripts/rebuild_leaderboards.py
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def main() -> int:
+    from app.crud.live_analytics import rebuild_live_counters
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(rebuild_live_counters(db))
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
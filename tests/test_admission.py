@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core import admission
+from app.core.admission import AdmissionRejectedError, ConcurrencyLimiter
+from app.main import admission_rejected_handler
+
+
+def test_limiter_rejects_when_queue_full_or_wait_expires():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=0, queue_timeout=1)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejectedError, match="Too many"):
+            await limiter.acquire()
+
+        limiter.max_queue, limiter.queue_timeout = 1, 0.05
+        with pytest.raises(AdmissionRejectedError, match="Timed out"):
+            await limiter.acquire()
+        limiter.release()
+        await limiter.acquire()
+        return limiter.stats()
+
+    assert asyncio.run(scenario()) == {"limit": 1, "in_flight": 1, "waiting": 0, "rejected": 2}
+
+
+def test_release_from_worker_thread_hands_slot_to_waiter():
+    """Request chờ là future trên event loop; slot trả từ threadpool được chuyển thẳng cho nó"""
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        await asyncio.to_thread(limiter.release)
+        await waiter
+        return limiter.stats()
+
+    assert asyncio.run(scenario()) == {"limit": 1, "in_flight": 1, "waiting": 0, "rejected": 0}
+
+
+def test_slot_taken_only_on_cache_miss_and_waited_for_on_event_loop(monkeypatch):
+    limiter = ConcurrencyLimiter("analytics", limit=1, max_queue=1, queue_timeout=2)
+    monkeypatch.setattr(admission, "get_limiter", lambda name: limiter)
+    engine = create_engine("sqlite://")
+    Session = sessionmaker(bind=engine)
+    event.listen(Session, "after_begin", admission.on_session_begin)
+    runs = []
+
+    app = FastAPI()
+    app.router.route_class = admission.AdmissionRoute
+    app.add_exception_handler(AdmissionRejectedError, admission_rejected_handler)
+
+    @app.get("/cached", dependencies=[admission.admission("analytics")])
+    def cached():
+        with Session():
+            return {"source": "cache"}  # Không query: session không mở transaction
+
+    @app.get("/query", dependencies=[admission.admission("analytics")])
+    def query():
+        runs.append(limiter.waiting)
+        with Session() as session:
+            return {"value": session.execute(text("SELECT 1")).scalar()}
+
+    client = TestClient(app)
+    assert client.get("/query").json() == {"value": 1}
+    assert limiter.in_flight == 0  # Slot được trả khi request xong
+
+    assert limiter.try_acquire()  # Một request nặng khác đang giữ slot
+    assert client.get("/cached").status_code == 200
+    # Miss khi hết slot: dừng trước query, chờ slot (future trên loop), chạy lại khi slot được trả
+    threading.Timer(0.2, limiter.release).start()
+    runs.clear()
+    assert client.get("/query").json() == {"value": 1}
+    assert len(runs) == 2
+    assert limiter.stats() == {"limit": 1, "in_flight": 0, "waiting": 0, "rejected": 0}
+
+    limiter.try_acquire()
+    limiter.max_queue = 0
+    response = client.get("/query")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    limiter.release()
+
+
+def test_expired_deadline_rejects_before_query():
+    ticket = admission.AdmissionTicket(ConcurrencyLimiter("analytics", 1, 0, 0), deadline=0.0)
+    token = admission._current_ticket.set(ticket)
+    try:
+        with pytest.raises(AdmissionRejectedError, match="deadline"):
+            admission.on_session_begin(None, None, None)
+    finally:
+        admission._current_ticket.reset(token)
+    assert ticket.limiter.in_flight == 0
@@ -0,0 +1,69 @@
+from datetime import date
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.crud import cohorts
+from app.database import Base
+from app.models.models import CohortPeriod, SalesData, Store, User, UserCohort, UserMonthlyActivity
+
+
+def _session() -> Session:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add_all([User(id=user_id, email=f"u{user_id}@example.com", hashed_password="x") for user_id in (1, 2, 3)])
+    db.add(Store(id=1, name="s", owner_id=1))
+    db.commit()
+    return db
+
+
+def _write(db: Session, rows: list):
+    # Như create_sales_data / ingest: insert + cohort update trong cùng transaction
+    db.add_all([
+        SalesData(user_id=user_id, store_id=1, date=day, revenue=revenue, ad_spend=1.0)
+        for user_id, day, revenue in rows
+    ])
+    cohorts.record_cohort_sales(db, [(user_id, 1, day, revenue, 1.0) for user_id, day, revenue in rows])
+    db.commit()
+
+
+def _tables(db: Session) -> tuple:
+    return tuple(
+        sorted(tuple(row) for row in db.execute(select(*model.__table__.c)))
+        for model in (UserCohort, UserMonthlyActivity, CohortPeriod)
+    )
+
+
+def test_incremental_updates_match_rebuild_including_backfill():
+    db = _session()
+    _write(db, [(1, date(2024, 1, 5), 100.0), (2, date(2024, 1, 20), 50.0), (1, date(2024, 1, 25), 10.0)])
+    _write(db, [(1, date(2024, 3, 1), 30.0), (3, date(2024, 2, 2), 70.0)])
+    _write(db, [(2, date(2024, 3, 9), 5.0)])
+    # Sale đến muộn, cũ hơn first sale của user 3 -> user 3 chuyển từ cohort 2024-02 sang 2023-12
+    _write(db, [(3, date(2023, 12, 30), 20.0), (3, date(2024, 2, 3), 1.0)])
+    incremental = _tables(db)
+
+    with patch.object(cohorts, "bump_tags") as bump_tags:
+        stats = cohorts.rebuild_cohorts(db)
+
+    bump_tags.assert_called_once()
+    assert stats["users"] == 3
+    assert _tables(db) == incremental
+
+
+def test_cohort_matrix_retention_and_empty_periods():
+    db = _session()
+    _write(db, [(1, date(2024, 1, 5), 100.0), (2, date(2024, 1, 20), 50.0), (1, date(2024, 3, 2), 40.0)])
+
+    (cohort,) = cohorts.compute_cohorts(db)
+
+    assert cohort["cohort"] == "2024-01"
+    assert cohort["users"] == 2
+    assert cohort["revenue"] == 190.0
+    assert [point["month"] for point in cohort["periods"]] == ["2024-01", "2024-02", "2024-03"]
+    assert [point["retention"] for point in cohort["periods"]] == [1.0, 0.0, 0.5]
+    assert cohort["periods"][2]["revenue_per_user"] == 20.0
+    assert cohorts.compute_cohorts(db, max_periods=1)[0]["periods"][-1]["period"] == 0
+    assert cohorts.compute_cohorts(db, start_month="2024-02") == []
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+pytest.importorskip("pyarrow")
+
+from app.core.config import settings
+from app.crud import columnar
+from app.database import Base
+from app.models.models import SalesData, Store, User
+
+
+@pytest.fixture
+def snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "columnar_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "columnar_row_group_size", 10)
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([User(id=1, email="a@example.com"), User(id=2, email="b@example.com")])
+        db.add_all([Store(id=1, name="s1", owner_id=1), Store(id=2, name="s2", owner_id=2)])
+        start = date(2024, 1, 20)
+        for i in range(30):
+            db.add(SalesData(date=start + timedelta(days=i), revenue=100.0, ad_spend=20.0,
+                             store_id=1, user_id=1))
+        db.add(SalesData(date=date(2024, 2, 10), revenue=300.0, ad_spend=50.0, store_id=2, user_id=2))
+        db.commit()
+        meta = columnar.export_snapshot(db, generation=7)
+    assert meta["rows"] == 31
+    assert meta["months"] == 2
+    return columnar.current_snapshot()
+
+
+def test_monthly_trends_from_partitions(snapshot):
+    """Partition theo tháng + aggregate theo batch khớp tổng từng tháng"""
+    trends = columnar.compute_monthly_trends(snapshot["path"])
+    assert [point["month"] for point in trends] == ["2024-01", "2024-02"]
+    january, february = trends
+    assert january["orders"] == 12 and january["revenue"] == 1200.0 and january["active_users"] == 1
+    assert february["orders"] == 19 and february["revenue"] == 2100.0 and february["active_users"] == 2
+    assert february["roas"] == round(2100.0 / 410.0, 2)
+
+    filtered = columnar.compute_monthly_trends(
+        snapshot["path"], start_date=date(2024, 2, 1), end_date=date(2024, 2, 5), store_id=1
+    )
+    assert filtered == [{"month": "2024-02", "revenue": 500.0, "ad_spend": 100.0,
+                         "roas": 5.0, "orders": 5, "active_users": 1}]
+
+
+def test_user_roas_ordering(snapshot):
+    by_revenue = columnar.compute_user_roas(snapshot["path"])
+    assert [row["user_id"] for row in by_revenue] == [1, 2]
+    assert by_revenue[0] == {"user_id": 1, "revenue": 3000.0, "ad_spend": 600.0, "roas": 5.0, "orders": 30}
+
+    by_roas = columnar.compute_user_roas(snapshot["path"], order_by="roas", limit=1)
+    assert by_roas == [{"user_id": 2, "revenue": 300.0, "ad_spend": 50.0, "roas": 6.0, "orders": 1}]
+
+
+def test_current_snapshot_missing(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "columnar_dir", str(tmp_path))
+    with pytest.raises(columnar.SnapshotNotFoundError):
+        columnar.current_snapshot()
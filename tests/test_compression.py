@@ -0,0 +1,41 @@
+import gzip
+
+from app.core import compression
+from app.core.compression import (
+    is_compressible,
+    negotiate_encoding,
+    parse_accept_encoding,
+    stream_compressor,
+)
+
+
+def test_parse_accept_encoding():
+    """Parse q-values trong Accept-Encoding"""
+    assert parse_accept_encoding("gzip;q=0.8, br") == {"gzip": 0.8, "br": 1.0}
+    assert parse_accept_encoding("gzip;q=bad") == {"gzip": 0.0}
+
+
+def test_negotiate_encoding(monkeypatch):
+    """Chọn encoding theo q-value, hoà thì theo thứ tự ưu tiên cấu hình"""
+    monkeypatch.setattr(compression, "available_encodings", lambda: ["zstd", "br", "gzip"])
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip, br") == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate_encoding("*") == "zstd"
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+
+
+def test_is_compressible():
+    assert is_compressible("application/json")
+    assert is_compressible("application/problem+json; charset=utf-8")
+    assert not is_compressible("text/event-stream")
+    assert not is_compressible("image/png")
+
+
+def test_gzip_stream_roundtrip():
+    """Streaming compressor cho ra gzip stream hợp lệ qua nhiều chunk"""
+    compressor = stream_compressor("gzip")
+    chunks = [b'[{"id":1}', b',{"id":2}', b"]"]
+    body = b"".join(compressor.compress(chunk) for chunk in chunks) + compressor.finish()
+    assert gzip.decompress(body) == b"".join(chunks)
@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import database
+from app.core.admission import AdmissionPendingError, AdmissionTicket, ConcurrencyLimiter, _current_ticket
+from app.core.serialization import dumps, loads
+from app.crud import dashboard
+from app.database import Base
+from app.models.models import SalesData, Store, User
+from app.schemas.analytics import AnalyticsQuerySpec
+
+
+def test_batch_uses_one_mget_and_runs_misses_on_separate_sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/dashboard.db")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(id=1, email="u1@example.com"), Store(id=1, name="s1", owner_id=1)])
+        session.add(SalesData(date=date(2024, 1, 1), revenue=100.0, ad_spend=25.0, store_id=1, user_id=1))
+        session.commit()
+
+    specs = [
+        AnalyticsQuerySpec(name="summary"),
+        AnalyticsQuerySpec(name="top_users", limit=1),
+        AnalyticsQuerySpec(id="store_growth", name="growth", store_id=1),
+        AnalyticsQuerySpec(name="prefect_cached"),
+    ]
+    redis = MagicMock()
+    # top_users có trong cache, summary + growth miss, chưa có Prefect data
+    redis.mget.return_value = [None, dumps([{"user_id": 9}]), None, None, None, None, None]
+    sessions = []
+
+    def read_session():
+        sessions.append(Session(engine))
+        return sessions[-1]
+
+    with patch.object(dashboard, "r", redis), \
+            patch.object(dashboard, "tag_versions", return_value=[5, 5, 2, 0, 5]), \
+            patch.object(database, "read_session", read_session):
+        body = loads(dashboard.run_batch(specs))
+
+    redis.mget.assert_called_once()
+    assert redis.mget.call_args.args[0][:3] == [
+        "analytics:summary:g5", "analytics:top_users:g5:limit=1", "analytics:stats:growth:g2:store=1",
+    ]
+    assert body["generation"] == 5
+    assert body["results"]["summary"] == {"total_revenue": 100.0, "total_ad_spend": 25.0, "roas": 4.0}
+    assert body["results"]["top_users"] == [{"user_id": 9}]
+    assert body["results"]["store_growth"][0]["revenue"] == 100.0
+    assert body["results"]["prefect_cached"] is None
+    assert len(sessions) == 2
+    assert redis.pipeline.return_value.setex.call_count == 2
+
+
+def test_limit_is_capped_per_query_name():
+    assert AnalyticsQuerySpec(name="distribution", limit=500).limit == 500
+    with pytest.raises(ValidationError):
+        AnalyticsQuerySpec(name="top_users", limit=101)
+
+
+def test_failed_query_is_reported_and_returned_per_query(tmp_path):
+    """Replica lỗi: bị report, query đó trả {"error": ...} không cache, query khác vẫn có kết quả"""
+    engine = create_engine(f"sqlite:///{tmp_path}/dashboard.db")
+    Base.metadata.create_all(engine)
+    broken = MagicMock()
+    broken.execute.side_effect = OperationalError("SELECT", {}, Exception("connection reset"))
+    broken.__enter__.return_value = broken
+    sessions = iter([broken, Session(engine)])
+    redis = MagicMock()
+    redis.mget.return_value = [None, None]
+
+    with patch.object(dashboard, "r", redis), \
+            patch.object(dashboard, "tag_versions", return_value=[1, 1, 1]), \
+            patch.object(dashboard.settings, "dashboard_max_parallel_queries", 1), \
+            patch.object(database, "read_session", lambda: next(sessions)), \
+            patch.object(database, "report_read_failure") as report_read_failure:
+        body = loads(dashboard.run_batch([
+            AnalyticsQuerySpec(name="summary"),
+            AnalyticsQuerySpec(name="distribution"),
+        ]))
+
+    assert body["results"]["summary"] == {"error": "Query failed"}
+    assert body["results"]["distribution"] == []
+    assert report_read_failure.call_args.args[0] is broken
+    setex = redis.pipeline.return_value.setex
+    assert [call.args[0] for call in setex.call_args_list] == [
+        "analytics:stats:distribution:store:g1:limit=20",
+    ]
+
+
+def test_parallel_misses_take_one_admission_slot_each():
+    """4 misses, limit 3, 1 slot đang bận: chỉ 2 query chạy cùng lúc, slot thêm được trả lại"""
+    limiter = ConcurrencyLimiter("analytics", 3, 0, 1)
+    assert limiter.try_acquire()  # Request khác
+    ticket = AdmissionTicket(limiter, None)
+    running, peak, in_flight, lock = [0], [0], set(), threading.Lock()
+
+    def run_miss(plan):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            in_flight.add(limiter.in_flight)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        plan.payload = b"1"
+
+    token = _current_ticket.set(ticket)
+    try:
+        with patch.object(dashboard, "_run_miss", run_miss), \
+                patch.object(dashboard.settings, "dashboard_max_parallel_queries", 4):
+            dashboard._run_misses([dashboard._Plan(str(i), []) for i in range(4)])
+    finally:
+        _current_ticket.reset(token)
+
+    assert peak[0] == 2
+    assert in_flight == {3}  # 1 request khác + 2 slots của batch
+    assert ticket.admitted and limiter.in_flight == 2
+    ticket.release()
+    limiter.release()
+    # Hết slot: dừng trước mọi query, AdmissionRoute chờ slot rồi chạy lại
+    limiter.limit = 0
+    token = _current_ticket.set(ticket)
+    try:
+        with pytest.raises(AdmissionPendingError):
+            dashboard._run_misses([dashboard._Plan("0", [])])
+    finally:
+        _current_ticket.reset(token)
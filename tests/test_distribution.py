@@ -0,0 +1,57 @@
+import statistics
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.crud.distribution import cache_key, compute_distribution, compute_growth
+from app.database import Base
+from app.models.models import SalesData, Store, User
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(id=1, email="a@example.com"), User(id=2, email="b@example.com")])
+        session.add_all([Store(id=1, name="s1", owner_id=1), Store(id=2, name="s2", owner_id=2)])
+        start = date(2024, 1, 1)
+        for i in range(20):
+            session.add(SalesData(date=start + timedelta(days=i % 10), revenue=100.0 + i * 7,
+                                  ad_spend=10.0, store_id=1, user_id=1))
+        session.add(SalesData(date=start, revenue=50.0, ad_spend=25.0, store_id=2, user_id=2))
+        session.commit()
+        yield session
+
+
+def test_distribution_percentiles_match_percentile_cont(db):
+    """Percentiles tính trong SQL khớp nội suy tuyến tính (percentile_cont)"""
+    rows = compute_distribution(db, "store")
+    assert [row["store_id"] for row in rows] == [1, 2]
+
+    values = [100.0 + i * 7 for i in range(20)]
+    expected = statistics.quantiles(values, n=100, method="inclusive")
+    store = rows[0]
+    assert store["orders"] == 20
+    assert store["avg_order_value"] == round(statistics.fmean(values), 2)
+    assert store["roas"] == round(sum(values) / 200.0, 2)
+    assert store["revenue_percentiles"]["p50"] == round(expected[49], 2)
+    assert store["revenue_percentiles"]["p90"] == round(expected[89], 2)
+    assert rows[1]["revenue_percentiles"] == {"p50": 50.0, "p90": 50.0, "p99": 50.0}
+
+
+def test_growth_skips_gaps(db):
+    """DoD/WoW chỉ tính khi ngày so sánh thật sự có dữ liệu"""
+    points = compute_growth(db, start_date=date(2024, 1, 2), store_id=1)
+    assert points[0]["date"] == "2024-01-02"
+    assert points[0]["dod_growth"] is not None
+    assert points[0]["wow_growth"] is None  # 2023-12-26 không có sales
+    assert points[-1]["date"] == "2024-01-10"
+    assert points[6]["wow_growth"] is not None  # 2024-01-08 vs 2024-01-01
+
+
+def test_cache_key_is_parameter_aware():
+    assert cache_key("growth", 3, start=date(2024, 1, 1), store=None) == "analytics:stats:growth:g3:start=2024-01-01"
+    assert cache_key("growth", 3, store=1, start=None) != cache_key("growth", 3, store=2)
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.crud import forecast
+from app.database import Base
+from app.models.models import SalesData, Store, User
+
+
+def test_exponential_smoothing_matches_recursive_definition():
+    history = np.random.default_rng(0).uniform(0, 100, size=(3, 2, 30))
+
+    level = history[..., 0]
+    for day in range(1, 30):
+        level = forecast.SMOOTHING_ALPHA * history[..., day] + (1 - forecast.SMOOTHING_ALPHA) * level
+
+    result = forecast.exponential_smoothing(history, 5)
+    assert result.shape == (3, 2, 5)
+    assert np.allclose(result, level[..., None])
+
+
+def test_seasonal_naive_repeats_last_week():
+    history = np.arange(14, dtype=float).reshape(1, 14)
+
+    assert forecast.seasonal_naive(history, 10).tolist() == [[7, 8, 9, 10, 11, 12, 13, 7, 8, 9]]
+
+
+def test_compute_forecast_per_store_and_overall():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    as_of = date(2024, 3, 31)
+    with Session(engine) as db:
+        db.add(User(id=1, email="a@example.com", hashed_password="x"))
+        db.add_all([Store(id=store_id, name=f"s{store_id}", owner_id=1) for store_id in (1, 2)])
+        for offset in range(14):
+            day = as_of - timedelta(days=offset)
+            db.add(SalesData(user_id=1, store_id=1, date=day, revenue=100.0, ad_spend=10.0))
+            db.add(SalesData(user_id=1, store_id=1, date=day, revenue=50.0, ad_spend=5.0))
+            if offset < 7:
+                db.add(SalesData(user_id=1, store_id=2, date=day, revenue=40.0, ad_spend=20.0))
+        db.commit()
+
+        result = forecast.compute_forecast(db, horizon=7, history_days=14, as_of=as_of)
+        only_store_2 = forecast.compute_forecast(db, horizon=7, history_days=14, as_of=as_of, store_ids=[2, 2])
+
+    assert result["dates"][0] == "2024-04-01"
+    store_1, store_2 = result["stores"]
+    assert store_1["store_id"] == 1
+    assert store_1["revenue"]["moving_average"] == [150.0] * 7
+    assert store_2["history"]["revenue"] == 280.0
+    assert result["overall"]["revenue"]["seasonal_naive"] == [190.0] * 7
+    assert result["overall"]["history"]["last_7d_ad_spend"] == 245.0
+    assert [store["store_id"] for store in only_store_2["stores"]] == [2]
+    assert forecast.stores_param([3, 1, 3]) == "1,3"
+
+
+def test_app_import_does_not_load_numpy():
+    code = "import sys, app.main; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
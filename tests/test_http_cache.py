@@ -0,0 +1,52 @@
+from email.utils import formatdate
+from unittest.mock import MagicMock
+
+from app.core.http_cache import cache_headers, is_not_modified, make_etag
+
+
+def make_request(headers):
+    request = MagicMock()
+    request.headers = {k.lower(): v for k, v in headers.items()}
+    return request
+
+
+def test_etag_changes_with_generation():
+    """Mỗi lần bump generation phải sinh ETag mới"""
+    assert make_etag("summary", 1, 1000) != make_etag("summary", 2, 1000)
+    assert make_etag("summary", 1, 1000) != make_etag("top_users", 1, 1000)
+
+
+def test_if_none_match_matches_weak_and_list():
+    """If-None-Match so sánh weak và hỗ trợ danh sách ETag"""
+    etag = make_etag("summary", 3, 1000)
+    assert is_not_modified(make_request({"If-None-Match": etag}), etag, 1000)
+    assert is_not_modified(make_request({"If-None-Match": etag[2:]}), etag, 1000)
+    assert is_not_modified(make_request({"If-None-Match": f'"other", {etag}'}), etag, 1000)
+    assert is_not_modified(make_request({"If-None-Match": "*"}), etag, 1000)
+    assert not is_not_modified(make_request({"If-None-Match": make_etag("summary", 2, 1000)}), etag, 1000)
+
+
+def test_if_modified_since():
+    """If-Modified-Since chỉ dùng khi không có If-None-Match"""
+    etag = make_etag("summary", 1, 1000)
+    assert is_not_modified(make_request({"If-Modified-Since": formatdate(1000, usegmt=True)}), etag, 1000)
+    assert not is_not_modified(make_request({"If-Modified-Since": formatdate(999, usegmt=True)}), etag, 1000)
+    assert not is_not_modified(make_request({"If-Modified-Since": "garbage"}), etag, 1000)
+    assert not is_not_modified(make_request({}), etag, 1000)
+
+
+def test_cache_headers():
+    headers = cache_headers('W/"summary-1-1000"', 1000)
+    assert headers["ETag"] == 'W/"summary-1-1000"'
+    assert headers["Last-Modified"] == formatdate(1000, usegmt=True)
+    assert "max-age=" in headers["Cache-Control"]
+    assert headers["Vary"] == "Authorization"
+    assert headers["Cache-Control"].startswith("public, ")
+
+
+def test_private_cache_headers():
+    """Data riêng của tenant: proxy/CDN không được cache"""
+    headers = cache_headers('W/"tenant1-summary-1-1000"', 1000, private=True)
+    assert headers["Cache-Control"].startswith("private, ")
+    assert "must-revalidate" in headers["Cache-Control"]
+    assert headers["Vary"] == "Authorization"
@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.serialization import dumps
+from app.crud import ingest
+
+
+def _message(message_id, store_id):
+    payload = {"date": "2024-05-01", "revenue": 10.0, "ad_spend": 1.0, "store_id": store_id, "user_id": 1}
+    return message_id, {"payload": dumps(payload).decode()}
+
+
+def _redis(messages, times_delivered):
+    redis = MagicMock()
+    redis.xautoclaim.return_value = ["0-0", [], []]
+    redis.xreadgroup.return_value = [[ingest.STREAM_KEY, messages]]
+    redis.xpending_range.return_value = [
+        {"message_id": message_id, "times_delivered": times_delivered} for message_id, _ in messages
+    ]
+    return redis
+
+
+def test_batch_is_acked_after_commit():
+    redis = _redis([_message("1-0", 1), _message("2-0", 1)], 1)
+    db = MagicMock()
+    with patch.object(ingest, "r", redis), patch.object(ingest, "_after_commit") as after_commit, \
+            patch.object(ingest, "record_cohort_sales"):
+        stats = ingest.drain_once(db, "w1")
+
+    assert stats == {"read": 2, "written": 2, "dead_lettered": 0}
+    db.commit.assert_called_once()
+    redis.xack.assert_called_once_with(ingest.STREAM_KEY, ingest.GROUP, "1-0", "2-0")
+    assert len(after_commit.call_args.args[1]) == 2
+
+
+def test_poison_message_is_isolated_and_dead_lettered():
+    """Batch lỗi -> insert từng message; message hết lượt retry vào dead-letter, phần còn lại vẫn được ghi"""
+    redis = _redis([_message("1-0", 1), _message("2-0", 999)], ingest.settings.ingest_max_deliveries)
+    db = MagicMock()
+
+    def execute(statement, rows):
+        if any(row["store_id"] == 999 for row in rows):
+            raise IntegrityError("INSERT", rows, Exception("foreign key"))
+
+    db.execute.side_effect = execute
+    with patch.object(ingest, "r", redis), patch.object(ingest, "_after_commit"), \
+            patch.object(ingest, "record_cohort_sales"):
+        stats = ingest.drain_once(db, "w1")
+
+    assert stats == {"read": 2, "written": 1, "dead_lettered": 1}
+    redis.xack.assert_called_once_with(ingest.STREAM_KEY, ingest.GROUP, "1-0")
+    dead_letter_pipe = redis.pipeline.return_value
+    assert dead_letter_pipe.xadd.call_args.args[0] == ingest.DEAD_LETTER_KEY
+    dead_letter_pipe.xack.assert_called_once_with(ingest.STREAM_KEY, ingest.GROUP, "2-0")
+    assert redis.xpending_range.call_args.kwargs["consumername"] == "w1"
@@ -0,0 +1,58 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.crud import leaderboard, live_analytics
+from app.routers import sales
+
+
+def test_board_key():
+    assert leaderboard.board_key() == leaderboard.ALL_TIME_KEY
+    assert leaderboard.board_key(month="2024-05") == "leaderboard:revenue:month:2024-05"
+    assert leaderboard.board_key(store_id=7) == "leaderboard:revenue:store:7"
+    with pytest.raises(ValueError):
+        leaderboard.board_key(month="2024-05", store_id=7)
+
+
+def test_add_sales_merges_increments_per_board_and_user():
+    """Cùng user trong một batch chỉ tốn một ZINCRBY mỗi board"""
+    pipe = MagicMock()
+    leaderboard.add_sales(pipe, [
+        (1, 7, date(2024, 5, 1), 100.0),
+        (1, 7, "2024-05-20", 25.0),
+        (2, 8, date(2024, 6, 1), 10.0),
+    ])
+
+    increments = {call.args[0:3:2]: call.args[1] for call in pipe.zincrby.call_args_list}
+    assert increments == {
+        (leaderboard.ALL_TIME_KEY, 1): 125.0,
+        ("leaderboard:revenue:month:2024-05", 1): 125.0,
+        ("leaderboard:revenue:store:7", 1): 125.0,
+        (leaderboard.ALL_TIME_KEY, 2): 10.0,
+        ("leaderboard:revenue:month:2024-06", 2): 10.0,
+        ("leaderboard:revenue:store:8", 2): 10.0,
+    }
+    boards = set(pipe.sadd.call_args.args[1:])
+    assert leaderboard.ALL_TIME_KEY not in boards
+    assert len(boards) == 4
+
+
+def test_leaderboard_not_ready_returns_503_and_rebuilds_in_background():
+    """Request không chờ rebuild (full scan) - 503 + Retry-After ngay, rebuild chạy trong thread"""
+    redis = MagicMock()
+    redis.exists.return_value = 0
+    redis.set.return_value = True
+    with patch.object(leaderboard, "is_ready", return_value=False), \
+            patch.object(live_analytics, "r", redis), \
+            patch.object(live_analytics, "_rebuild_and_unlock") as rebuild, \
+            patch.object(live_analytics.threading, "Thread") as thread:
+        with pytest.raises(HTTPException) as exc_info:
+            sales._leaderboard_key(None, None)
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "5"}
+    thread.assert_called_once_with(target=rebuild, name="live-counters-rebuild", daemon=True)
+    thread.return_value.start.assert_called_once()
+    rebuild.assert_not_called()
@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import bindparam, create_engine, select
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.orm import Session
+
+from app.core import prepared
+from app.core.prepared import PreparedQuery
+from app.crud import analytics
+from app.crud.user import get_user_by_email
+from app.database import Base
+from app.models.models import User
+
+
+def test_postgres_sql_uses_positional_parameters():
+    prepare_sql, execute_sql, defaults = analytics.TOP_USERS_QUERY.postgres_sql(psycopg2.dialect())
+
+    assert prepare_sql.startswith("PREPARE analytics_top_users AS SELECT")
+    assert prepare_sql.rstrip().endswith("LIMIT $1")
+    assert execute_sql == "EXECUTE analytics_top_users (:limit)"
+    assert defaults == {}
+
+
+def test_prepare_runs_once_per_connection():
+    query = PreparedQuery("test_user_lookup", select(User).where(User.email == bindparam("email")))
+    conn = MagicMock()
+    conn.dialect = psycopg2.dialect()
+    conn.connection.info = {}
+    db = MagicMock()
+    db.connection.return_value = conn
+
+    with patch.object(prepared.settings, "db_prepared_statements", True):
+        query.execute(db, email="a@example.com")
+        query.execute(db, email="b@example.com")
+
+    conn.exec_driver_sql.assert_called_once_with(
+        "PREPARE test_user_lookup AS SELECT users.id, users.email, users.hashed_password \n"
+        "FROM users \nWHERE users.email = $1"
+    )
+    statement, params = db.execute.call_args.args
+    assert str(statement.compile(dialect=conn.dialect)) == "EXECUTE test_user_lookup (%(email)s)"
+    assert params == {"email": "b@example.com"}
+
+
+def test_other_dialects_execute_core_statement():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(email="a@example.com", hashed_password="x"))
+        db.commit()
+
+        assert get_user_by_email(db, "a@example.com").email == "a@example.com"
+        assert get_user_by_email(db, "missing@example.com") is None
+        assert analytics.compute_summary(db) == {"total_revenue": 0, "total_ad_spend": 0, "roas": 0}
+
+
+def test_prepare_is_off_by_default():
+    query = PreparedQuery("test_default_off", select(User).where(User.email == bindparam("email")))
+    db = MagicMock()
+    db.connection.return_value.dialect = psycopg2.dialect()
+
+    query.execute(db, email="a@example.com")
+
+    db.connection.return_value.exec_driver_sql.assert_not_called()
+    assert db.execute.call_args.args == (query.statement, {"email": "a@example.com"})
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.models import SalesData, Store, User
+from benchmarks import query_plans
+
+
+def test_dropped_index_is_reported_as_plan_regression(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/plans.db")
+    Base.metadata.create_all(engine)
+    today = date.today()
+    with Session(engine) as session:
+        session.add_all([User(id=1, email="u1@example.com"), Store(id=1, name="s1", owner_id=1)])
+        session.add_all([
+            SalesData(date=today - timedelta(days=day), revenue=100.0, ad_spend=10.0, store_id=1, user_id=1)
+            for day in range(10)
+        ])
+        session.commit()
+
+    only = ["growth.store_30d", "analytics.summary"]
+    baseline = {"plans": query_plans.capture_plans(engine, only)}
+    report = query_plans.index_report(engine, baseline["plans"])
+    assert report["indexes"]["idx_sales_store_date"]["used_by"] == ["growth.store_30d"]
+    assert report["seq_scans"] == {"analytics.summary": ["sales_data"]}
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_sales_store_date"))
+    lines = query_plans.compare(baseline, {"plans": query_plans.capture_plans(engine, only)}, threshold=0.2)
+
+    assert any(line.startswith("REGRESSION growth.store_30d: plan shape changed") for line in lines)
+    assert any(line.startswith("ok        analytics.summary") for line in lines)
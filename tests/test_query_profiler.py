@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core import query_profiler
+from app.core.query_profiler import QueryProfile, install_query_profiler, profile_headers
+from app.middleware import logging_middleware
+from app.middleware.logging_middleware import LoggingMiddleware
+
+
+def test_query_profile_records_and_keeps_slowest():
+    """Đếm statements, cộng DB time, chỉ giữ N statements chậm nhất"""
+    profile = QueryProfile()
+    for i in range(10):
+        profile.record(f"SELECT {i}", float(i))
+
+    assert profile.count == 10
+    assert profile.total_ms == sum(range(10))
+    slowest = profile.slowest_statements()
+    assert slowest[0] == {"ms": 9.0, "sql": "SELECT 9"}
+    assert len(slowest) <= 5
+
+
+def test_n_plus_one_detection():
+    """Cùng statement lặp lại >= ngưỡng trong một request là N+1 candidate"""
+    profile = QueryProfile()
+    profile.record("SELECT users WHERE id = %(id)s", 1.0)
+    for _ in range(6):
+        profile.record("SELECT stores WHERE stores.id = %(pk_1)s", 0.5)
+
+    assert profile.n_plus_one_candidates() == [("SELECT stores WHERE stores.id = %(pk_1)s", 6)]
+
+
+def test_profile_headers():
+    profile = QueryProfile()
+    profile.record("SELECT 1", 1.234)
+    assert profile_headers(profile) == {"X-DB-Query-Count": "1", "X-DB-Time-Ms": "1.23"}
+
+
+def test_failed_statement_does_not_leak_start_time():
+    engine = create_engine("sqlite://")
+    install_query_profiler(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["query_start_time"] == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_start_time"] == []
+
+
+def test_profile_finishes_after_streamed_body():
+    """Queries chạy trong lúc stream body vẫn được tính vào profile của request"""
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/stream")
+    def stream():
+        def body():
+            for i in range(3):
+                time.sleep(0.02)
+                query_profiler._current_profile.get().record(f"SELECT {i}", 1.0)
+                yield b"x"
+
+        return StreamingResponse(body())
+
+    counts = []
+
+    def finish_profile(profile, request_id, route):
+        counts.append(profile.count)
+        return query_profiler.finish_profile(profile, request_id, route)
+
+    with patch.object(logging_middleware.settings, "query_profiling_enabled", True), \
+            patch.object(logging_middleware, "finish_profile", finish_profile):
+        response = TestClient(app).get("/stream")
+
+    assert response.content == b"xxx"
+    assert counts == [3]
+
+
+def test_sampling_profile_is_saved_off_the_event_loop():
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"loop_thread": threading.get_ident()}
+
+    redis = MagicMock()
+    setex_threads = []
+    redis.setex.side_effect = lambda *args: setex_threads.append(threading.get_ident())
+    with patch.object(logging_middleware, "r", redis), \
+            patch.object(logging_middleware, "_profile_requested", return_value=True):
+        response = TestClient(app).get("/ping")
+
+    assert response.headers["X-Profile-Status"] == "captured"
+    key = redis.setex.call_args.args[0]
+    assert key == f"{logging_middleware.PROFILE_KEY_PREFIX}:{response.headers['X-Request-ID']}"
+    assert setex_threads and setex_threads[0] != response.json()["loop_thread"]
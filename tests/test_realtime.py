@@ -0,0 +1,64 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+from starlette.datastructures import URL
+
+from app.core import auth, stream_tickets
+from app.core.realtime import LiveAnalyticsBroadcaster
+from app.crud import live_analytics
+from app.main import app
+from app.middleware.logging_middleware import _log_url
+
+
+def test_slow_subscriber_only_keeps_latest_update():
+    """Client chậm chỉ nhận snapshot mới nhất, queue không phình"""
+    broadcaster = LiveAnalyticsBroadcaster("test", build_snapshot=lambda: b"{}")
+    queue = asyncio.Queue(maxsize=1)
+    broadcaster._subscribers.add(queue)
+
+    for payload in (b'{"v":1}', b'{"v":2}', b'{"v":3}'):
+        broadcaster.publish(payload)
+
+    assert queue.qsize() == 1
+    assert queue.get_nowait() == b'{"v":3}'
+    broadcaster.unsubscribe(queue)
+    assert broadcaster.subscriber_count == 0
+
+
+def test_record_sales_batches_counters_in_one_transaction():
+    """Một MULTI/EXEC cho cả batch: tổng INCRBYFLOAT, leaderboards, PUBLISH"""
+    pipe = MagicMock()
+    rows = [(1, 10, "2024-05-01", 100.0, 10.0), (2, 10, "2024-05-02", 50.0, 5.0)]
+    with patch.object(live_analytics, "r") as r:
+        r.pipeline.return_value = pipe
+        live_analytics.record_sales(rows)
+
+    r.pipeline.assert_called_once_with(transaction=True)
+    pipe.incrbyfloat.assert_any_call(live_analytics.REVENUE_KEY, 150.0)
+    pipe.incrbyfloat.assert_any_call(live_analytics.AD_SPEND_KEY, 15.0)
+    pipe.incrby.assert_called_once_with(live_analytics.COUNT_KEY, 2)
+    assert pipe.zincrby.call_count == 6  # 2 users x (all-time, tháng, store)
+    pipe.publish.assert_called_once_with(live_analytics.EVENTS_CHANNEL, 2)
+    pipe.execute.assert_called_once()
+
+
+def test_stream_accepts_single_use_ticket_not_jwt_in_url():
+    redis = MagicMock()
+    redis.getdel.return_value = None
+    client = TestClient(app)
+    with patch.object(stream_tickets, "r", redis), patch.object(auth.settings, "secret_key", "test-secret"):
+        jwt = auth.create_access_token({"sub": "a@example.com"})
+        ticket = client.post("/analytics/stream/ticket", headers={"Authorization": f"Bearer {jwt}"}).json()
+        assert client.get(f"/analytics/stream?token={jwt}").status_code == 401
+        assert client.get(f"/analytics/stream?ticket={ticket['ticket']}").status_code == 401  # đã dùng / hết hạn
+
+    key = f"{stream_tickets.TICKET_KEY_PREFIX}:{ticket['ticket']}"
+    redis.set.assert_called_once_with(key, "a@example.com", ex=ticket["expires_in"])
+    redis.getdel.assert_called_once_with(key)
+
+
+def test_log_url_redacts_credentials():
+    request = MagicMock()
+    request.url = URL("http://api/analytics/stream?ticket=abc&token=xyz&limit=3")
+    assert _log_url(request) == "http://api/analytics/stream?ticket=%5BREDACTED%5D&token=%5BREDACTED%5D&limit=3"
@@ -0,0 +1,77 @@
+"""Hai SQLite database đóng vai primary và replica"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import ReplicaRouter
+
+
+def _engine(path, role):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE role (name TEXT)"))
+        conn.execute(text("INSERT INTO role VALUES (:role)"), {"role": role})
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def no_recent_write(monkeypatch):
+    monkeypatch.setattr(database, "written_within", lambda seconds: False)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    return _engine(tmp_path / "primary.db", "primary"), _engine(tmp_path / "replica.db", "replica")
+
+
+def _role(session):
+    with session:
+        return session.execute(text("SELECT name FROM role")).scalar()
+
+
+def test_reads_go_to_replica_round_robin_and_broken_replica_is_ejected(engines, tmp_path, monkeypatch):
+    primary, replica = engines
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/dir/replica.db")
+    router = ReplicaRouter([replica, broken], eject_seconds=60)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary))
+    monkeypatch.setattr(database, "get_replica_router", lambda: router)
+
+    assert {_role(database.read_session()) for _ in range(4)} == {"replica"}
+    assert [status["healthy"] for status in router.status()] == [True, False]
+
+    router.report_failure(replica, "connection reset")
+    assert router.choose() is None
+    assert _role(database.read_session()) == "primary"
+
+    # Health probe báo replica đã sống lại nhưng không bỏ ejection của routing
+    probe = router.check_all()
+    assert [(status["healthy"], status["ejected"]) for status in probe] == [(True, True), (False, True)]
+    assert router.choose() is None
+
+
+def test_lagging_replica_falls_back_to_primary(engines, monkeypatch):
+    primary, replica = engines
+    router = ReplicaRouter([replica], max_lag_seconds=5, check_interval=0)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary))
+    monkeypatch.setattr(database, "get_replica_router", lambda: router)
+
+    monkeypatch.setattr(database, "replication_lag_seconds", lambda conn: 30.0)
+    assert _role(database.read_session()) == "primary"
+
+    monkeypatch.setattr(database, "replication_lag_seconds", lambda conn: 1.0)
+    assert _role(database.read_session()) == "replica"
+
+
+def test_reads_right_after_write_go_to_primary(engines, monkeypatch):
+    primary, replica = engines
+    router = ReplicaRouter([replica])
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=primary))
+    monkeypatch.setattr(database, "get_replica_router", lambda: router)
+
+    monkeypatch.setattr(database, "written_within", lambda seconds: True)
+    assert _role(database.read_session()) == "primary"
+
+    monkeypatch.setattr(database, "written_within", lambda seconds: False)
+    assert _role(database.read_session()) == "replica"
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from app.core import admission
+from app.core.admission import AdmissionTicket, ConcurrencyLimiter
+from app.database import Base
+from app.dependencies.deps import get_stream_read_db
+from app.main import app
+from app.models.models import SalesData, Store, User
+from app.routers import sales
+
+
+@pytest.fixture
+def client():
+    yield TestClient(app, raise_server_exceptions=False)
+    app.dependency_overrides.clear()
+
+
+def test_streams_json_array_and_closes_session(client, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/stream.db")
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add_all([User(id=1, email="a@example.com"), Store(id=1, name="s", owner_id=1)])
+    db.add_all([SalesData(date=date(2024, 1, day), revenue=day, ad_spend=1.0, store_id=1, user_id=1) for day in (1, 2)])
+    db.commit()
+    db.close = MagicMock(wraps=db.close)
+    app.dependency_overrides[get_stream_read_db] = lambda: db
+
+    response = client.get("/sales-data/")
+
+    assert response.status_code == 200
+    assert [row["revenue"] for row in response.json()] == [1.0, 2.0]
+    db.close.assert_called_once()
+    assert admission.get_limiter("sales_list").in_flight == 0
+
+
+def test_database_error_is_500_not_truncated_200(client):
+    db = MagicMock()
+    db.execute.side_effect = OperationalError("SELECT", {}, Exception("connection refused"))
+    app.dependency_overrides[get_stream_read_db] = lambda: db
+
+    response = client.get("/sales-data/")
+
+    assert response.status_code == 500
+    assert admission.get_limiter("sales_list").in_flight == 0
+
+
+def test_slot_and_session_released_when_client_disconnects_before_body():
+    limiter = ConcurrencyLimiter("sales_list", limit=1, max_queue=0, queue_timeout=0)
+    ticket = AdmissionTicket(limiter, deadline=None)
+    asyncio.run(ticket.admit())
+    db = MagicMock()
+    response = sales._SalesStream(iter([b"[]"]), ticket, db)
+
+    async def send(message):
+        raise OSError("client disconnected")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert limiter.in_flight == 0
+    db.close.assert_called_once()
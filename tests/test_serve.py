@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("gunicorn")
+
+from app.serve import build_options, default_workers, parse_args
+
+
+def test_defaults_size_workers_from_cpus():
+    options = build_options(parse_args([]))
+    assert options["workers"] == default_workers() >= 1
+    assert options["worker_class"] == "app.serve.UvloopHttptoolsWorker"
+    assert options["preload_app"] is True
+
+
+def test_max_requests_disabled_drops_jitter():
+    options = build_options(parse_args(["--workers", "3", "--max-requests", "0", "--no-preload"]))
+    assert options["workers"] == 3
+    assert options["max_requests"] == 0 and options["max_requests_jitter"] == 0
+    assert options["preload_app"] is False
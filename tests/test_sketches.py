@@ -0,0 +1,28 @@
+import random
+
+from app.core import sketches
+
+
+def test_quantiles_within_relative_accuracy():
+    """Percentile từ sketch sai số tương đối <= α so với giá trị thật"""
+    rng = random.Random(1)
+    values = sorted(rng.lognormvariate(7, 1) for _ in range(20_000))
+    buckets = {k: str(v) for k, v in sketches.bucket_counts(values, 0.01).items()}
+
+    result = sketches.quantiles(buckets, (0.5, 0.95, 0.99), 0.01)
+    for q, estimate in result.items():
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(estimate - exact) / exact <= 0.01 + 1e-9
+
+
+def test_quantiles_empty_and_zero_bucket():
+    assert sketches.quantiles({}, (0.5,), 0.01) == {0.5: None}
+    buckets = sketches.bucket_counts([0, 0, 0, 100], 0.01)
+    assert sketches.quantiles(buckets, (0.5,), 0.01) == {0.5: 0.0}
+
+
+def test_estimate_sum_scales_sample():
+    assert sketches.estimate_sum(50.0, 500.0, 1.0) == (50.0, 0.0)
+    estimate, bound = sketches.estimate_sum(50.0, 500.0, 0.1)
+    assert estimate == 500.0
+    assert bound > 0
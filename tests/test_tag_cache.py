@@ -0,0 +1,54 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from app.core import tag_cache
+from app.core.tag_cache import GLOBAL_TAG, sales_tags, scope_tags
+
+
+def test_sales_tags_cover_every_dimension_written():
+    tags = sales_tags([(7, 2, date(2024, 5, 1), 10.0, 1.0), (8, 2, date(2024, 5, 2), 5.0, 1.0)])
+    assert tags == {
+        GLOBAL_TAG, "store:2", "date:2024-05-01", "date:2024-05-02",
+    }
+
+
+def test_scope_tags_pick_narrowest_dimension():
+    assert scope_tags(date(2024, 1, 1), date(2024, 1, 31), store_id=3) == ["store:3"]
+    assert scope_tags(date(2024, 1, 30), date(2024, 2, 1)) == ["date:2024-01-30", "date:2024-01-31", "date:2024-02-01"]
+    assert scope_tags(date(2024, 1, 1)) == [GLOBAL_TAG]
+    assert scope_tags(date(2020, 1, 1), date(2024, 1, 1)) == [GLOBAL_TAG]
+
+
+def test_bump_is_one_incr_per_tag_and_version_changes_only_for_affected_tags():
+    counters = {}
+    incremented = []
+    redis = MagicMock()
+    pipe = redis.pipeline.return_value
+    pipe.incr.side_effect = incremented.append
+
+    def execute():
+        for key in incremented:
+            counters[key] = counters.get(key, 0) + 1
+        return [counters[tag_cache.tag_key(GLOBAL_TAG)]]
+
+    pipe.execute.side_effect = execute
+    redis.mget.side_effect = lambda keys: [counters.get(key) for key in keys]
+
+    with patch.object(tag_cache, "r", redis):
+        other_store = tag_cache.tag_version(["store:2"])
+        day = tag_cache.tag_version(["date:2024-05-01"])
+        assert tag_cache.bump_tags(sales_tags([(1, 1, date(2024, 5, 1))])) == 1
+        assert sorted(incremented) == sorted(
+            map(tag_cache.tag_key, [GLOBAL_TAG, "store:1", "date:2024-05-01"])
+        )
+        # Counters của store/ngày hết hạn nếu không còn bị ghi, global (ETag) thì không
+        assert sorted(call.args for call in pipe.expire.call_args_list) == [
+            (tag_cache.tag_key("date:2024-05-01"), tag_cache.TAG_TTL_SECONDS),
+            (tag_cache.tag_key("store:1"), tag_cache.TAG_TTL_SECONDS),
+        ]
+        assert tag_cache.tag_version(["store:2"]) == other_store
+        assert tag_cache.tag_version(["date:2024-05-01"]) == day + 1
+        # Global generation đã đọc cho ETag được dùng lại, không MGET
+        redis.mget.reset_mock()
+        assert tag_cache.tag_version([GLOBAL_TAG], generation=1) == 1
+        redis.mget.assert_not_called()
@@ -0,0 +1,88 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core import tenant_quota
+from app.crud import tenant_analytics
+from app.crud.tenant_analytics import cache_key, compute_tenant_summary, compute_tenant_top_users
+from app.database import Base
+from app.models.models import SalesData, Store, User
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([User(id=1, email="owner1@example.com"), User(id=2, email="owner2@example.com")])
+        session.add_all([Store(id=1, name="s1", owner_id=1), Store(id=2, name="s2", owner_id=2)])
+        session.add_all([
+            SalesData(date=date(2024, 1, 1), revenue=100.0, ad_spend=50.0, store_id=1, user_id=1),
+            SalesData(date=date(2024, 1, 2), revenue=300.0, ad_spend=50.0, store_id=1, user_id=2),
+            SalesData(date=date(2024, 1, 2), revenue=999.0, ad_spend=1.0, store_id=2, user_id=2),
+        ])
+        session.commit()
+        yield session
+
+
+def test_summary_and_top_users_only_cover_tenant_stores(db):
+    assert compute_tenant_summary(db, 1) == {
+        "total_revenue": 400.0, "total_ad_spend": 100.0, "roas": 4.0, "orders": 2, "stores": 1,
+    }
+    assert compute_tenant_summary(db, 1, start_date=date(2024, 1, 2))["orders"] == 1
+    # User 2 bán ở store của tenant 1 - chỉ tính phần revenue trong store đó
+    top = compute_tenant_top_users(db, 1)
+    assert [(row["user_id"], row["total_revenue"]) for row in top] == [(2, 300.0), (1, 100.0)]
+    assert cache_key(1, "summary", 5).startswith("tenant:1:analytics:g5:")
+
+
+def test_quota_rejects_over_concurrency_and_releases_slot():
+    redis = MagicMock()
+    redis.pipeline.return_value.execute.return_value = [1, True, 3, True]
+    with patch.object(tenant_quota, "r", redis), \
+            patch.object(tenant_quota.settings, "tenant_max_concurrent_queries", 2):
+        with pytest.raises(tenant_quota.QuotaExceededError) as exc:
+            with tenant_quota.tenant_query_slot(1):
+                pass
+    assert exc.value.retry_after == 1
+    redis.decr.assert_called_once_with("tenant:1:quota:running")
+
+
+def test_store_owner_lookup_expires_and_is_forgotten_on_write(db):
+    redis = MagicMock()
+    redis.hmget.return_value = ["1", None]
+    with patch.object(tenant_analytics, "r", redis):
+        assert tenant_analytics.store_owners(db, [1, 2]) == {1: 1, 2: 2}
+        tenant_analytics.forget_lookups(store_ids=[2], emails=["owner2@example.com"])
+
+    pipe = redis.pipeline.return_value
+    pipe.hset.assert_called_once_with(tenant_analytics.STORE_OWNERS_KEY, mapping={2: 2})
+    pipe.expire.assert_called_once_with(
+        tenant_analytics.STORE_OWNERS_KEY, tenant_analytics.LOOKUP_TTL_SECONDS, nx=True
+    )
+    assert [call.args for call in pipe.hdel.call_args_list] == [
+        (tenant_analytics.STORE_OWNERS_KEY, 2),
+        (tenant_analytics.TENANT_IDS_KEY, "owner2@example.com"),
+    ]
+
+
+def make_request(headers):
+    request = MagicMock()
+    request.headers = headers
+    return request
+
+
+def test_tenant_responses_are_privately_cacheable():
+    from app.routers.tenant_analytics import _tenant_response
+
+    with patch.object(tenant_analytics, "get_tenant_generation", return_value=(3, 1000)):
+        response = _tenant_response(make_request({}), 1, "summary", lambda generation: b"{}")
+        assert response.headers["cache-control"].startswith("private, ")
+        etag = response.headers["etag"]
+        not_modified = _tenant_response(make_request({"if-none-match": etag}), 1, "summary", lambda g: b"{}")
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"].startswith("private, ")
+    assert not_modified.headers["vary"] == "Authorization"
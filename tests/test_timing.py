@@ -0,0 +1,24 @@
+from app.core.timing import RequestTimings, span, start_timings
+
+
+def test_server_timing_header_format():
+    """Header Server-Timing gộp span cùng tên và luôn kết thúc bằng total"""
+    timings = RequestTimings()
+    timings.add("auth", 0.5)
+    timings.add("redis", 1.0)
+    timings.add("redis", 2.0)
+    header = timings.server_timing_header(10, {"sql": (3.25, "2 queries")})
+    assert header == (
+        'auth;dur=0.50, redis;dur=3.00;desc="2 calls", '
+        'sql;dur=3.25;desc="2 queries", total;dur=10.00'
+    )
+
+
+def test_span_records_only_inside_request():
+    """span() là no-op khi chưa có RequestTimings trong context"""
+    with span("db"):
+        pass
+    timings = start_timings()
+    with span("db"):
+        pass
+    assert list(timings.as_log_fields()) == ["db"]